@@ -0,0 +1 @@
+"""生成器性能基准，需在 src 目录下以 python -m benchmark.<name> 运行"""
@@ -0,0 +1,78 @@
+"""
+MetaImporter 串行/并行解析基准
+用法 (在 src 目录下): python -m benchmark.bench_meta_import --files 4 16 64 --entries 200 --workers 4
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from read_res_file import MetaImporter, logger
+
+CATEGORIES = {
+    "effect": ("EFFECT", "on_add"),
+    "modifier": ("MODIFIER", "modifier"),
+    "trigger": ("TRIGGER", "available"),
+    "preferences": ("PREFERENCES", "preferences")
+}
+
+
+def write_meta_tree(root, file_count, entries_per_file):
+    """在 root 下生成 file_count 个 meta 文件，平均分布到四个分类"""
+    categories = list(CATEGORIES.items())
+    for n in range(file_count):
+        folder, (prefix, m_type) = categories[n % len(categories)]
+        folder_path = os.path.join(root, folder)
+        os.makedirs(folder_path, exist_ok=True)
+        lines = []
+        for e in range(entries_per_file):
+            v_full_id = f"NIE_law_branch_{n + 1}_id_{e // 8 + 1}_value_{e % 8 + 1}_idea"
+            lines.append(f"{prefix}_{v_full_id}_{m_type} = {{ # 法案{n}：条目{e}")
+            lines.append("    OR = {")
+            for k in range(4):
+                lines.append(f"        has_idea = NIE_law_branch_{n + 1}_id_8_value_{k + 1}_idea")
+            lines.append("    }")
+            lines.append("    always = yes")
+            lines.append("}")
+            lines.append("")
+        with open(os.path.join(folder_path, f"NIE_bench_{n}.txt"), 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+
+
+def time_import(workspace, workers, executor, repeat):
+    best = None
+    meta_data = None
+    for _ in range(repeat):
+        importer = MetaImporter(workspace, workers=workers, executor=executor)
+        start = time.perf_counter()
+        importer.run_import()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        meta_data = importer.meta_data
+    return best, meta_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--entries", type=int, default=200, help="每个文件的条目数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    print(f"{'files':>6} {'serial(s)':>10} {'process(s)':>11} {'thread(s)':>10} {'speedup':>8}")
+    for file_count in args.files:
+        with tempfile.TemporaryDirectory() as root:
+            write_meta_tree(root, file_count, args.entries)
+            serial, serial_data = time_import(root, 1, "process", args.repeat)
+            process, process_data = time_import(root, args.workers, "process", args.repeat)
+            thread, thread_data = time_import(root, args.workers, "thread", args.repeat)
+            # 并行结果必须与串行完全一致
+            assert serial_data == process_data == thread_data, "并行解析结果与串行不一致"
+        print(f"{file_count:>6} {serial:>10.3f} {process:>11.3f} {thread:>10.3f} {serial / process:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
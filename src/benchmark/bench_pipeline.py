@@ -0,0 +1,200 @@
+"""
+生成器全流程基准
+在合成数据上分别计时 MetaImporter 与 GenerateModFiles 的冷启动 (无缓存) 与热启动 (缓存 + 增量) 构建，
+并按阶段汇总耗时，与 benchmark/baseline.json 比较以发现性能回退。
+
+用法 (在 src 目录下):
+    python -m benchmark.bench_pipeline                      # 默认 1x 10x 100x
+    python -m benchmark.bench_pipeline --scales 1 10 --save-baseline
+    python -m benchmark.bench_pipeline --dy-loc-share 0.3 --meta-body-lines 20
+
+各规模重复构建多次取最短耗时，并记录固定计算量的校准循环耗时 (calibration_s)；本机的校准耗时比基准长时
+(更慢的机器)，先将基准按校准耗时的比例放大再比较，更快时不缩小基准 (校准循环对机器速度的变化比构建更敏感，
+缩小基准会误报)。因此在更快的机器上检查灵敏度较低，需要时可在本机重新记录基准。
+基准中没有的阶段 (新增的阶段) 不参与比较。
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmark.synthetic import SyntheticConfig, write_workspace
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# 超过基准的比例与绝对时间同时满足时才判定为回退，避免小数值的抖动误报
+# (虚拟机上同一版本在不同进程之间的耗时可相差 30%，比例低于此会误报)
+REGRESSION_RATIO = 0.5
+REGRESSION_MIN_DELTA_S = 0.05
+
+
+def calibrate(repeat=4):
+    """
+    固定计算量 (词法匹配与字典计数，与生成器的热点相近) 的各轮耗时，作为机器速度的参照，每轮约 0.1 秒
+    """
+    pattern = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|[{}=]")
+    text = "NIE_law_branch_1_id_1_value_1_idea = { has_idea = NIE_law_x always = yes }\n" * 20000
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        counts = {}
+        for match in pattern.finditer(text):
+            word = match.group()
+            counts[word] = counts.get(word, 0) + 1
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _stage_totals(stages):
+    totals = {}
+    for stage in stages:
+        totals[stage["name"]] = round(totals.get(stage["name"], 0.0) + stage["wall_s"], 6)
+    return totals
+
+
+def run_once(workspace, trace_memory):
+    """在 workspace 中执行一次完整构建，返回总耗时与各阶段耗时"""
+    from generate_mod import GenerateModFiles
+    from profiler import run_profiler
+
+    cwd = os.getcwd()
+    os.chdir(workspace)
+    try:
+        run_profiler.start(trace_memory=trace_memory)
+        start = time.perf_counter()
+        parser = GenerateModFiles("structure.json5", "dist_mod", incremental=True)
+        parser.build(report=False)
+        total = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+    result = {"total_s": round(total, 6), "stages": _stage_totals(run_profiler.stages)}
+    if trace_memory:
+        result["peak_kb"] = max((s["peak_kb"] for s in run_profiler.stages), default=0)
+    return result
+
+
+def _best(runs):
+    """多次运行中各项的最短耗时 (峰值内存取最大值)"""
+    names = dict.fromkeys(name for run in runs for name in run["stages"])
+    result = {
+        "total_s": min(run["total_s"] for run in runs),
+        "stages": {name: min(run["stages"][name] for run in runs if name in run["stages"]) for name in names}
+    }
+    if "peak_kb" in runs[0]:
+        result["peak_kb"] = max(run["peak_kb"] for run in runs)
+    return result
+
+
+def run_scale(scale, args):
+    """每次重复使用新的工作目录，冷启动与热启动各取最短耗时"""
+    cfg = SyntheticConfig.at_scale(
+        scale,
+        meta_body_lines=args.meta_body_lines,
+        dy_loc_share=args.dy_loc_share
+    )
+    calibration = calibrate()
+    cold_runs, warm_runs = [], []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as workspace:
+            value_count = write_workspace(workspace, cfg)
+            cold_runs.append(run_once(workspace, args.memory))
+            warm_runs.append(run_once(workspace, args.memory))
+    # 在构建前后各校准一次
+    calibration += calibrate()
+    return {
+        "values": value_count, "calibration_s": round(statistics.median(calibration), 6),
+        "cold": _best(cold_runs), "warm": _best(warm_runs)
+    }
+
+
+def find_regressions(results, baseline):
+    """
+    :return: 回退说明列表
+    """
+    regressions = []
+    for scale_key, result in results.items():
+        base_scale = baseline.get(scale_key)
+        if not base_scale:
+            continue
+        # 旧格式的基准没有校准耗时，按同一机器处理
+        speed = result["calibration_s"] / base_scale["calibration_s"] if base_scale.get("calibration_s") else 1.0
+        speed = max(speed, 1.0)
+        for mode in ("cold", "warm"):
+            current = result[mode]
+            base = base_scale.get(mode, {})
+            pairs = [("total", current["total_s"], base.get("total_s"))]
+            pairs += [(name, t, base.get("stages", {}).get(name)) for name, t in current["stages"].items()]
+            for name, now, before in pairs:
+                if before is None:
+                    continue
+                before *= speed
+                if now - before > REGRESSION_MIN_DELTA_S and now > before * (1 + REGRESSION_RATIO):
+                    regressions.append(f"{scale_key} {mode} {name}: {before:.3f}s (x{speed:.2f}) -> {now:.3f}s")
+    return regressions
+
+
+def print_table(results):
+    for scale_key, result in results.items():
+        print(f"== {scale_key} ({result['values']} values, calibration {result['calibration_s']:.3f}s) ==")
+        stage_names = list(dict.fromkeys(list(result["cold"]["stages"]) + list(result["warm"]["stages"])))
+        print(f"  {'stage':<32} {'cold(s)':>9} {'warm(s)':>9}")
+        for name in stage_names:
+            cold = result["cold"]["stages"].get(name, 0.0)
+            warm = result["warm"]["stages"].get(name, 0.0)
+            print(f"  {name:<32} {cold:>9.3f} {warm:>9.3f}")
+        print(f"  {'total':<32} {result['cold']['total_s']:>9.3f} {result['warm']['total_s']:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--meta-body-lines", type=int, default=5)
+    parser.add_argument("--dy-loc-share", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=3, help="每个规模重复构建的次数，取最短耗时")
+    parser.add_argument("--memory", action="store_true", help="同时统计 tracemalloc 峰值内存 (明显变慢)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果写入基准文件")
+    parser.add_argument("--json", help="将本次结果另存为 JSON")
+    args = parser.parse_args()
+
+    from log import log_manager
+    log_manager.init_logger(level=logging.WARNING, log_folder="pdx_logs")
+
+    results = {}
+    for scale in args.scales:
+        scale_key = f"x{scale:g}"
+        print(f"running {scale_key} ...", flush=True)
+        results[scale_key] = run_scale(scale, args)
+    print_table(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"baseline saved: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("no baseline, skip regression check")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        regressions = find_regressions(results, json.load(f))
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
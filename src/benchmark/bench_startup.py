@@ -0,0 +1,69 @@
+"""
+命令行启动耗时基准
+在子进程中多次执行 cli.py 的只读命令，取进程总耗时的中位数减去空解释器的耗时，
+即入口导入与初始化的开销，超过 cli.STARTUP_BUDGET_S 时返回 1。
+
+用法 (在 src 目录下，先完成一次构建以生成 structure 缓存):
+    python -m benchmark.bench_startup
+    python -m benchmark.bench_startup --repeat 10 --branch branch_1
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from cli import STARTUP_BUDGET_S
+
+SRC_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_command(argv, repeat, ok_codes=(0,)):
+    """:return: 各次进程耗时 (秒)"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, *argv], cwd=SRC_FOLDER, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        durations.append(time.perf_counter() - start)
+        if result.returncode not in ok_codes:
+            raise RuntimeError(f"{' '.join(argv)} 返回 {result.returncode}:\n{result.stderr.decode(errors='replace')}")
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--branch", default="branch_1", help="check 命令检查的分支")
+    args = parser.parse_args()
+
+    check_name = f"cli check {args.branch}"
+    # (参数, 视为成功的返回码)；check 存在警告时返回 1
+    commands = {
+        "python": (["-c", "pass"], (0,)),
+        "cli --help": (["cli.py", "--help"], (0,)),
+        "import generate_mod": (["-c", "import generate_mod"], (0,)),
+        "cli stats": (["cli.py", "stats"], (0,)),
+        check_name: (["cli.py", "check", "--branch", args.branch], (0, 1))
+    }
+    # 以空解释器为基准，只统计入口自身的开销
+    commands_budgeted = ("cli --help", "cli stats", check_name)
+
+    medians = {}
+    print(f"{'command':<28} {'min':>9} {'median':>9} {'overhead':>9}")
+    for name, (argv, ok_codes) in commands.items():
+        durations = time_command(argv, args.repeat, ok_codes)
+        medians[name] = statistics.median(durations)
+        overhead = medians[name] - medians["python"]
+        print(f"{name:<28} {min(durations) * 1000:>7.1f}ms {medians[name] * 1000:>7.1f}ms {overhead * 1000:>7.1f}ms")
+
+    over = [name for name in commands_budgeted if medians[name] - medians["python"] > STARTUP_BUDGET_S]
+    if over:
+        print(f"over startup budget ({STARTUP_BUDGET_S * 1000:.0f} ms): {', '.join(over)}")
+        return 1
+    print(f"startup budget ok ({STARTUP_BUDGET_S * 1000:.0f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
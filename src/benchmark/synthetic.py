@@ -0,0 +1,122 @@
+"""
+合成数据生成器
+生成与 structure.json5 结构一致的输入，以及对应的 meta_files/ 目录。
+scale=1 对应当前已填写的规模: 4 个分支 x 8 个槽位 x 7 个值。
+"""
+import json
+import os
+import random
+from dataclasses import dataclass
+
+# 当前 structure.json5 中已填写的分支规模
+BASE_BRANCHES = 4
+BASE_IDS = 8
+BASE_VALUES = 7
+
+
+@dataclass
+class SyntheticConfig:
+    branches: int = BASE_BRANCHES
+    ids: int = BASE_IDS
+    values: int = BASE_VALUES
+    # 每个 modifier 块的行数
+    meta_body_lines: int = 5
+    # 使用动态文本 (DY_LOC) 的值所占比例
+    dy_loc_share: float = 0.0
+    # 可用性判断中 `always = yes` 的比例，其余为 has_idea 阶梯
+    trivial_trigger_share: float = 0.5
+    seed: int = 1
+
+    @classmethod
+    def at_scale(cls, scale, **kwargs):
+        """按倍数放大分支数量，其余参数保持不变"""
+        return cls(branches=max(1, round(BASE_BRANCHES * scale)), **kwargs)
+
+    @property
+    def value_count(self):
+        return self.branches * self.ids * self.values
+
+
+def build_structure(cfg):
+    rng = random.Random(cfg.seed)
+    data = {}
+    for b in range(1, cfg.branches + 1):
+        branch = {"name": f"分支{b}"}
+        for i in range(1, cfg.ids + 1):
+            slot = {"name": f"槽位{b}_{i}"}
+            for v in range(1, cfg.values + 1):
+                value = {
+                    "desc": f"分支{b} 槽位{i} 值{v} 的描述文本。",
+                    "level": v,
+                    "allowed_civil_war_flag": rng.choice((1, 0, -1)),
+                    "other_meta": {"on_add": True, "on_remove": True}
+                }
+                if rng.random() >= cfg.dy_loc_share:
+                    value["name"] = f"值{v}"
+                if v == 1:
+                    value["default"] = True
+                slot[f"value_{v}"] = value
+            branch[f"id_{i}"] = slot
+        data[f"branch_{b}"] = branch
+    return data
+
+
+def _entry(prefix, v_full_id, m_type, name, body_lines):
+    lines = [f"{prefix}_{v_full_id}_{m_type} = {{ # {name}"]
+    lines.extend(f"    {line}" for line in body_lines)
+    lines.append("}")
+    lines.append("")
+    return lines
+
+
+def build_meta_files(cfg, data):
+    """返回 {category: 文件文本}"""
+    rng = random.Random(cfg.seed + 1)
+    modifiers = ["political_power_gain", "stability_weekly", "war_support_weekly", "training_time_factor",
+                 "conscription_factor", "army_core_attack_factor", "army_core_defence_factor"]
+    files = {"modifier": [], "trigger": [], "effect": [], "preferences": []}
+    for b_key, branch in data.items():
+        for id_key, slot in branch.items():
+            if not id_key.startswith("id_"):
+                continue
+            for v_key, value in slot.items():
+                if not v_key.startswith("value_"):
+                    continue
+                v_full_id = f"NIE_law_{b_key}_{id_key}_{v_key}_idea"
+                name = f"{slot['name']}：{value.get('name', 'DY_LOC')}"
+                body = [f"{rng.choice(modifiers)} = {rng.uniform(-0.5, 0.5):.2f}" for _ in range(cfg.meta_body_lines)]
+                files["modifier"].extend(_entry("MODIFIER", v_full_id, "modifier", name, body))
+
+                if rng.random() < cfg.trivial_trigger_share:
+                    trigger = ["always = yes"]
+                else:
+                    ladder = [f"    has_idea = NIE_law_{b_key}_id_{cfg.ids}_value_{k}_idea"
+                              for k in range(rng.randint(1, cfg.values), cfg.values + 1)]
+                    trigger = ["OR = {"] + ladder + ["}"]
+                files["trigger"].extend(_entry("TRIGGER", v_full_id, "available", name, trigger))
+                if value["allowed_civil_war_flag"] < 0:
+                    files["trigger"].extend(_entry("TRIGGER", v_full_id, "allowed_cv", name, ["has_war = no"]))
+
+                for hook in ("on_add", "on_remove"):
+                    files["effect"].extend(_entry("EFFECT", v_full_id, hook, name, []))
+
+                if "name" not in value:
+                    files["preferences"].extend(
+                        _entry("PREFERENCES", v_full_id, "loc", name, ["localization_key = NIE_dy_loc_default"]))
+    return {category: "\n".join(lines) for category, lines in files.items()}
+
+
+def write_workspace(root, cfg):
+    """
+    在 root 下写出 structure.json5 与 meta_files/
+    :return: 生成的值数量
+    """
+    data = build_structure(cfg)
+    with open(os.path.join(root, "structure.json5"), 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+    for category, text in build_meta_files(cfg, data).items():
+        folder = os.path.join(root, "meta_files", category)
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"NIE_laws_{category.upper()}.txt"), 'w', encoding='utf-8-sig') as f:
+            f.write(text)
+    return cfg.value_count
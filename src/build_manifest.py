@@ -0,0 +1,215 @@
+import bisect
+import functools
+import hashlib
+import json
+import os
+import re
+from fnmatch import fnmatchcase
+
+from log import log_manager
+
+logger = log_manager.get_logger()
+
+_WILDCARD = re.compile(r"[*?\[]")
+
+
+class BuildManifest:
+    """
+    增量构建清单
+    记录每个输入单元 (branch / id / value / meta 条目) 的内容哈希，以及每个输出文件上次构建时的依赖摘要。
+    输入键形如:
+        struct/branch_1                     分支自身字段 + id 列表
+        struct/branch_1/id_1                槽位自身字段 + value 列表
+        struct/branch_1/id_1/value_1        value 全部内容
+        meta/<category>/<v_full_id>/<type>  meta 内容块
+        env/<name>                          生成器环境 (源码、全局配置)
+    """
+    VERSION = 1
+
+    def __init__(self, manifest_path, output_root):
+        self.manifest_path = manifest_path
+        self.output_root = output_root
+        self.inputs = {}
+        self.outputs = {}
+        self.old_inputs = {}
+        self.old_outputs = {}
+        # 排序后的输入键，输入变化时置空，在计算输出摘要时重建
+        self._sorted_keys = None
+        self._load()
+
+    def _load(self):
+        log_tail = " (BuildManifest: load)"
+        if not os.path.exists(self.manifest_path):
+            return
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"构建清单读取失败，将执行完整构建: {e}{log_tail}")
+            return
+        if raw.get("version") != self.VERSION or raw.get("output_root") != self.output_root:
+            logger.info(f"构建清单版本或输出目录已变化，将执行完整构建{log_tail}")
+            return
+        self.old_inputs = raw.get("inputs", {})
+        self.old_outputs = raw.get("outputs", {})
+
+    def save(self):
+        log_tail = " (BuildManifest: save)"
+        folder = os.path.dirname(self.manifest_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        # 未在本次运行中重建的输出沿用旧摘要
+        outputs = dict(self.old_outputs)
+        outputs.update(self.outputs)
+        raw = {
+            "version": self.VERSION,
+            "output_root": self.output_root,
+            "inputs": self.inputs,
+            "outputs": outputs
+        }
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(raw, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+        # 常驻进程 (watch 模式) 中，本次结果即为下一轮比较的基准
+        self.old_inputs = dict(self.inputs)
+        self.old_outputs = outputs
+        self.outputs = {}
+        logger.debug(f"构建清单已保存: {self.manifest_path}{log_tail}")
+
+    @staticmethod
+    def hash_value(value):
+        """对任意可 JSON 化的值计算稳定哈希"""
+        if isinstance(value, bytes):
+            raw = value
+        else:
+            raw = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        return hashlib.sha1(raw).hexdigest()
+
+    def set_input(self, key, value):
+        self.inputs[key] = self.hash_value(value)
+        self._sorted_keys = None
+
+    def collect_structure(self, data):
+        """按 branch / id / value 三级记录 structure 的哈希"""
+        for b_key, b_data in data.items():
+            if not b_key.startswith("branch_"):
+                # 非分支的顶层配置整体记录
+                self.set_input(f"struct/{b_key}", b_data)
+                continue
+            b_shallow = {k: v for k, v in b_data.items() if not k.startswith("id_")}
+            b_shallow["__ids__"] = sorted(k for k in b_data if k.startswith("id_"))
+            self.set_input(f"struct/{b_key}", b_shallow)
+            for id_key, id_data in b_data.items():
+                if not id_key.startswith("id_"):
+                    continue
+                id_shallow = {k: v for k, v in id_data.items() if not k.startswith("value_")}
+                id_shallow["__values__"] = sorted(k for k in id_data if k.startswith("value_"))
+                self.set_input(f"struct/{b_key}/{id_key}", id_shallow)
+                for v_key, v_data in id_data.items():
+                    if v_key.startswith("value_"):
+                        self.set_input(f"struct/{b_key}/{id_key}/{v_key}", v_data)
+
+    def collect_meta(self, meta_data):
+        """按条目记录 meta 内容哈希，v_name 只影响 meta 文件自身的注释，不计入"""
+        for category, items in meta_data.items():
+            for item in items:
+                self.set_input(f"meta/{category}/{item['v_full_id']}/{item['type']}", item.get("meta", ""))
+
+    def drop_inputs(self, prefix):
+        """移除以 prefix 开头的输入键，用于在重新收集前清除已删除的单元"""
+        for key in [k for k in self.inputs if k.startswith(prefix)]:
+            del self.inputs[key]
+        self._sorted_keys = None
+
+    def changed_keys(self):
+        """返回本次与上次构建之间新增、删除或内容变化的输入键"""
+        changed = {k for k, v in self.inputs.items() if self.old_inputs.get(k) != v}
+        changed.update(k for k in self.old_inputs if k not in self.inputs)
+        return changed
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _compile_pattern(pattern):
+        """
+        将输入键模式编译为匹配函数
+        '*' 匹配单个路径段，结尾的 '**' 匹配其后任意层级；不含通配符的前缀直接比较字符串
+        """
+        pattern_parts = pattern.split("/")
+        recursive = pattern_parts[-1] == "**"
+        if recursive:
+            pattern_parts = pattern_parts[:-1]
+        depth = len(pattern_parts)
+        literal = [p for p in pattern_parts if not any(c in p for c in "*?[")]
+
+        if len(literal) == depth:
+            prefix = "/".join(pattern_parts) + "/"
+            if recursive:
+                return lambda key: key.startswith(prefix)
+            exact = prefix[:-1]
+            return lambda key: key == exact
+
+        last = pattern_parts[-1]
+        if literal == pattern_parts[:-1] and last.endswith("*") and not _WILDCARD.search(last[:-1]):
+            # 形如 struct/* 或 meta/trigger/NIE_law_branch_1_* 的单层前缀匹配
+            prefix = "/".join(pattern_parts)[:-1]
+            if recursive:
+                return lambda key: key.startswith(prefix)
+            return lambda key: key.startswith(prefix) and key.count("/") == depth - 1
+
+        def match(key):
+            key_parts = key.split("/")
+            if recursive:
+                if len(key_parts) < depth:
+                    return False
+                key_parts = key_parts[:depth]
+            elif len(key_parts) != depth:
+                return False
+            return all(fnmatchcase(k, p) for k, p in zip(key_parts, pattern_parts))
+        return match
+
+    def output_digest(self, patterns):
+        """
+        计算一个输出文件依赖的全部输入的合并摘要
+        匹配的键必然以模式中第一个通配符之前的部分开头，只需在排序后的键中二分查找该前缀的区间，
+        按分支拆分的输出很多时不必每个输出都扫描全部输入
+        """
+        keys = self._sorted_keys
+        if keys is None:
+            keys = self._sorted_keys = sorted(self.inputs)
+        selected = set()
+        for pattern in patterns:
+            wildcard = _WILDCARD.search(pattern)
+            if wildcard is None:
+                if pattern in self.inputs:
+                    selected.add(pattern)
+                continue
+            matcher = self._compile_pattern(pattern)
+            prefix = pattern[:wildcard.start()]
+            for i in range(bisect.bisect_left(keys, prefix), len(keys)):
+                key = keys[i]
+                if not key.startswith(prefix):
+                    break
+                if matcher(key):
+                    selected.add(key)
+        # 与逐个 update 键和哈希的结果相同
+        inputs = self.inputs
+        return hashlib.sha1("".join(key + inputs[key] for key in sorted(selected)).encode("utf-8")).hexdigest()
+
+    def is_dirty(self, output_key, patterns, path):
+        """
+        判断输出文件是否需要重新生成
+        :param output_key: 输出标识 (相对路径)
+        :param patterns: 依赖的输入键模式
+        :param path: 输出文件实际路径，文件丢失时强制重建
+        """
+        digest = self.output_digest(patterns)
+        self.outputs[output_key] = digest
+        if not os.path.exists(path):
+            return True
+        return self.old_outputs.get(output_key) != digest
+
+    def discard(self, output_key):
+        """写入失败时撤销该输出的新摘要，保证下次重建"""
+        self.outputs.pop(output_key, None)
+        self.old_outputs.pop(output_key, None)
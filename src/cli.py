@@ -0,0 +1,165 @@
+"""
+命令行入口
+    python cli.py build [--structure 路径] [--out 目录] [--full] [--variants [variants.json5]]
+    python cli.py check [--branch branch_1 ...]
+    python cli.py sync-loc
+    python cli.py stats [--meta]
+
+各命令只导入与初始化自己用到的部分: 日志只在会写日志的命令中初始化，structure 缓存命中时不导入 json5，
+stats 默认不读取 meta，check 单个分支时只保留该分支的 meta 条目 (数据库后端按索引只读取这些条目，
+文本后端仍需解析全部 meta 文件，解析缓存命中时开销较小)。
+只读命令的启动开销 (相对空解释器的进程耗时) 由 benchmark/bench_startup.py 检查；
+--startup-time 输出从进程启动到命令完成导入与初始化、开始实际工作之前的耗时。
+"""
+import argparse
+import os
+import sys
+import time
+
+_START = time.perf_counter()
+
+# 只读命令相对空解释器的启动开销预算 (秒)
+STARTUP_BUDGET_S = 0.25
+
+
+def _report_startup(args):
+    """各命令在完成导入与初始化、开始实际工作之前调用"""
+    if args.startup_time:
+        print(f"startup: {(time.perf_counter() - _START) * 1000:.1f} ms", file=sys.stderr)
+
+
+def _init_logging(args, level_name="DEBUG"):
+    import logging
+
+    from log import log_manager
+    from generate_mod import ASYNC_LOGGING
+    log_manager.init_logger(level=getattr(logging, level_name), log_folder=args.log_folder, async_mode=ASYNC_LOGGING)
+    return log_manager
+
+
+def _generator(args, incremental=False, branches=None):
+    from generate_mod import GenerateModFiles
+    return GenerateModFiles(
+        args.structure, args.out, incremental=incremental,
+        meta_workspace=args.meta_dir, cache_folder=args.cache, branches=branches
+    )
+
+
+def cmd_build(args):
+    from generate_mod import INCREMENTAL_BUILD, PROFILE_MEMORY
+    from profiler import run_profiler
+
+    log_manager = _init_logging(args)
+    run_profiler.start(trace_memory=PROFILE_MEMORY or args.memory)
+    incremental = INCREMENTAL_BUILD and not args.full
+    if args.variants:
+        from variants import VariantBuild
+        builder = VariantBuild(
+            args.variants, args.structure, incremental=incremental, meta_workspace=args.meta_dir, cache_folder=args.cache
+        )
+    else:
+        builder = _generator(args, incremental=incremental)
+    _report_startup(args)
+    builder.build()
+    log_manager.flush()
+    return 0
+
+
+def cmd_check(args):
+    log_manager = _init_logging(args, "INFO")
+    try:
+        generator = _generator(args, branches=args.branch)
+        _report_startup(args)
+        has_warnings = generator.check()
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+        return 2
+    finally:
+        log_manager.flush()
+    return 1 if has_warnings else 0
+
+
+def cmd_sync_loc(args):
+    log_manager = _init_logging(args, "INFO")
+    generator = _generator(args)
+    _report_startup(args)
+    generator.sync_localization()
+    log_manager.flush()
+    return 0
+
+
+def cmd_stats(args):
+    """只读统计，不初始化日志文件 (不会覆盖 latest.log)"""
+    import json
+
+    generator = _generator(args)
+    _report_startup(args)
+    model = generator.model
+    slots = sum(len(branch.slots) for branch in model)
+    values = sum(len(slot.values) for branch in model for slot in branch.slots)
+    dy_loc = sum(1 for branch in model for slot in branch.slots for value in slot.values if not value.loc_name)
+    print(f"structure: {args.structure}")
+    print(f"  branches {len(model)}, slots {slots}, values {values} (DY_LOC {dy_loc})")
+    init_rules = generator.data.get("init_rules") or {}
+    print(f"  init_rules {len(init_rules.get('rules', []))}, translations {', '.join(generator.loc_overlays) or '-'}")
+
+    if args.with_meta:
+        generator.load_meta()
+        counts = ", ".join(f"{category} {len(items)}" for category, items in generator.importer.meta_data.items())
+        print(f"meta: {counts}")
+
+    report_path = os.path.join(args.log_folder, "latest_report.json")
+    if os.path.exists(report_path):
+        with open(report_path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        stages = sorted(report.get("stages", []), key=lambda stage: stage.get("wall_s", 0), reverse=True)[:5]
+        print(f"last run: {report.get('started_at')} wall {report.get('wall_s', 0):.3f}s")
+        for stage in stages:
+            print(f"  {stage['name']:<32} {stage['wall_s']:.3f}s")
+    return 0
+
+
+COMMANDS = {
+    "build": cmd_build,
+    "check": cmd_check,
+    "sync-loc": cmd_sync_loc,
+    "stats": cmd_stats
+}
+
+
+def build_parser():
+    # 默认值与 generate_mod 中的配置一致，这里不导入 generate_mod 以免拖慢 --help 与参数错误
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--structure", default="structure.json5", help="structure 文件或按分支拆分的目录")
+    parser.add_argument("--out", default="dist_mod", help="输出目录")
+    parser.add_argument("--meta-dir", default="meta_files", help="meta 文件目录")
+    parser.add_argument("--cache", default=".build_cache", help="缓存目录")
+    parser.add_argument("--log-folder", default="pdx_logs")
+    parser.add_argument("--startup-time", action="store_true", help="输出命令完成导入与初始化时的启动耗时")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="生成全部输出")
+    build.add_argument("--full", action="store_true", help="忽略构建清单，重新生成全部输出")
+    build.add_argument("--memory", action="store_true", help="运行报告统计 tracemalloc 峰值内存 (明显拖慢构建)")
+    build.add_argument(
+        "--variants", nargs="?", const="variants.json5", metavar="CONFIG",
+        help="按变体配置生成多个目标 (见 variants)，输出目录由配置指定，忽略 --out"
+    )
+
+    check = sub.add_parser("check", help="只检查不输出，存在警告时返回 1")
+    check.add_argument("--branch", nargs="+", help="只检查这些分支，如 branch_1")
+
+    sub.add_parser("sync-loc", help="同步本地化名称到 meta")
+
+    stats = sub.add_parser("stats", help="输出 structure、meta 与上次运行的统计")
+    stats.add_argument("--meta", dest="with_meta", action="store_true", help="同时统计 meta 条目 (需要导入 meta)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return COMMANDS[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+import threading
+
+from log import log_manager
+
+logger = log_manager.get_logger()
+
+
+class DiagnosticsCollector:
+    """
+    诊断信息收集器
+    按 (kind, category) 分组计数，每组只有前 sample_limit 条会逐条写入日志，同一 key 的重复项只计数；
+    结束时输出一张汇总表，可选输出包含全部条目的 JSON 明细文件。
+    日志量因此与法案数量无关。
+    """
+
+    def __init__(self, sample_limit=3, keep_details=True):
+        self.sample_limit = sample_limit
+        self.keep_details = keep_details
+        # (kind, category) -> {"level", "count", "duplicates", "logged", "keys"}
+        self.groups = {}
+        self.details = []
+        self._lock = threading.Lock()
+
+    def add(self, kind, category, key, template, *args, level=logging.WARNING):
+        """
+        记录一条诊断
+        :param kind: 诊断类型，如 unnamed_meta、missing_loc
+        :param category: meta 分类
+        :param key: 条目标识，同组内相同 key 视为重复
+        :param template: 日志模板 (%-style)，只有实际写入日志时才格式化
+        """
+        with self._lock:
+            group = self.groups.get((kind, category))
+            if group is None:
+                group = self.groups[(kind, category)] = {
+                    "level": level, "count": 0, "duplicates": 0, "logged": 0, "keys": set()
+                }
+            if key in group["keys"]:
+                group["duplicates"] += 1
+                return
+            group["keys"].add(key)
+            group["count"] += 1
+            group["level"] = max(group["level"], level)
+            sampled = group["logged"] < self.sample_limit
+            if sampled:
+                group["logged"] += 1
+            if self.keep_details:
+                self.details.append((kind, category, key, template, args))
+        if sampled:
+            logger.log(level, template, *args)
+
+    def max_level(self):
+        """已记录诊断的最高日志等级，没有诊断时为 NOTSET"""
+        return max((group["level"] for group in self.groups.values()), default=logging.NOTSET)
+
+    def __len__(self):
+        return sum(group["count"] for group in self.groups.values())
+
+    def log_summary(self, title="诊断汇总"):
+        """以一条日志输出汇总表"""
+        log_tail = " (DiagnosticsCollector: log_summary)"
+        if not self.groups:
+            logger.info("%s: 无%s", title, log_tail)
+            return
+        rows = [f"{title}:", f"  {'kind':<20} {'category':<12} {'count':>7} {'dup':>5} {'omitted':>8}"]
+        level = logging.INFO
+        for (kind, category), group in sorted(self.groups.items()):
+            omitted = group["count"] - group["logged"]
+            rows.append(f"  {kind:<20} {category:<12} {group['count']:>7} {group['duplicates']:>5} {omitted:>8}")
+            level = max(level, group["level"])
+        logger.log(level, "%s%s", "\n".join(rows), log_tail)
+
+    def write_detail(self, path):
+        """输出全部诊断条目的 JSON 明细"""
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        entries = []
+        for kind, category, key, template, args in self.details:
+            try:
+                message = template % args if args else template
+            except (TypeError, ValueError):
+                message = template
+            entries.append({"kind": kind, "category": category, "key": key, "message": message})
+        summary = [
+            {"kind": kind, "category": category, "count": group["count"], "duplicates": group["duplicates"]}
+            for (kind, category), group in sorted(self.groups.items())
+        ]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"summary": summary, "entries": entries}, f, ensure_ascii=False, indent=1)
+        return path
+
+    def clear(self):
+        self.groups = {}
+        self.details = []
+
+
+# 实例化
+diagnostics = DiagnosticsCollector()
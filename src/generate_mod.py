@@ -1,74 +1,564 @@
+import functools
+import glob
+import itertools
 import logging
 import os
-import textwrap
-from collections import defaultdict
-
-import json5
+import re
 
+from build_manifest import BuildManifest
+from diagnostics import diagnostics
+from init_rules import compile_init_rules, iter_init_effect_lines
+from law_model import DY_LOC, OTHER_META_HOOKS, TO_BE_WRITTEN, compile_structure
+from loc_overlay import LocEntries, list_overlay_files, overlay_folder
+from loc_sync import LocSyncState
 from log import log_manager
+from meta_index import MetaIndex
+from pdx_writer import StreamWriter, iter_indented
+from profiler import run_profiler
 from read_res_file import MetaImporter
+from ref_graph import ReferenceGraph
+from scheduler import TaskScheduler
+from structure_cache import StructureCache
+from trigger_opt import ALWAYS_TRUE, TriggerOptimizer
 
 # --- 核心路径配置 ---
-JSON5_PATH = r"structure.json5"
+JSON5_PATH = r"structure.json5"  # 也可以是按分支拆分的目录，每个分支一个 json5 文件
 OUTPUT_ROOT = r"dist_mod"
 MOD_ID = "NIE"
 COLON_STYLE = "："
+LOC_BASE_LANGUAGE = "simp_chinese"  # structure 中文本的语言
+LOC_OVERLAY_FOLDER = r"loc_overlays"  # 其他语言的文本覆盖目录，与 structure 同级，每种语言一个 <lang>.json5 (见 loc_overlay)
 META_IMPORTER_WORKSPACE = r"meta_files"
+# meta 的存储方式: text 为 META_IMPORTER_WORKSPACE 中的文本文件；sqlite 为 META_DB_PATH 数据库 (为空时从文本导入，见 meta_store)，
+# 数据库不纳入版本控制 (见 .gitignore)，需要提交的修改先以 meta_store.py export 写回文本
+META_BACKEND = "text"
+META_DB_PATH = r"meta_files/meta.sqlite3"
+BUILD_CACHE_FOLDER = r".build_cache"
+INCREMENTAL_BUILD = True
+META_IMPORT_WORKERS = 1  # 大于 1 时并行解析 meta 文件
+EMIT_WORKERS = 4  # 并行生成输出文件的线程数，1 为串行 (见 scheduler)
+# 按分支拆分 ideas 与 scripted trigger / effect / DY_LOC 输出为 <文件名>_branch_N.txt，每个分片是独立的输出任务，
+# 只有变化的分支会被重新生成；不属于任何分支的共享条目写入 <文件名>_common.txt。idea_tags 与本地化仍为单个文件
+SHARD_OUTPUTS = False
+PROFILE_MEMORY = False  # 运行报告中是否统计 tracemalloc 峰值内存，开启后完整构建约慢 4 倍 (命令行用 build --memory)
+ASYNC_LOGGING = True  # 日志格式化与写出交给后台线程
+DIAGNOSTICS_DETAIL = True  # 是否在日志目录输出全部诊断条目的 JSON 明细
+OPTIMIZE_TRIGGERS = False  # 省略恒真 trigger、内联单条语句、合并相同内容与 has_idea 阶梯 (见 trigger_opt)
+# 没有 meta 内容的 scripted trigger / effect / DY_LOC 的处理方式:
+#   keep 照常输出空条目; skip 不输出，ideas 中省略调用，DY_LOC 改为静态本地化键; fallback 统一指向一个共享条目
+EMPTY_STUB_MODE = "keep"
+# 参与引用检查的手写脚本
+HAND_WRITTEN_SCRIPTS = (
+    r"../common/on_actions/NIE_country_laws_on_cations.txt",
+)
+
+logger = log_manager.get_logger()
 
-logger = log_manager.init_logger(level=logging.DEBUG, log_folder="pdx_logs")
+_BRANCH_OF_ID = re.compile(r"_law_(branch_\d+)(?:_|$)")
+# 整体输出文件或其分片的文件名后缀
+_SHARD_SUFFIX = r"(?:_(?:branch_\d+|common))?\.txt"
 
 
 class GenerateModFiles:
-    def __init__(self, json_path, output_root):
+    # 各输出依赖的输入键模式 (键格式见 BuildManifest)
+    OUTPUT_DEPENDENCIES = {
+        "idea_tags": ("env/**", "struct/*"),
+        "ideas": ("env/**", "struct/**", "meta/modifier/**", "meta/preferences/**"),
+        "localisation": ("env/**", "struct/**"),
+        "trigger": ("env/**", "struct/**", "meta/trigger/**"),
+        "effect": ("env/**", "struct/**", "meta/effect/**"),
+        "loc": ("env/**", "struct/**", "meta/preferences/**"),
+        "init": ("env/**", "struct/**")
+    }
+
+    # scripted 输出: mode -> 目录、文件名与 meta 分类，文件名中的 {mod_id} 为实例的 MOD_ID
+    SCRIPTED_FILES = {
+        "trigger": {
+            "folder": "scripted_triggers",
+            "file_prefix": "{mod_id}_laws_TRIGGER",
+            "category": "trigger"
+        },
+        "effect": {
+            "folder": "scripted_effects",
+            "file_prefix": "{mod_id}_laws_FUN",
+            "category": "effect"
+        },
+        "loc": {
+            "folder": "scripted_localisation",
+            "file_prefix": "{mod_id}_laws_DY_LOC",
+            "category": "preferences"  # 假设 DY_LOC 的元数据存在 preferences 分类下
+        }
+    }
+
+    # EMPTY_STUB_MODE = fallback 时使用的共享条目
+    STUB_FALLBACK_IDS = {
+        "trigger": "TRIGGER_{mod_id}_law_empty",
+        "effect": "EFFECT_{mod_id}_law_empty",
+        "loc": "get_{mod_id}_law_dy_loc_fallback"
+    }
+
+    def __init__(self, json_path, output_root, incremental=False,
+                 meta_workspace=META_IMPORTER_WORKSPACE, cache_folder=BUILD_CACHE_FOLDER, branches=None,
+                 mod_id=MOD_ID, colon_style=COLON_STYLE):
+        """
+        构造时不读取任何输入，structure、meta 与构建清单在首次使用时加载
+        :param branches: 只处理这些分支 (如 ["branch_1"])，用于检查单个分支；为空时处理全部
+        :param mod_id: 生成 ID 与文件名的前缀，多目标构建的各变体可以不同 (见 variants)
+        """
+        if branches and incremental:
+            raise ValueError("只处理部分分支时不能使用增量构建")
         self.json_path = json_path
         self.output_root = output_root
-        self.data = self._load_json(json_path)
+        self.incremental = incremental
+        self.meta_workspace = meta_workspace
+        self.cache_folder = cache_folder
+        self.branches = set(branches) if branches else None
+        self.mod_id = mod_id
+        self.colon_style = colon_style
+        # 是否使用其他实例已解析的输入 (见 use_inputs)，此时不导入 meta，也不同步本地化名称
+        self.shared_inputs = False
+        # 已创建的输出目录，避免每个输出重复 makedirs
+        self._output_dirs = set()
+        diagnostics.clear()
         self.loc_data = {}
-        self.importer = MetaImporter(META_IMPORTER_WORKSPACE)
-        self.importer.run_import()
-        self.meta_index = {}
+        self.loc_entries = None
+        self.meta_index = None
+        self.ref_graph = ReferenceGraph(self.mod_id)
+        self.manifest = None
+        self._meta_loaded = False
+        # 反向依赖失效后需在下一次构建中强制重写的输出
+        self.forced_outputs = set()
+        self.trigger_plan = None
+        self.init_plan = None
+        # 被省略的空 scripted 条目: mode -> [(scripted_full_id, v_full_id, m_type)...]
+        self.pruned_stubs = {}
+        self._pruned_ids = set()
+
+    @functools.cached_property
+    def structure_cache(self):
+        return StructureCache(os.path.join(self.cache_folder, "structure_cache.json"))
+
+    @functools.cached_property
+    def data(self):
+        with run_profiler.stage("load_json"):
+            return self._load_json(self.json_path)
+
+    @functools.cached_property
+    def model(self):
+        # 先在 compile_model 阶段之外读取 structure，两者的耗时分别统计
+        selected = self._selected_data()
+        with run_profiler.stage("compile_model"):
+            return compile_structure(selected, self._full_id_func(), self.colon_style)
+
+    @functools.cached_property
+    def loc_overlays(self):
+        return self._load_loc_overlays()
+
+    @functools.cached_property
+    def loc_sync_state(self):
+        return LocSyncState(os.path.join(self.cache_folder, "loc_sync_state.json"))
+
+    @functools.cached_property
+    def importer(self):
+        store = None
+        if META_BACKEND == "sqlite":
+            # sqlite3 只在使用数据库后端时导入
+            from meta_store import open_meta_store
+            store = open_meta_store(META_DB_PATH, self.meta_workspace)
+        return MetaImporter(
+            self.meta_workspace,
+            cache_path=os.path.join(self.cache_folder, "meta_parse_cache.pickle"),
+            workers=META_IMPORT_WORKERS,
+            store=store
+        )
+
+    def _selected_data(self):
+        if self.branches is None:
+            return self.data
+        missing = self.branches.difference(self.data)
+        if missing:
+            raise KeyError(f"structure 中没有分支: {', '.join(sorted(missing))}")
+        return {k: v for k, v in self.data.items() if not k.startswith("branch_") or k in self.branches}
+
+    def _in_scope(self, ref_id):
+        """只检查部分分支时，其他分支的 ID 不参与报告"""
+        if self.branches is None:
+            return True
+        match = _BRANCH_OF_ID.search(ref_id)
+        return match is None or match.group(1) in self.branches
+
+    def load_meta(self):
+        """
+        导入 meta 并建立索引与引用关系，增量构建时同时初始化构建清单；重复调用无开销
+        只处理部分分支时只保留这些分支的条目 (数据库后端按索引读取)
+        """
+        if self._meta_loaded:
+            return
+        # 之后的流程都依赖模型，先加载 structure，使其阶段统计不嵌套在 meta 阶段中
+        model = self.model
+        v_full_ids = None
+        if self.branches is not None:
+            v_full_ids = {value.full_id for branch in model for slot in branch.slots for value in slot.values}
+        if not self.shared_inputs:
+            self.importer.run_import(v_full_ids)
         self._get_meta_index()
+        self._index_meta_references(self.importer.meta_data)
+        if self.incremental:
+            self._init_manifest()
+        self._meta_loaded = True
 
-    def _get_meta_index(self):
-        self.meta_index = defaultdict(lambda: defaultdict(dict))
-        for category, items in self.importer.meta_data.items():
-            for item in items:
-                v_id = item['v_full_id']
-                m_type = item['type']
-                # 直接赋值，defaultdict() 会处理中间层的自动创建
-                self.meta_index[category][v_id][m_type] = item['meta']
+    @run_profiler.profiled("init_manifest")
+    def _init_manifest(self):
+        """增量构建: 记录本次输入哈希，并与上次构建清单比较"""
+        log_tail = " (GenerateModFiles: init_manifest)"
+        self.manifest = BuildManifest(os.path.join(self.cache_folder, "build_manifest.json"), self.output_root)
+        # 生成器源码 (src 下全部模块) 与全局配置变化时全部输出都需要重建
+        src_folder = os.path.dirname(os.path.abspath(__file__))
+        for src_path in sorted(glob.glob(os.path.join(src_folder, "*.py"))):
+            with open(src_path, 'rb') as f:
+                self.manifest.set_input(f"env/{os.path.basename(src_path)}", f.read())
+        self.manifest.set_input("env/config", [self.mod_id, self.colon_style, OPTIMIZE_TRIGGERS, EMPTY_STUB_MODE])
+        if OPTIMIZE_TRIGGERS:
+            # 被手写脚本引用的 scripted trigger 需要保留定义
+            for path in HAND_WRITTEN_SCRIPTS:
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        self.manifest.set_input(f"env/hand/{os.path.basename(path)}", f.read())
+        self.manifest.collect_structure(self.data)
+        self._collect_overlay_inputs()
+        self.manifest.collect_meta(self.importer.meta_data)
+        logger.info(f"增量构建: {len(self.manifest.changed_keys())} 个输入单元发生变化{log_tail}")
+
+    def _is_output_dirty(self, dep_name, path, extra_patterns=(), branch=None):
+        """
+        增量构建时判断输出是否需要重新生成，非增量模式始终返回 True
+        :param extra_patterns: 只有该输出文件才有的依赖 (如某种语言的文本覆盖)
+        :param branch: 分片所属的分支，依赖只取该分支的 structure 与 meta
+        """
+        log_tail = " (GenerateModFiles: is_output_dirty)"
+        if self.manifest is None:
+            return True
+        output_key = os.path.relpath(path, self.output_root).replace(os.sep, "/")
+        patterns = self.OUTPUT_DEPENDENCIES[dep_name] + self._extra_dependencies(dep_name) + tuple(extra_patterns)
+        if branch is not None:
+            patterns = self._branch_dependencies(patterns, branch)
+        if self.manifest.is_dirty(output_key, patterns, path):
+            return True
+        if dep_name in self.forced_outputs:
+            logger.info("被引用的定义已变化，重新生成: %s%s", path, log_tail)
+            return True
+        logger.info("输入未变化，跳过: %s%s", path, log_tail)
+        return False
+
+    def _extra_dependencies(self, dep_name):
+        """trigger 优化与空条目省略开启后，ideas 与本地化的内容还取决于对应 meta 是否为空"""
+        extra = ()
+        if dep_name == "ideas":
+            if self.trigger_plan is not None or EMPTY_STUB_MODE != "keep":
+                extra += ("meta/trigger/**",)
+            if EMPTY_STUB_MODE != "keep":
+                extra += ("meta/effect/**",)
+        elif dep_name == "localisation" and EMPTY_STUB_MODE != "keep":
+            extra += ("meta/preferences/**",)
+        return extra
+
+    def _branch_dependencies(self, patterns, branch):
+        """
+        将依赖限定在单个分支: struct/** 只取该分支，meta/<分类>/** 只取该分支法案的条目
+        trigger 优化会跨分支合并相同内容，开启时分片仍依赖全部输入
+        """
+        if self.trigger_plan is not None:
+            return patterns
+        id_prefix = self._get_full_id(branch, mod_id=self.mod_id)
+        scoped = []
+        for pattern in patterns:
+            if pattern == "struct/**":
+                scoped += [f"struct/{branch}", f"struct/{branch}/**"]
+            elif pattern.startswith("meta/") and pattern.endswith("/**"):
+                scoped.append(f"{pattern[:-3]}/{id_prefix}_*/**")
+            else:
+                scoped.append(pattern)
+        return tuple(scoped)
+
+    def _remove_stale_outputs(self, folder, file_prefix, keep):
+        """
+        移除该文件名的整体文件或分片中本次不再生成的文件 (切换 SHARD_OUTPUTS、分支被删除或分片变为空)
+        :param keep: 本次应存在的文件名
+        """
+        folder_path = os.path.join(self.output_root, "common", folder)
+        if self.branches is not None or not os.path.isdir(folder_path):
+            # 只处理部分分支时无法判断其他分支的分片是否过期
+            return
+        pattern = re.compile(re.escape(file_prefix) + _SHARD_SUFFIX)
+        for name in sorted(os.listdir(folder_path)):
+            if pattern.fullmatch(name) and name not in keep:
+                self._remove_output(os.path.join(folder_path, name))
+
+    def _commit_output(self, path, written):
+        """写入失败时从清单中撤销，保证下次重新生成"""
+        if self.manifest is not None and not written:
+            self.manifest.discard(os.path.relpath(path, self.output_root).replace(os.sep, "/"))
+
+    def build(self, report=True):
+        """
+        完整的生成流程
+        :param report: 是否输出运行报告
+        """
+        scheduler = self.prepare_build()
+        with run_profiler.stage("emit_outputs"):
+            scheduler.run()
+        self.finish_build()
+        diagnostics.log_summary()
+        if DIAGNOSTICS_DETAIL:
+            diagnostics.write_detail(os.path.join(log_manager.log_folder, "diagnostics.json"))
+        if report:
+            run_profiler.write_report(log_manager.log_folder)
+
+    def prepare_build(self):
+        """
+        导入输入并准备全部输出内容
+        :return: 尚未执行的输出任务调度器，执行后调用 finish_build
+        """
+        self.load_meta()
+        self._compile_init_plan()
+        return self._schedule_outputs(self._prepare_outputs())
+
+    def finish_build(self):
+        """输出任务完成后保存构建清单，并清理 structure 缓存中本次没有用到的记录"""
+        self.forced_outputs.clear()
+        if self.manifest is not None:
+            self.manifest.save()
+        if "structure_cache" in self.__dict__:
+            self.structure_cache.save(prune=True)
+
+    def use_inputs(self, data, meta_data, loc_overlays):
+        """
+        使用已解析的 structure、meta 与文本覆盖，不再读取 json_path 与 meta_workspace (多目标构建的变体，见 variants)
+        条目与其他变体共享，构建中只读；本地化名称同步由共享输入完成，这里不再同步与写回 meta
+        """
+        self.data = data
+        self.loc_overlays = loc_overlays
+        self.importer = MetaImporter(self.meta_workspace)
+        self.importer.meta_data = meta_data
+        self.shared_inputs = True
+
+    def reload_structure(self):
+        """
+        重新读取 structure 并重建模型，本地化数据随之重新收集 (watch 模式)
+        解析失败时直接抛出，保留内存中的旧数据，避免以空结构覆盖输出
+        """
+        with run_profiler.stage("load_json"):
+            self.data = self.structure_cache.load(self.json_path)
+        old_ids = self._model_ids()
+        with run_profiler.stage("compile_model"):
+            self.model = compile_structure(self._selected_data(), self._full_id_func(), self.colon_style)
+        self.loc_data = {}
+        # 新增或删除的法案 ID 会改变引用它们的条目的有效性
+        self.invalidate_references(old_ids ^ self._model_ids())
+        if self.manifest is not None:
+            self.manifest.drop_inputs("struct/")
+            self.manifest.collect_structure(self.data)
+
+    def reload_loc_overlays(self):
+        """重新读取各语言的文本覆盖 (watch 模式)"""
+        self.loc_overlays = self._load_loc_overlays()
+        if self.manifest is not None:
+            self.manifest.drop_inputs("overlay/")
+            self._collect_overlay_inputs()
+
+    def _collect_overlay_inputs(self):
+        for lang, texts in self.loc_overlays.items():
+            self.manifest.set_input(f"overlay/{lang}", texts)
+
+    def reload_meta_file(self, category, file_path):
+        """重新解析单个 meta 文件，只刷新该文件涉及的索引条目 (watch 模式)"""
+        old_items, new_items = self.importer.reload_file(category, file_path)
+        affected = {(item['v_full_id'], item['type']) for item in old_items + new_items}
+        for v_full_id, m_type in affected:
+            self.meta_index.remove(category, v_full_id, m_type)
+            self.ref_graph.remove_referencer(f"meta/{category}/{v_full_id}/{m_type}")
+        # 其他文件中的同名条目也可能受影响，按完整导入的覆盖顺序重新写入
+        affected_items = [
+            item for item in self.importer.meta_data[category] if (item['v_full_id'], item['type']) in affected
+        ]
+        for item in affected_items:
+            self.meta_index.set(category, item['v_full_id'], item['type'], item['meta'])
+        self._index_meta_references({category: affected_items})
+        if self._references_depend_on_bodies():
+            # 由正文变化的条目提供的 scripted ID，引用它们的输出需要重写
+            old_bodies = {(item['v_full_id'], item['type']): item['meta'] for item in old_items}
+            new_bodies = {(item['v_full_id'], item['type']): item['meta'] for item in new_items}
+            provided = set()
+            for v_full_id, m_type in affected:
+                if old_bodies.get((v_full_id, m_type)) == new_bodies.get((v_full_id, m_type)):
+                    continue
+                provided.update(self.ref_graph.provides.get(f"meta/{category}/{v_full_id}/{m_type}", ()))
+            self.invalidate_references(provided)
+        if self.manifest is not None:
+            self.manifest.drop_inputs(f"meta/{category}/")
+            self.manifest.collect_meta({category: self.importer.meta_data[category]})
 
     @staticmethod
-    def _load_json(path):
+    def _references_depend_on_bodies():
+        """
+        输出只按名称引用 scripted ID，正文变化只影响定义所在的输出 (由构建清单判断)；
+        trigger 优化会内联与合并正文，省略空条目取决于正文是否为空，此时引用方的输出也依赖正文
+        """
+        return OPTIMIZE_TRIGGERS or EMPTY_STUB_MODE != "keep"
+
+    def _model_ids(self):
+        """模型中全部分支、槽位与法案的 ID"""
+        ids = set()
+        for branch in self.model:
+            ids.add(branch.full_id)
+            for slot in branch.slots:
+                ids.add(slot.full_id)
+                ids.update(value.full_id for value in slot.values)
+        return ids
+
+    def invalidate_references(self, ids):
+        """
+        反向依赖失效: 直接或间接引用了 ids 的条目所在的输出，在下一次构建中强制重写
+        :return: 受影响的引用方键
+        """
+        log_tail = " (GenerateModFiles: invalidate_references)"
+        affected = self.ref_graph.invalidate(ids)
+        outputs = self.ref_graph.outputs_of(affected)
+        if outputs:
+            logger.info("%d 个引用方受影响，待重写输出: %s%s", len(affected), ", ".join(sorted(outputs)), log_tail)
+        self.forced_outputs.update(outputs)
+        return affected
+
+    @run_profiler.profiled("index_references")
+    def _index_meta_references(self, meta_data):
+        """将 meta 条目登记为引用图中的引用方"""
+        for category, items in meta_data.items():
+            for item in items:
+                self.ref_graph.set_references(
+                    f"meta/{category}/{item['v_full_id']}/{item['type']}", self.ref_graph.extract_refs(item['meta'])
+                )
+
+    @run_profiler.profiled("check_references")
+    def _check_references(self, scripted_id_map):
+        """
+        以模型与脚本 ID 刷新引用图中的定义并扫描手写脚本，报告悬空引用与没有被引用的 scripted ID
+        :param scripted_id_map: _collect_loc_and_scripted_ids 的返回值
+        """
+        log_tail = " (GenerateModFiles: check_references)"
+        graph = self.ref_graph
+        graph.clear_definitions()
+        graph.remove_referencers("ideas/")
+        for branch in self.model:
+            graph.define(branch.full_id, "idea_tags")
+            for slot in branch.slots:
+                graph.define(slot.full_id, "ideas")
+                for value in slot.values:
+                    v_full_id = value.full_id
+                    graph.define(v_full_id, "ideas")
+                    # 与 _iter_ideas_lines 中输出的 scripted 调用一致
+                    refs = set()
+                    if value.allowed_civil_war_flag < 0:
+                        refs.add(f"TRIGGER_{v_full_id}_allowed_cv")
+                    if value.available:
+                        refs.add(f"TRIGGER_{v_full_id}_available")
+                    for key in value.other_meta_hooks:
+                        refs.update(graph.extract_refs(OTHER_META_HOOKS[key][0].format(id=v_full_id)))
+                    graph.set_references(f"ideas/{v_full_id}", refs)
+
+        meta_categories = {"trigger": "trigger", "effect": "effect", "loc": "preferences"}
+        for mode, tuple_list in scripted_id_map.items():
+            for scripted_full_id, v_full_id, m_type in tuple_list:
+                graph.define(scripted_full_id, mode, f"meta/{meta_categories[mode]}/{v_full_id}/{m_type}")
+        graph.remove_referencers("init/")
+        if self.init_plan is not None:
+            referencer = f"init/{self.init_plan.effect}"
+            graph.define(self.init_plan.effect, "init", referencer)
+            graph.set_references(referencer, self.init_plan.ideas())
+        for path in HAND_WRITTEN_SCRIPTS:
+            if not graph.scan_script_file(path):
+                logger.info(f"跳过不存在的手写脚本: {path}{log_tail}")
+
+        for ref_id, users in graph.dangling().items():
+            if not self._in_scope(ref_id):
+                continue
+            diagnostics.add(
+                "dangling_ref", graph.group_of(users[0]), ref_id,
+                "%s 被引用但没有定义，引用方: %s%s", ref_id, ", ".join(users[:3]), log_tail
+            )
+        for ref_id in graph.unused():
+            if not self._in_scope(ref_id):
+                continue
+            diagnostics.add(
+                "unused_scripted", graph.group_of(graph.definitions[ref_id]), ref_id,
+                "%s 已定义但没有被引用%s", ref_id, log_tail
+            )
+
+    @run_profiler.profiled("get_meta_index")
+    def _get_meta_index(self):
+        self.meta_index = MetaIndex.from_meta_data(self.importer.meta_data)
+
+    def _load_json(self, path):
         log_tail = " (GenerateModFiles: load_json)"
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                return json5.load(f)
+            return self.structure_cache.load(path)
         except Exception as e:
             print(f"读取 JSON5 失败: {e}{log_tail}")
             return {}
 
+    def _load_loc_overlays(self):
+        """
+        读取 structure 同级覆盖目录中的各语言文本，解析结果与 structure 共用缓存
+        :return: {语言: {本地化键: 文本}}，按语言名排序
+        """
+        log_tail = " (GenerateModFiles: load_loc_overlays)"
+        overlays = {}
+        for lang, path in list_overlay_files(overlay_folder(self.json_path, LOC_OVERLAY_FOLDER)).items():
+            if lang == LOC_BASE_LANGUAGE:
+                logger.warning(f"{path}: 基础语言的文本来自 structure，忽略该覆盖文件{log_tail}")
+                continue
+            try:
+                texts = self.structure_cache.load_file(path)
+            except Exception as e:
+                logger.error(f"读取本地化覆盖失败 {path}: {e}{log_tail}")
+                continue
+            if not isinstance(texts, dict):
+                logger.error(f"{path}: 本地化覆盖应为 {{本地化键: 文本}}，已忽略{log_tail}")
+                continue
+            overlays[lang] = texts
+        if overlays:
+            self.structure_cache.save()
+            logger.info(f"本地化覆盖: {', '.join(overlays)}{log_tail}")
+        return overlays
+
     def _get_path(self, *sub_paths):
         full_path = os.path.join(self.output_root, *sub_paths)
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        folder = os.path.dirname(full_path)
+        if folder not in self._output_dirs:
+            os.makedirs(folder, exist_ok=True)
+            self._output_dirs.add(folder)
         return full_path
 
     @staticmethod
     def _write_file(path, lines, encoding='utf-8'):
         """
-        通用写文件方法
+        通用写文件方法，逐行流式写出
         :param path: 文件路径
-        :param lines: 文本行列表
+        :param lines: 文本行的可迭代对象 (通常为生成器)
         :param encoding: 编码格式，默认为 utf-8，本地化使用 utf-8-sig
+        :return: 是否写入成功
         """
         log_tail = " (GenerateModFiles: write_file)"
         try:
-            with open(path, 'w', encoding=encoding) as f:
-                # HOI4 本地化文件第一行通常需要声明语言
-                f.write("\n".join(lines))
+            with StreamWriter(path, encoding=encoding) as writer:
+                writer.write_lines(lines)
+            run_profiler.count("files_written")
+            run_profiler.count("lines_written", writer.line_count)
+            run_profiler.count("bytes_written", os.path.getsize(path))
             logger.info(f"已生成: {path} (Encoding: {encoding}){log_tail}")
+            return True
         except Exception as e:
             logger.error(f"写入失败 {path}: {e}{log_tail}")
+            return False
 
     @staticmethod
     def _get_full_id(b_key, id_key="", v_key="", mod_id=MOD_ID):
@@ -81,176 +571,269 @@ class GenerateModFiles:
         else:
             return mod_id
 
-    def create_idea_tags(self, file_name=f"{MOD_ID}_law_tags"):
+    def _full_id_func(self):
+        """compile_structure 使用的完整 ID 生成函数"""
+        return functools.partial(self._get_full_id, mod_id=self.mod_id)
+
+    def _scripted_file_prefix(self, mode):
+        return self.SCRIPTED_FILES[mode]['file_prefix'].format(mod_id=self.mod_id)
+
+    def _stub_fallback_id(self, mode):
+        return self.STUB_FALLBACK_IDS[mode].format(mod_id=self.mod_id)
+
+    @run_profiler.profiled("create_idea_tags")
+    def create_idea_tags(self, file_name=None):
+        file_name = file_name or f"{self.mod_id}_law_tags"
         target_path = self._get_path("common", "idea_tags", f"{file_name}.txt")
-        output = ["idea_categories = {"]
-        for b_key, b_data in self.data.items():
-            if not b_key.startswith("branch_"):
-                continue
-            output.append(f"    {self._get_full_id(b_key)} = {{")
-            ids = sorted([k for k in b_data.keys() if k.startswith("id_")], key=lambda x: int(x.split('_')[1]))
-            for id_key in ids:
-                output.append(f"        slot = {self._get_full_id(b_key, id_key)}")
-            output.append(
-                f"\n        ledger = civilian\n        cost = {b_data.get('cost', 150)}\n        removal_cost = {b_data.get('removal_cost', -1)}\n    }}")
-        output.append("}")
-        self._write_file(target_path, output)
-
-    def _apply_meta_to_structure(self, category, v_full_id, meta_type, indent_level=0, custom_tooltip=""):
-        """
-        从三层索引中精准提取 meta 内容并应用平移缩进
+        if not self._is_output_dirty("idea_tags", target_path):
+            return
+        self._commit_output(target_path, self._write_file(target_path, self._iter_idea_tags_lines()))
+
+    def _iter_idea_tags_lines(self):
+        yield "idea_categories = {"
+        for branch in self.model:
+            yield f"    {branch.full_id} = {{"
+            for slot in branch.slots:
+                yield f"        slot = {slot.full_id}"
+            yield f"\n        ledger = civilian\n        cost = {branch.cost}\n        removal_cost = {branch.tag_removal_cost}\n    }}"
+        yield "}"
+
+    def _iter_meta_lines(self, category, v_full_id, meta_type, indent_level=0, custom_tooltip="", empty_line=False):
+        """
+        从 meta 索引中精准提取 meta 内容，逐行产出平移缩进后的文本
         :param category: 分类 (effect/modifier/trigger)
         :param v_full_id: 法案 ID
         :param meta_type: 具体类型
         :param indent_level: 缩进等级
+        :param custom_tooltip: 追加在内容末尾的 tooltip 本地化键
+        :param empty_line: 内容为空时是否产出一个空行占位
         """
-        log_tail = " (GenerateModFiles: apply_meta_to_structure)"
-        # 安全地进行链式取值
-        try:
-            raw_meta = self.meta_index.get(category, {}).get(v_full_id, {}).get(meta_type, "")
-        except KeyError:
-            logger.warning(f"category: {category}, v_full_id: {v_full_id}, meta_type: {meta_type}: meta_index: 条目不存在{log_tail}")
-            raw_meta = ""
+        log_tail = " (GenerateModFiles: iter_meta_lines)"
+        raw_meta = self.meta_index.get(category, v_full_id, meta_type)
         if not raw_meta:
-            return ""
+            if empty_line:
+                yield ""
+            return
+        # 执行整体平移
+        prefix = " " * (indent_level * 4)
+        yield from iter_indented(raw_meta, prefix)
         if custom_tooltip:
             match category:
                 case "modifier":
                     if meta_type == "modifier":
-                        raw_meta += f"\ncustom_modifier_tooltip = {custom_tooltip}"
+                        yield f"{prefix}custom_modifier_tooltip = {custom_tooltip}"
                     else:
-                        logger.warning(f"category: {category}, meta_type: {meta_type} 没有 custom_tooltip 属性{log_tail}")
+                        diagnostics.add(
+                            "unsupported_tooltip", category, f"{v_full_id}/{meta_type}",
+                            "category: %s, meta_type: %s 没有 custom_tooltip 属性%s", category, meta_type, log_tail
+                        )
                 case "effect":
-                    raw_meta += f"\ncustom_effect_tooltip = {custom_tooltip}"
+                    yield f"{prefix}custom_effect_tooltip = {custom_tooltip}"
                 case _:
-                    logger.warning(f"category: {category} 没有 custom_tooltip 属性{log_tail}")
-        # 执行整体平移
-        prefix = " " * (indent_level * 4)
-        return textwrap.indent(
-            raw_meta,
-            prefix,
-            predicate=lambda line: line.strip() != ""
-        )
+                    diagnostics.add(
+                        "unsupported_tooltip", category, f"{v_full_id}/{meta_type}",
+                        "category: %s 没有 custom_tooltip 属性%s", category, log_tail
+                    )
+
+    def _scripted_shards(self, mode, tuple_list):
+        """
+        将一种 scripted 输出的条目按文件分组
+        开启 trigger 优化时条目为优化后的定义 (名称, v_full_id 或 None, 内容)，否则为 tuple_list，两者第二项均为 v_full_id
+        :return: [(分片名, 条目, 是否追加共享兜底定义)]，分片名为 None 表示不拆分；没有任何条目时为空
+        """
+        with_fallback = EMPTY_STUB_MODE == "fallback" and bool(self.pruned_stubs.get(mode))
+        if not tuple_list and not with_fallback:
+            return []
+        items = self.trigger_plan.definitions if mode == "trigger" and self.trigger_plan is not None else tuple_list
+        if not SHARD_OUTPUTS:
+            return [(None, items, with_fallback)]
+
+        branch_of = {value.full_id: branch.key for branch in self.model for slot in branch.slots for value in slot.values}
+        groups = {branch.key: [] for branch in self.model}
+        groups["common"] = []
+        for item in items:
+            groups[branch_of.get(item[1], "common")].append(item)
+        return [
+            (shard, shard_items, with_fallback and shard == "common")
+            for shard, shard_items in groups.items() if shard_items or (with_fallback and shard == "common")
+        ]
 
-    def _create_scripted_file(self, id_map):
+    @run_profiler.profiled("create_scripted_file")
+    def _create_scripted_file(self, mode, shard, items, with_fallback=False):
         """
-        根据传入的字典自动生成并填充数据的脚本文件
-        :param id_map: 格式如 {"trigger": [(scripted_full_id, v_full_id, m_type)...], ...}
+        生成并填充单个 scripted 文件
+        :param mode: trigger / effect / loc
+        :param shard: 分片名 (branch_N / common)，None 为不拆分的整体文件
+        :param items: 见 _scripted_shards
+        :param with_fallback: 是否追加 EMPTY_STUB_MODE = fallback 的共享定义
         """
         log_tail = " (GenerateModFiles: create_scripted_file)"
-        configs = {
-            "trigger": {
-                "folder": "scripted_triggers",
-                "file_prefix": f"{MOD_ID}_laws_TRIGGER",
-                "category": "trigger"
-            },
-            "effect": {
-                "folder": "scripted_effects",
-                "file_prefix": f"{MOD_ID}_laws_FUN",
-                "category": "effect"
-            },
-            "loc": {
-                "folder": "scripted_localisation",
-                "file_prefix": f"{MOD_ID}_laws_DY_LOC",
-                "category": "preferences"  # 假设 DY_LOC 的元数据存在 preferences 分类下
-            }
-        }
+        cfg = self.SCRIPTED_FILES[mode]
+        file_prefix = self._scripted_file_prefix(mode)
+        file_name = file_prefix if shard is None else f"{file_prefix}_{shard}"
+        target_path = self._get_path("common", cfg['folder'], f"{file_name}.txt")
+        branch = shard if shard not in (None, "common") else None
+        if not self._is_output_dirty(mode, target_path, branch=branch):
+            return
+        if mode == "trigger" and self.trigger_plan is not None:
+            lines = self._iter_trigger_plan_lines(items)
+        else:
+            lines = self._iter_scripted_lines(mode, cfg['category'], items)
+        if with_fallback:
+            lines = itertools.chain(lines, self._iter_stub_fallback_lines(mode))
+        self._commit_output(target_path, self._write_file(target_path, lines))
+        logger.info(f"脚本文件已生成并填充: {file_name}.txt{log_tail}")
 
-        for mode, tuple_list in id_map.items():
-            if mode not in configs or not tuple_list:
-                continue
+    def _iter_scripted_lines(self, mode, category, tuple_list):
+        for item in tuple_list:
+            # 兼容处理：支持 (scripted_id, v_id) 或 (scripted_id, v_id, m_type)
+            scripted_full_id = item[0]
+            v_full_id = item[1]
+            m_type = item[2] if len(item) > 2 else "content"  # 默认 type 名
 
-            cfg = configs[mode]
-            target_path = self._get_path("common", cfg['folder'], f"{cfg['file_prefix']}.txt")
-            category = cfg['category']
-            output = []
+            # 获取注释名
+            comment_name = self.loc_data.get(v_full_id, "LOC FIND ERROR")
 
-            for item in tuple_list:
-                # 兼容处理：支持 (scripted_id, v_id) 或 (scripted_id, v_id, m_type)
-                scripted_full_id = item[0]
-                v_full_id = item[1]
-                m_type = item[2] if len(item) > 2 else "content"  # 默认 type 名
+            if mode == "loc":
+                # --- 脚本化本地化填充 ---
+                yield f"defined_text = {{ # {comment_name}"
+                yield f"    name = {scripted_full_id}"
+                yield "    text = {"
 
-                # 获取注释名
-                comment_name = self.loc_data.get(v_full_id, "LOC FIND ERROR")
+                # 从 meta_index 提取 text 块内容
+                # 注意：这里 indent_level 为 2，因为在 defined_text -> text 内部
+                yield from self._iter_meta_lines(category, v_full_id, m_type, 2)
 
-                if mode == "loc":
-                    # --- 脚本化本地化填充 ---
-                    output.append(f"defined_text = {{ # {comment_name}")
-                    output.append(f"    name = {scripted_full_id}")
-                    output.append("    text = {")
-
-                    # 从 meta_index 提取 text 块内容
-                    # 注意：这里 indent_level 为 2，因为在 defined_text -> text 内部
-                    meta_content = self._apply_meta_to_structure(category, v_full_id, m_type, 2)
-                    if meta_content:
-                        output.append(meta_content)
-
-                    output.append("    }")
-                    output.append("}")
-                else:
-                    # --- Trigger 和 Effect 填充 ---
-                    output.append(f"{scripted_full_id} = {{ # {comment_name}")
-
-                    # 从 meta_index 提取内容并平移 1 级缩进
-                    meta_content = self._apply_meta_to_structure(category, v_full_id, m_type, 1)
-                    if meta_content:
-                        output.append(meta_content)
-                    else:
-                        output.append("")  # 保持空行
+                yield "    }"
+                yield "}"
+            else:
+                # --- Trigger 和 Effect 填充 ---
+                yield f"{scripted_full_id} = {{ # {comment_name}"
 
-                    output.append("}")
+                # 从 meta_index 提取内容并平移 1 级缩进，没有内容时保持空行
+                yield from self._iter_meta_lines(category, v_full_id, m_type, 1, empty_line=True)
 
-                output.append("")  # 条目间空行
+                yield "}"
 
-            self._write_file(target_path, output)
-            logger.info(f"脚本文件已生成并填充: {cfg['file_prefix']}.txt{log_tail}")
+            yield ""  # 条目间空行
 
-    def _create_loc_file(self, lang="simp_chinese", filename=f"{MOD_ID}_laws"):
+    def _iter_stub_fallback_lines(self, mode):
+        """EMPTY_STUB_MODE = fallback 时所有空条目共用的定义"""
+        name = self._stub_fallback_id(mode)
+        if mode == "loc":
+            yield "defined_text = { # shared"
+            yield f"    name = {name}"
+            yield "    text = {"
+            yield f"        localization_key = {self.mod_id}_law_dy_loc_fallback"
+            yield "    }"
+            yield "}"
+        else:
+            yield f"{name} = {{ # shared"
+            yield f"    {ALWAYS_TRUE}" if mode == "trigger" else ""
+            yield "}"
+        yield ""
+
+    def _remove_output(self, path):
+        log_tail = " (GenerateModFiles: remove_output)"
+        if os.path.exists(path):
+            os.remove(path)
+            logger.info(f"已移除不再需要的输出: {path}{log_tail}")
+        if self.manifest is not None:
+            self.manifest.discard(os.path.relpath(path, self.output_root).replace(os.sep, "/"))
+
+    def _iter_trigger_plan_lines(self, definitions):
+        """按优化结果输出 scripted trigger，共享 trigger 没有对应的法案名称"""
+        for name, v_full_id, body in definitions:
+            comment_name = self.loc_data.get(v_full_id, "LOC FIND ERROR") if v_full_id else "shared"
+            yield f"{name} = {{ # {comment_name}"
+            if body:
+                yield from iter_indented(body, "    ")
+            else:
+                yield ""
+            yield "}"
+            yield ""
+
+    @run_profiler.profiled("optimize_triggers")
+    def _plan_triggers(self, trigger_ids):
         """
-        根据传入的字典生成本地化文件，支持注释提取和状态标记
+        对全部 scripted trigger 执行优化
+        :param trigger_ids: scripted_id_map["trigger"]
         """
+        log_tail = " (GenerateModFiles: plan_triggers)"
+        graph = self.ref_graph
+        entries = [
+            (scripted_id, v_full_id, m_type, self.meta_index.get("trigger", v_full_id, m_type))
+            for scripted_id, v_full_id, m_type in trigger_ids
+        ]
+        optimizer = TriggerOptimizer(
+            self.mod_id,
+            # ideas 之外的引用方 (其他 meta、手写脚本) 仍需要原有的定义
+            external_refs=lambda scripted_id: any(not r.startswith("ideas/") for r in graph.dependents(scripted_id))
+        )
+        plan = optimizer.optimize(entries)
+        for key, n in plan.stats.items():
+            run_profiler.count(f"triggers_{key}", n)
+        logger.info(
+            "trigger 优化: 省略 %(dropped)d, 内联 %(inlined)d, 合并相同内容 %(deduplicated)d, "
+            "合并 has_idea 阶梯 %(ladders)d, 保留 %(kept)d%(tail)s", dict(plan.stats, tail=log_tail)
+        )
+        return plan
+
+    def _trigger_call(self, scripted_id):
+        """ideas 中对 scripted trigger 的调用文本，未开启优化时与原输出一致；None 表示省略整个块"""
+        if scripted_id in self._pruned_ids:
+            call = self._stub_call("trigger")
+            if call is None and not scripted_id.endswith("_available"):
+                # allowed_civil_war 缺省为否，空 trigger 等价于恒真
+                return ALWAYS_TRUE
+            return call
+        if self.trigger_plan is None:
+            return f"{scripted_id} = yes"
+        return self.trigger_plan.call(scripted_id)
+
+    @run_profiler.profiled("create_loc_file")
+    def _create_loc_file(self, lang=LOC_BASE_LANGUAGE, filename=None):
+        """
+        生成单个语言的本地化文件，条目已在 _prepare_outputs 中排序与转义，其他语言只替换有翻译的文本
+        """
+        filename = filename or f"{self.mod_id}_laws"
         log_tail = " (GenerateModFiles: create_loc_file)"
         lang_folder = f"{lang}"
         full_filename = f"{filename}_l_{lang}.yml"
         target_path = self._get_path("localisation", lang_folder, full_filename)
+        overlay = self.loc_overlays.get(lang)
+        extra_patterns = (f"overlay/{lang}",) if overlay is not None else ()
+        if not self._is_output_dirty("localisation", target_path, extra_patterns):
+            return
 
-        output = [f"l_{lang}:"]
-        sorted_keys = sorted(self.loc_data.keys())
-
-        for key in sorted_keys:
-            value = str(self.loc_data.get(key, ""))
-            note = ""
-
-            # --- 1. 处理纯注释逻辑 (例如 value 为 '"# 某种注释"') ---
-            if value.startswith('"# ') and value.endswith('"'):
-                comment_text = value[3:-1]
-                is_dy_loc = "DY_LOC" in comment_text
-                is_to_be_written = "TO_BE_WRITTEN" in comment_text
-
-                # --- 3. 文本清洗与格式化 ---
-                # 如果是待编写，给一个空值或保留原始占位符，否则清理转义符
-                if is_to_be_written:
-                    note = " # TODO: To be written"
-                    output.append(f'  {key}:0 ""{note}')
-                    continue
-                elif is_dy_loc:
-                    output.append(f' # {key} DY_LOC{note}')
-                    continue
-
-            # 正常文本处理：转义双引号，转换换行符
-            clean_value = value.replace('"', '\\"').replace('\n', '\\n')
-            output.append(f'  {key}:0 "{clean_value}"{note}')
-
-        self._write_file(target_path, output, encoding='utf-8-sig')
+        lines = self.loc_entries.iter_lines(lang, overlay)
+        self._commit_output(target_path, self._write_file(target_path, lines, encoding='utf-8-sig'))
         logger.info(f"本地化文件已生成: {full_filename}{log_tail}")
 
-    def validate_and_sync_localization(self):
+    def _check_translations(self):
+        """按本地化键索引检查各语言缺失的翻译与已不存在的键"""
+        log_tail = " (GenerateModFiles: check_translations)"
+        entries = self.loc_entries
+        for lang, overlay in self.loc_overlays.items():
+            missing = entries.missing_keys(overlay)
+            unknown = entries.unknown_keys(overlay)
+            for key in missing:
+                diagnostics.add(
+                    "missing_translation", lang, key, "%s: %s 没有翻译，使用 %s 的文本%s", lang, key, LOC_BASE_LANGUAGE, log_tail
+                )
+            for key in unknown:
+                diagnostics.add("unknown_translation", lang, key, "%s: %s 不是当前的本地化键%s", lang, key, log_tail)
+            translated = len(entries.key_index) - len(missing)
+            logger.info(f"{lang}: 已翻译 {translated}/{len(entries.key_index)}，多余 {len(unknown)}{log_tail}")
+
+    @run_profiler.profiled("validate_and_sync_localization")
+    def validate_and_sync_localization(self, write_back=True):
         """
         自检方法：追踪 Meta 与本地化数据的一致性
         1. 当 Meta 名称为空但 Loc 中有值时，自动填充 Meta 索引。
         2. 当两者名称不匹配时，输出警告（条目可能被修改或移动）。
         3. 当 Meta 中的 ID 在 Loc 中不存在时，输出警告（条目可能被删除）。
+        :param write_back: 为 False 时只报告，不写回 meta
         """
         log_tail = " (GenerateModFiles: validate_and_sync_localization)"
         logger.info(f"--- 开始meta数据本地化自检 ---{log_tail}")
@@ -260,231 +843,445 @@ class GenerateModFiles:
         mismatch_count = 0  # 名字不匹配计数
         mismatch_count_solved = 0
         missing_count = 0  # ID 缺失计数
+        synced_items = []
+        # 本次仍未同步的法案，下次继续比较
+        pending = set()
 
-        # 遍历 MetaImporter 导入的原始列表
+        # 写回时只比较上次同步后可能变化的条目；只检查时比较全部条目，报告不依赖上次同步的结果
         # 结构: {"category": [{"v_full_id": "...", "v_name": "...", ...}, ...]}
-        for category, items in self.importer.meta_data.items():
-            for i in range(len(items)):
-                item = items[i]
-                v_id = item['v_full_id']
-                # 脚本中的注释名
-                script_name = item.get('v_name', "").strip()
-                if script_name == "None":
-                    script_name = ""
-                # 内存中现有的本地化文本（由 create_loc_file 或加载过程更新）
-                loc_name = self.loc_data.get(v_id, "").strip()
-
-                # 1. 检查 ID 是否存在于本地化字典中
-                if v_id not in self.loc_data:
-                    logger.warning(f"category: {category}: ID: {v_id} 在本地化数据中未找到本地化，该条目可能已被删除{log_tail}")
-                    missing_count += 1
-                    continue
+        sources = self.importer.source_revisions()
+        candidates = self._sync_candidates(sources, full=not write_back)
+        total = sum(len(items) for items in self.importer.meta_data.values())
+        logger.info(f"比较 {len(candidates)}/{total} 个条目{log_tail}")
+        for category, item in candidates:
+            v_id = item['v_full_id']
+            # 脚本中的注释名
+            script_name = item.get('v_name', "").strip()
+            if script_name == "None":
+                script_name = ""
+            # 内存中现有的本地化文本（由 create_loc_file 或加载过程更新）
+            loc_name = self.loc_data.get(v_id, "").strip()
 
-                # 2. 自动填充逻辑：Meta 为空，Loc 有值
-                if not script_name and loc_name:
-                    item['v_name'] = loc_name
-                    # 同时更新索引中的数据，确保写入脚本时带上注释
-                    if v_id in self.meta_index.get(category, {}):
-                        # 这里假设你索引里也存了 v_name，或者你之后会根据 item 重新构建索引
-                        pass
-                    logger.info(f"category: {category}: ID: {v_id} 已同步本地化名称 '{loc_name}'{log_tail}")
-                    self.importer.meta_data[category][i]["changed"] = True
-                    changed = True
-                    sync_count += 1
-                    continue
+            # 1. 检查 ID 是否存在于本地化字典中
+            if v_id not in self.loc_data:
+                diagnostics.add(
+                    "missing_loc", category, f"{v_id}/{item['type']}",
+                    "category: %s: ID: %s 在本地化数据中未找到本地化，该条目可能已被删除%s", category, v_id, log_tail
+                )
+                missing_count += 1
+                pending.add(v_id)
+                continue
 
-                # 3. 比较名称是否一致
-                # 只要 script_name 有值且与 loc_name 不同，就触发警告
-                if script_name and script_name != loc_name:
-                    log_warning_info = f"category: {category}: ID: {v_id} 与配置文件数据不一致\n"
-                    log_warning_info += f"  -> 脚本注释: '{script_name}'\n"
-                    log_warning_info += f"  -> 本地化文本: '{loc_name}'\n"
-                    log_warning_info += "该条目可能已被修改、移动或设置为动态文本，将优先使用配置文件数据\n{log_tail}"
-                    logger.warning(log_warning_info)
-                    mismatch_count += 1
-                    item['v_name'] = loc_name
-                    mismatch_count_solved += 1
-                    logger.info(f"category: {category}: ID: {v_id} 已同步本地化名称 '{loc_name}'{log_tail}")
-                    self.importer.meta_data[category][i]["changed"] = True
-                    changed = True
-                    sync_count += 1
-
-        if changed:
+            # 2. 自动填充逻辑：Meta 为空，Loc 有值
+            if not script_name and loc_name:
+                item['v_name'] = loc_name
+                synced_items.append((category, item))
+                diagnostics.add(
+                    "loc_name_synced", category, f"{v_id}/{item['type']}",
+                    "category: %s: ID: %s 已同步本地化名称 '%s'%s", category, v_id, loc_name, log_tail,
+                    level=logging.INFO
+                )
+                item["changed"] = True
+                changed = True
+                sync_count += 1
+                continue
+
+            # 3. 比较名称是否一致
+            # 只要 script_name 有值且与 loc_name 不同，就触发警告
+            if script_name and script_name != loc_name:
+                diagnostics.add(
+                    "loc_name_mismatch", category, f"{v_id}/{item['type']}",
+                    "category: %s: ID: %s 与配置文件数据不一致\n"
+                    "  -> 脚本注释: '%s'\n"
+                    "  -> 本地化文本: '%s'\n"
+                    "该条目可能已被修改、移动或设置为动态文本，将优先使用配置文件数据%s",
+                    category, v_id, script_name, loc_name, log_tail
+                )
+                mismatch_count += 1
+                item['v_name'] = loc_name
+                mismatch_count_solved += 1
+                synced_items.append((category, item))
+                item["changed"] = True
+                changed = True
+                sync_count += 1
+
+        if changed and not write_back:
+            logger.info(f"自检报告: 待同步 {sync_count} 条, 冲突 {mismatch_count} 条, 缺失 {missing_count} 条 (未写回){log_tail}")
+        elif changed:
             logger.info(f"自检报告: 同步 {sync_count} 条, 冲突/解决 {mismatch_count}/{mismatch_count_solved} 条, 缺失 {missing_count} 条{log_tail}")
-            self.importer.update_meta_files()
-            self._get_meta_index()
+            # 只写回被同步条目的 header，并只增量刷新这些索引条目，无需重建整个索引
+            self.importer.update_meta_files([item for _, item in synced_items])
+            for category, item in synced_items:
+                self.meta_index.set(category, item['v_full_id'], item['type'], item['meta'])
+            # 已写回的条目下次再确认一次 (写回可能失败)
+            pending.update(item['v_full_id'] for _, item in synced_items)
+            sources = self.importer.source_revisions()
         else:
             logger.info(f"自检报告: 未发现问题{log_tail}")
 
-    def create_ideas(self, file_name=f"{MOD_ID}_laws"):
-        target_path = self._get_path("common", "ideas", f"{file_name}.txt")
-        output = ["ideas = {"]
+        # 只检查时 meta 未写回，只处理部分分支时 meta 不完整，两者都不记录同步状态
+        state = self.loc_sync_state
+        if write_back and self.branches is None and not state.is_current(self.loc_data, sources, pending):
+            state.update(self.loc_data, sources, pending)
+            state.save()
+
+    def _sync_candidates(self, sources, full=False):
+        """
+        需要比较名称的条目: 来源文件版本变化的全部条目，以及本地化文本变化或上次未同步的法案的条目
+        没有同步状态时为全部条目；按导入顺序返回 [(category, item)]
+        :param sources: MetaImporter.source_revisions()
+        :param full: 不使用同步状态，返回全部条目
+        """
+        file_items = self.importer.file_items
+        if full:
+            return [(category, item) for category, items in file_items.values() for item in items]
+        state = self.loc_sync_state
+        changed_files = state.changed_sources(sources)
+        changed_ids = state.changed_loc_keys(self.loc_data)
+        changed_ids.update(state.pending)
+        candidates = []
+        for file_path, (category, items) in file_items.items():
+            if file_path in changed_files:
+                candidates += [(category, item) for item in items]
+            elif changed_ids:
+                candidates += [(category, item) for item in items if item['v_full_id'] in changed_ids]
+        return candidates
+
+    def _collect_loc_and_scripted_ids(self):
+        """
+        从模型中收集本地化条目与需要生成的脚本 ID
+        :return: 格式如 {"trigger": [(scripted_full_id, v_full_id, m_type)...], ...}
+        """
         scripted_id_map = {
             "trigger": [],
             "effect": [],
             "loc": []
         }
-        scripted_full_id: str
+        for branch in self.model:
+            self.loc_data.setdefault(branch.full_id, branch.name)
+            for slot in branch.slots:
+                self.loc_data.setdefault(slot.full_id, slot.name)
+                for value in slot.values:
+                    v_full_id = value.full_id
+                    if value.loc_name:
+                        self.loc_data.setdefault(v_full_id, value.loc_name)
+                    else:
+                        scripted_id_map["loc"].append((f"get_{v_full_id}", v_full_id, "loc"))
+                        self.loc_data.setdefault(v_full_id, DY_LOC)
+                    if value.desc:
+                        self.loc_data.setdefault(f"{v_full_id}_desc", value.desc)
+                    else:
+                        scripted_id_map["loc"].append((f"get_{v_full_id}_desc", v_full_id, "desc"))
+                        self.loc_data.setdefault(f"{v_full_id}_desc", DY_LOC)
 
-        for b_key, b_data in self.data.items():
-            if not b_key.startswith("branch_"):
-                continue
+                    if value.allowed_civil_war_flag < 0:
+                        scripted_id_map["trigger"].append((f"TRIGGER_{v_full_id}_allowed_cv", v_full_id, "allowed_cv"))
+                    if value.available:
+                        scripted_id_map["trigger"].append((f"TRIGGER_{v_full_id}_available", v_full_id, "available"))
+                    if value.custom_modifier_tooltip:
+                        self.loc_data.setdefault(f"{v_full_id}_modifier_tooltip", "")
 
-            b_cost = b_data.get("cost", 150)
-            b_rem_cost = b_data.get("removal_cost", 0)
-            self.loc_data.setdefault(self._get_full_id(b_key), b_data.get("name", "Unknown Value"))
+                    for key in value.other_meta_hooks:
+                        _, mode, suffix = OTHER_META_HOOKS[key]
+                        # meta 类型为去掉下划线的后缀
+                        scripted_id_map[mode].append((self._hook_scripted_id(key, v_full_id), v_full_id, suffix[1:]))
+        return scripted_id_map
 
-            ids = sorted([k for k in b_data.keys() if k.startswith("id_")], key=lambda x: int(x.split('_')[1]))
+    @staticmethod
+    def _hook_scripted_id(key, v_full_id):
+        """other_meta 钩子对应的 scripted ID，根据脚本类型判定前缀名（EFFECT_ 或 TRIGGER_）"""
+        _, mode, suffix = OTHER_META_HOOKS[key]
+        id_prefix = "EFFECT" if mode == "effect" else "TRIGGER"
+        return f"{id_prefix}_{v_full_id}{suffix}"
 
-            for id_key in ids:
-                id_data = b_data[id_key]
-                id_name = id_data.get("name", "Unknown Value")
-                self.loc_data.setdefault(self._get_full_id(b_key, id_key), id_name)
-                # 槽位名，例如 NIE_branch_1_id_1_laws
-                output.append(f"    {self._get_full_id(b_key, id_key)} = {{ # {id_name}")
-                output.append("        law = yes")
-                output.append("        use_list_view = yes\n")
-
-                values = sorted([k for k in id_data.keys() if k.startswith("value_")],
-                                key=lambda x: int(x.split('_')[1]))
-                for v_key in values:
-                    v_data = id_data[v_key]
-                    v_name = v_data.get("name")
-                    if v_name == "":
-                        v_name = '"# TO_BE_WRITTEN"'
-                    v_desc = v_data.get("desc")
-                    if v_desc == "":
-                        v_desc = '"# TO_BE_WRITTEN"'
-                    use_id_name = v_data.get("use_id_name", True)
-                    v_full_id = self._get_full_id(b_key, id_key, v_key)
-                    if v_name:
-                        v_full_name = f"{id_name}{COLON_STYLE}{v_name}" if use_id_name else v_name
-                        self.loc_data.setdefault(v_full_id, v_full_name)
-                        output.append(f"        {v_full_id} = {{ # {v_full_name}")
+    @run_profiler.profiled("prune_empty_stubs")
+    def _prune_empty_stubs(self, scripted_id_map):
+        """
+        按 EMPTY_STUB_MODE 找出没有 meta 内容的 scripted 条目
+        skip 模式下 DY_LOC 改为待编写的静态本地化键，fallback 模式下指向共享的动态文本
+        :return: 去掉被省略条目后的 scripted_id_map
+        """
+        log_tail = " (GenerateModFiles: prune_empty_stubs)"
+        self.pruned_stubs = {mode: [] for mode in scripted_id_map}
+        self._pruned_ids = set()
+        if EMPTY_STUB_MODE == "keep":
+            return scripted_id_map
+
+        meta_categories = {"trigger": "trigger", "effect": "effect", "loc": "preferences"}
+        kept_map = {}
+        for mode, tuple_list in scripted_id_map.items():
+            kept_map[mode] = []
+            for entry in tuple_list:
+                scripted_full_id, v_full_id, m_type = entry
+                if self.meta_index.get(meta_categories[mode], v_full_id, m_type):
+                    kept_map[mode].append(entry)
+                    continue
+                self.pruned_stubs[mode].append(entry)
+                self._pruned_ids.add(scripted_full_id)
+                diagnostics.add(
+                    "pruned_stub", mode, scripted_full_id, "%s 没有 meta 内容，已省略%s", scripted_full_id, log_tail,
+                    level=logging.INFO
+                )
+                if mode == "loc":
+                    # get_<本地化键>
+                    loc_key = scripted_full_id[len("get_"):]
+                    if EMPTY_STUB_MODE == "fallback":
+                        self.loc_data[loc_key] = f"[{self._stub_fallback_id('loc')}]"
                     else:
-                        scripted_full_id = f"get_{v_full_id}"
-                        scripted_id_map["loc"].append((scripted_full_id, v_full_id, "loc"))
-                        self.loc_data.setdefault(v_full_id, '"# DY_LOC"')
-                        output.append(f"        {v_full_id} = {{ # DY_LOC")
-                    if v_desc:
-                        self.loc_data.setdefault(f"{v_full_id}_desc", v_desc)
+                        self.loc_data[loc_key] = TO_BE_WRITTEN
+        if EMPTY_STUB_MODE == "fallback" and self.pruned_stubs["loc"]:
+            self.loc_data.setdefault(f"{self.mod_id}_law_dy_loc_fallback", TO_BE_WRITTEN)
+
+        pruned = {mode: len(entries) for mode, entries in self.pruned_stubs.items() if entries}
+        for mode, n in pruned.items():
+            run_profiler.count(f"pruned_{mode}_stubs", n)
+        logger.info(f"空条目处理 ({EMPTY_STUB_MODE}): {pruned or '无'}{log_tail}")
+        return kept_map
+
+    def _stub_call(self, mode):
+        """被省略的空条目在 ideas 中的调用，skip 模式下为 None"""
+        if EMPTY_STUB_MODE == "fallback":
+            return f"{self._stub_fallback_id(mode)} = yes"
+        return None
+
+    def _hook_call(self, key, v_full_id):
+        """ideas 中 other_meta 钩子的调用文本，None 表示省略该钩子"""
+        template, mode, _ = OTHER_META_HOOKS[key]
+        scripted_id = self._hook_scripted_id(key, v_full_id)
+        if scripted_id in self._pruned_ids:
+            return self._stub_call(mode)
+        if mode == "trigger" and self.trigger_plan is not None:
+            # 与 available 等一致: 优化后的钩子可能被内联、合并或省略 (恒真时输出 always = yes)
+            return self.trigger_plan.call(scripted_id)
+        return template.format(id=v_full_id)
+
+    def _iter_trigger_calls(self, value):
+        """ideas 中该法案实际输出的全部 trigger 调用文本 (与 _iter_ideas_lines 一致)"""
+        v_full_id = value.full_id
+        calls = []
+        if value.allowed_civil_war_flag < 0:
+            calls.append(self._trigger_call(f"TRIGGER_{v_full_id}_allowed_cv"))
+        if value.available:
+            calls.append(self._trigger_call(f"TRIGGER_{v_full_id}_available"))
+        for key in value.other_meta_hooks:
+            if OTHER_META_HOOKS[key][1] == "trigger":
+                calls.append(self._hook_call(key, v_full_id))
+        return [call for call in calls if call is not None]
+
+    def _check_trigger_calls(self, trigger_ids):
+        """
+        空条目省略与 trigger 优化之后，核对 ideas 实际调用的 TRIGGER_ ID 都有输出的定义
+        :param trigger_ids: 省略空条目后的 scripted_id_map["trigger"]
+        """
+        log_tail = " (GenerateModFiles: check_trigger_calls)"
+        if self.trigger_plan is not None:
+            emitted = {name for name, _, _ in self.trigger_plan.definitions}
+        else:
+            emitted = {scripted_id for scripted_id, _, _ in trigger_ids}
+        if EMPTY_STUB_MODE == "fallback" and self.pruned_stubs.get("trigger"):
+            emitted.add(self._stub_fallback_id("trigger"))
+        graph = self.ref_graph
+        for branch in self.model:
+            for slot in branch.slots:
+                for value in slot.values:
+                    for ref_id in sorted(graph.extract_refs("\n".join(self._iter_trigger_calls(value)))):
+                        # 手写脚本等其他来源的定义同样有效
+                        if not ref_id.startswith("TRIGGER_") or ref_id in emitted \
+                                or graph.definitions.get(ref_id, "trigger") != "trigger":
+                            continue
+                        diagnostics.add(
+                            "dangling_ref", "ideas", ref_id,
+                            "%s 在 ideas 中被调用但没有输出定义，引用方: ideas/%s%s", ref_id, value.full_id, log_tail
+                        )
+
+    def _iter_ideas_lines(self, branches):
+        """按模型逐行产出 ideas 文件文本"""
+        yield "ideas = {"
+        for branch in branches:
+            for slot in branch.slots:
+                # 槽位名，例如 NIE_branch_1_id_1_laws
+                yield f"    {slot.full_id} = {{ # {slot.name}"
+                yield "        law = yes"
+                yield "        use_list_view = yes\n"
+
+                for value in slot.values:
+                    v_full_id = value.full_id
+                    if value.loc_name:
+                        yield f"        {v_full_id} = {{ # {value.loc_name}"
                     else:
-                        scripted_full_id = f"get_{v_full_id}_desc"
-                        scripted_id_map["loc"].append((scripted_full_id, v_full_id, "desc"))
-                        self.loc_data.setdefault(f"{v_full_id}_desc", '"# DY_LOC"')
+                        yield f"        {v_full_id} = {{ # DY_LOC"
 
                     # 1. Level & Default & cancel_if_invalid
-                    if v_data.get("level", 0) > 0:
-                        output.append(f"            level = {v_data['level']}")
-                    if v_data.get("default", False):
-                        output.append("            default = yes")
-                        output.append("            cancel_if_invalid = no")
-                    elif v_data.get("cancel_if_invalid", False):
-                        output.append("            cancel_if_invalid = yes")
+                    if value.level > 0:
+                        yield f"            level = {value.level}"
+                    if value.default:
+                        yield "            default = yes"
+                        yield "            cancel_if_invalid = no"
+                    elif value.cancel_if_invalid:
+                        yield "            cancel_if_invalid = yes"
 
                     # 2. Allowed Civil War
-                    acw = v_data.get("allowed_civil_war_flag", 1)
+                    acw = value.allowed_civil_war_flag
                     if acw > 0:
-                        output.append("            allowed_civil_war = { always = yes }")
+                        yield "            allowed_civil_war = { always = yes }"
                     elif acw < 0:
-                        scripted_full_id = f"TRIGGER_{v_full_id}_allowed_cv"
-                        scripted_id_map["trigger"].append((scripted_full_id, v_full_id, "allowed_cv"))
-                        output.append(f"            allowed_civil_war = {{ {scripted_full_id} = yes }}")
+                        yield f"            allowed_civil_war = {{ {self._trigger_call(f'TRIGGER_{v_full_id}_allowed_cv')} }}"
 
-                    # 3. Available
-                    if v_data.get("available", True):
-                        scripted_full_id = f"TRIGGER_{v_full_id}_available"
-                        scripted_id_map["trigger"].append((scripted_full_id, v_full_id, "available"))
-                        output.append(f"            available = {{ {scripted_full_id} = yes }}")
+                    # 3. Available (优化后恒为真的 available 省略)
+                    if value.available:
+                        call = self._trigger_call(f"TRIGGER_{v_full_id}_available")
+                        if call is not None:
+                            yield f"            available = {{ {call} }}"
 
                     # 4. Cost 逻辑
-                    v_cost = v_data.get("cost", b_cost)
-                    if v_cost != b_cost and v_cost >= 0:
-                        output.append(f"            cost = {v_cost}")
-                    v_rem = v_data.get("removal_cost", b_rem_cost)
-                    if v_rem != b_rem_cost and v_rem >= 0:
-                        output.append(f"            removal_cost = {v_rem}")
+                    if value.cost is not None:
+                        yield f"            cost = {value.cost}"
+                    if value.removal_cost is not None:
+                        yield f"            removal_cost = {value.removal_cost}"
 
                     # 5.6. Modifier,Tooltip
-                    custom_modifier_tooltip = f"{v_full_id}_tooltip" if v_data.get("custom_modifier_tooltip") else ""
-                    if custom_modifier_tooltip:
-                        self.loc_data.setdefault(f"{v_full_id}_modifier_tooltip", "")
-                    output.append("            modifier = {")
-                    output.append(
-                        self._apply_meta_to_structure("modifier", v_full_id, "modifier", 4, custom_modifier_tooltip)
-                    )
-                    output.append("            }")
+                    yield "            modifier = {"
+                    yield from self._iter_meta_lines("modifier", v_full_id, "modifier", 4,
+                                                     value.custom_modifier_tooltip, empty_line=True)
+                    yield "            }"
 
                     # 7. Other Meta (同级脚本块)
-                    other_meta = v_data.get("other_meta", {})
-                    # 假设在调用此段代码前，你已经初始化了：
-                    # scripted_id_map = {"trigger": [], "effect": [], "loc": []}
-
-                    mapping = {
-                        "on_add": {"template": "FUN_{id}_on_add = yes", "mode": "effect", "suffix": "_on_add"},
-                        "on_remove": {"template": "FUN_{id}_on_remove = yes", "mode": "effect", "suffix": "_on_remove"},
-                        "do_effect": {"template": "TRIGGER_{id}_do_effect = yes", "mode": "trigger",
-                                      "suffix": "_do_effect"},
-                        "allowed": {"template": "TRIGGER_{id}_allowed = yes", "mode": "trigger", "suffix": "_allowed"},
-                        "allowed_to_remove": {"template": "TRIGGER_{id}_allowed_rm = yes", "mode": "trigger",
-                                              "suffix": "_allowed_rm"},
-                        "visible": {"template": "TRIGGER_{id}_visible = yes", "mode": "trigger", "suffix": "_visible"}
-                    }
-
-                    for key, cfg in mapping.items():
-                        val = other_meta.get(key)
-                        if val and val is not False:
-                            # 1. 生成用于 ideas 文件的脚本行
-                            formatted_line = f"            {key} = {{ {cfg['template'].format(id=v_full_id)} }}"
-                            output.append(formatted_line)
-
-                            # 2. 提取并记录对应的 scripted_full_id
-                            # 根据前缀判定前缀名（FUN_ 或 TRIGGER_）
-                            id_prefix = "EFFECT" if cfg['mode'] == "effect" else "TRIGGER"
-                            scripted_full_id = f"{id_prefix}_{v_full_id}{cfg['suffix']}"
-
-                            # 3. 保证正确添加到字典中
-                            if cfg['mode'] in scripted_id_map:
-                                scripted_id_map[cfg['mode']].append((scripted_full_id, v_full_id, "cfg['suffix']"))
+                    for key in value.other_meta_hooks:
+                        call = self._hook_call(key, v_full_id)
+                        if call is not None:
+                            yield f"            {key} = {{ {call} }}"
 
                     # 8. Bonus Blocks
-                    for bonus_type in ["research_bonus", "equipment_bonus"]:
-                        bonus_meta = other_meta.get(bonus_type, "").strip()
-                        if bonus_meta:
-                            output.append(f"            {bonus_type} = {{")
-                            output.append(
-                                self._apply_meta_to_structure("preferences", v_full_id, bonus_type, 4)
-                            )
-                            output.append("            }")
+                    for bonus_type in value.bonus_types:
+                        yield f"            {bonus_type} = {{"
+                        yield from self._iter_meta_lines("preferences", v_full_id, bonus_type, 4, empty_line=True)
+                        yield "            }"
 
                     # 9. Ai will do
-                    ai_will_do = v_data.get("ai_will_do", {"base": 1.0, "preferences": True})
-                    ai_preferences_base = ai_will_do.get("base", -1.0)
-                    ai_preferences_factor = ai_will_do.get("factor", -1.0)
-                    ai_preferences_meta = ai_will_do.get("preferences", False)
-                    if (ai_preferences_base >= 0) ^ (ai_preferences_factor >= 0):
-                        ai_preferences_value = f"base = {ai_preferences_base}" if ai_preferences_base >= 0 else f"factor = {ai_preferences_factor}"
-                    else:
-                        ai_preferences_value = "base = 1"
-                        logging.warning(f"GenerateModFiles: {v_full_id}: Ai will do base属性和factor属性同时出现，已重置为base = 1")
-                    output.append("            ai_will_do = {")
-                    output.append(f"                {ai_preferences_value}")
-                    if ai_preferences_meta:
-                        output.append(self._apply_meta_to_structure("preferences", v_full_id, "preferences", 5))
-                    output.append("            }")
-
-                    output.append("        }\n")
-                output.append("    }")
-
-        output.append("}")
-        self._write_file(target_path, output)
-        self._create_loc_file()
-        # _create_scripted_file必须在_create_loc_file后
+                    yield "            ai_will_do = {"
+                    yield f"                {value.ai_will_do_line}"
+                    if value.ai_preferences:
+                        yield from self._iter_meta_lines("preferences", v_full_id, "preferences", 5, empty_line=True)
+                    yield "            }"
+
+                    yield "        }\n"
+                yield "    }"
+
+        yield "}"
+
+    @run_profiler.profiled("prepare_outputs")
+    def _prepare_outputs(self):
+        """
+        收集本地化与脚本 ID、检查引用、省略空条目并规划 trigger 优化，之后各输出文件的生成相互独立
+        :return: 需要生成的脚本 ID，格式同 _collect_loc_and_scripted_ids
+        """
+        scripted_id_map = self._collect_loc_and_scripted_ids()
+        self._check_references(scripted_id_map)
+        scripted_id_map = self._prune_empty_stubs(scripted_id_map)
+        self.trigger_plan = self._plan_triggers(scripted_id_map["trigger"]) if OPTIMIZE_TRIGGERS else None
+        self._check_trigger_calls(scripted_id_map["trigger"])
+        # 本地化条目只排序、转义一次，供全部语言使用
+        self.loc_entries = LocEntries(self.loc_data)
+        self._check_translations()
+        return scripted_id_map
+
+    def _schedule_outputs(self, scripted_id_map):
+        """
+        输出任务图: 除本地化名称同步须在 scripted 文件之前完成外，其余输出互不依赖
+        拆分输出时每个分片是一个任务，共享只读的模型与 meta 索引；idea_tags 与本地化由模型按固定顺序生成，
+        结果与分片的完成顺序无关
+        """
+        scheduler = TaskScheduler(EMIT_WORKERS)
+        scheduler.add("idea_tags", self.create_idea_tags)
+        ideas_prefix = f"{self.mod_id}_laws"
+        if SHARD_OUTPUTS:
+            for branch in self.model:
+                scheduler.add(f"ideas/{branch.key}", functools.partial(self.create_ideas, ideas_prefix, branch))
+            self._remove_stale_outputs("ideas", ideas_prefix, {f"{ideas_prefix}_{branch.key}.txt" for branch in self.model})
+        else:
+            scheduler.add("ideas", functools.partial(self.create_ideas, ideas_prefix))
+            self._remove_stale_outputs("ideas", ideas_prefix, {f"{ideas_prefix}.txt"})
+        for lang in (LOC_BASE_LANGUAGE, *self.loc_overlays):
+            scheduler.add(f"localisation/{lang}", functools.partial(self._create_loc_file, lang))
+        scheduler.add("init", self.create_init_effect)
+        sync_after = ()
+        if not self.shared_inputs:
+            scheduler.add("loc_sync", self.validate_and_sync_localization)
+            sync_after = ("loc_sync",)
+        for mode, tuple_list in scripted_id_map.items():
+            cfg = self.SCRIPTED_FILES[mode]
+            shards = self._scripted_shards(mode, tuple_list)
+            for shard, items, with_fallback in shards:
+                scheduler.add(
+                    mode if shard is None else f"{mode}/{shard}",
+                    functools.partial(self._create_scripted_file, mode, shard, items, with_fallback), after=sync_after
+                )
+            file_prefix = self._scripted_file_prefix(mode)
+            self._remove_stale_outputs(cfg['folder'], file_prefix, {
+                f"{file_prefix}.txt" if shard is None else f"{file_prefix}_{shard}.txt"
+                for shard, _, _ in shards
+            })
+        return scheduler
+
+    @run_profiler.profiled("create_ideas")
+    def create_ideas(self, file_name=None, branch=None):
+        """
+        :param branch: 只输出该分支，文件名为 <file_name>_<分支>.txt；为 None 时输出全部分支
+        """
+        file_name = file_name or f"{self.mod_id}_laws"
+        if branch is None:
+            target_path = self._get_path("common", "ideas", f"{file_name}.txt")
+            branches, scope = self.model, None
+        else:
+            target_path = self._get_path("common", "ideas", f"{file_name}_{branch.key}.txt")
+            branches, scope = (branch,), branch.key
+        if self._is_output_dirty("ideas", target_path, branch=scope):
+            self._commit_output(target_path, self._write_file(target_path, self._iter_ideas_lines(branches)))
+
+    def check(self):
+        """
+        只检查不输出: 引用、空条目、翻译与本地化一致性，meta 不会被写回
+        :return: 是否存在警告级别的诊断
+        """
+        log_tail = " (GenerateModFiles: check)"
+        self.load_meta()
+        if self.branches is None:
+            self._compile_init_plan()
+        else:
+            # 开局规则会引用其他分支的法案
+            logger.info(f"只检查分支 {', '.join(sorted(self.branches))}，跳过开局初始法案{log_tail}")
+        self._prepare_outputs()
+        self.validate_and_sync_localization(write_back=False)
+        diagnostics.log_summary()
+        return diagnostics.max_level() >= logging.WARNING
+
+    def sync_localization(self):
+        """只执行本地化名称同步并写回 meta，不生成输出"""
+        self.load_meta()
+        self._collect_loc_and_scripted_ids()
         self.validate_and_sync_localization()
-        self._create_scripted_file(scripted_id_map)
+
+    @run_profiler.profiled("compile_init_plan")
+    def _compile_init_plan(self):
+        log_tail = " (GenerateModFiles: compile_init_plan)"
+        self.init_plan = compile_init_rules(self.data.get("init_rules"), self.model, f"{self.mod_id}_law_init")
+        if self.init_plan is not None:
+            logger.info(f"开局初始法案: {self.init_plan.rule_count} 条规则{log_tail}")
+
+    @run_profiler.profiled("create_init_effect")
+    def create_init_effect(self, file_name=None):
+        """由 init_rules 生成开局初始法案的 scripted effect，未配置时不生成"""
+        file_name = file_name or f"{self.mod_id}_law_init_FUN"
+        if self.init_plan is None:
+            return
+        target_path = self._get_path("common", "scripted_effects", f"{file_name}.txt")
+        if not self._is_output_dirty("init", target_path):
+            return
+        self._commit_output(target_path, self._write_file(target_path, iter_init_effect_lines(self.init_plan)))
 
 
 if __name__ == "__main__":
-    parser = GenerateModFiles(JSON5_PATH, OUTPUT_ROOT)
-    parser.create_idea_tags()
-    parser.create_ideas()
+    log_manager.init_logger(level=logging.DEBUG, log_folder="pdx_logs", async_mode=ASYNC_LOGGING)
+    run_profiler.start(trace_memory=PROFILE_MEMORY)
+    parser = GenerateModFiles(JSON5_PATH, OUTPUT_ROOT, incremental=INCREMENTAL_BUILD)
+    parser.build()
@@ -0,0 +1,202 @@
+"""
+开局初始法案
+由 structure.json5 中的 init_rules 表生成 scripted effect。条件分组按顺序展开为决策树，
+每个国家在每条路径上每个条件最多判断一次，每个结果只输出一次合并的 add_ideas，
+结果与条件无关时不输出该条件的判断。
+
+init_rules 格式:
+    effect: 生成的 scripted effect 名称
+    predicates: {分组: {选项: 条件}}，组内选项互斥，依次输出为 if / else_if；条件为 "else" 表示以上都不满足
+    rules: [{分组: 选项, ..., set: {"branch_1/id_1": 值编号}}]，省略的分组表示不限；
+           同一国家满足多条规则时按声明顺序生效，后声明的覆盖之前的
+"""
+from dataclasses import dataclass, field
+
+from diagnostics import diagnostics
+
+ELSE = "else"
+
+
+@dataclass
+class InitNode:
+    """决策树节点: 在进入子分支之前添加的法案，以及一组互斥的子分支 [(条件或 None 表示 else, 子节点)]"""
+    ideas: dict = field(default_factory=dict)
+    chain: list = field(default_factory=list)
+
+    def is_empty(self):
+        return not self.ideas and not self.chain
+
+
+@dataclass(frozen=True)
+class InitPlan:
+    effect: str
+    root: InitNode
+    rule_count: int
+
+    def ideas(self):
+        """决策树中添加的全部法案 ID"""
+        found = set()
+        pending = [self.root]
+        while pending:
+            node = pending.pop()
+            found.update(node.ideas.values())
+            pending.extend(child for _, child in node.chain)
+        return found
+
+
+def _resolve_ideas(rule_index, slot_map, value_ids):
+    """将 {"branch_1/id_1": 4} 解析为 {槽位: 法案 ID}，无效的槽位或值会被报告并忽略"""
+    log_tail = " (init_rules: resolve_ideas)"
+    ideas = {}
+    for slot, value in slot_map.items():
+        idea = value_ids.get((slot, f"value_{value}"))
+        if idea is None:
+            diagnostics.add(
+                "init_rule_invalid", "init_rules", f"{rule_index}/{slot}",
+                "init_rules 第 %d 条: %s 没有值 %s，已忽略%s", rule_index, slot, value, log_tail
+            )
+            continue
+        ideas[slot] = idea
+    return ideas
+
+
+def _build(rules, groups, level):
+    """
+    路径上适用的规则按声明顺序依次生效，后声明的覆盖之前的，与规则限定的条件多少无关
+    :param rules: [(条件分组选项 dict, ideas dict)]，按声明顺序
+    :param groups: [(分组名, {选项: 条件})]
+    """
+    node = InitNode()
+    # 跳过没有规则限定的分组
+    while level < len(groups) and not any(groups[level][0] in when for when, _ in rules):
+        level += 1
+    if level == len(groups):
+        _apply_rules(node, rules)
+        return node
+
+    name, options = groups[level]
+    else_option = next((opt for opt, cond in options.items() if cond == ELSE), None)
+    else_rules = [(when, ideas) for when, ideas in rules if name not in when or when[name] == else_option]
+    has_else_specific = any(name in when for when, _ in else_rules)
+    for option, condition in options.items():
+        if condition == ELSE:
+            continue
+        # 不限该分组的规则与该选项的规则保持声明顺序
+        subset = [(when, ideas) for when, ideas in rules if when.get(name, option) == option]
+        # 没有专属规则的选项落入 else，除非 else 有自己的规则
+        if has_else_specific or any(name in when for when, _ in subset):
+            node.chain.append((condition, _build(subset, groups, level + 1)))
+    if else_rules:
+        node.chain.append((None, _build(else_rules, groups, level + 1)))
+    _simplify(node)
+    return node
+
+
+def _apply_rules(node, rules):
+    """叶节点: 按声明顺序写入法案，只有条件完全相同的规则设置同一槽位时才视为冲突"""
+    log_tail = " (init_rules: build)"
+    setters = {}
+    for when, ideas in rules:
+        for slot, idea in ideas.items():
+            if setters.get(slot) == when and node.ideas[slot] != idea:
+                diagnostics.add(
+                    "init_rule_conflict", "init_rules", f"{sorted(when.items())}/{slot}",
+                    "init_rules: 条件 %s 下 %s 被重复设置，使用 %s%s", when, slot, idea, log_tail
+                )
+            node.ideas[slot] = idea
+            setters[slot] = when
+
+
+def _simplify(node):
+    """
+    各分支结果相同时该条件不影响结果，去掉整个判断，每条路径只输出一次合并的 add_ideas。
+    """
+    if not node.chain:
+        return
+    exhaustive = node.chain[-1][0] is None
+    if exhaustive:
+        # 与 else 结果相同的末尾分支可以直接落入 else
+        last = node.chain[-1][1]
+        while len(node.chain) > 1 and not last.chain and not node.chain[-2][1].chain \
+                and node.chain[-2][1].ideas == last.ideas:
+            del node.chain[-2]
+    children = [child for _, child in node.chain]
+    if all(not child.chain and child.ideas == children[0].ideas for child in children) \
+            and (exhaustive or not children[0].ideas):
+        node.ideas = children[0].ideas
+        node.chain = []
+    elif node.chain[-1][1].is_empty():
+        # 中间的空分支仍需保留以维持互斥关系，只去掉末尾的空 else
+        node.chain.pop()
+
+
+def _resolve_when(rule_index, rule, predicates):
+    """
+    :return: 规则的 {分组: 选项}；引用了不存在的分组或选项时报告并返回 None (忽略整条规则)
+    """
+    log_tail = " (init_rules: resolve_when)"
+    when = {}
+    for name, option in rule.items():
+        if name == "set":
+            continue
+        if name not in predicates:
+            diagnostics.add(
+                "init_rule_invalid", "init_rules", f"{rule_index}/{name}",
+                "init_rules 第 %d 条: 没有条件分组 %s，已忽略该规则%s", rule_index, name, log_tail
+            )
+            return None
+        if option not in predicates[name]:
+            diagnostics.add(
+                "init_rule_invalid", "init_rules", f"{rule_index}/{name}",
+                "init_rules 第 %d 条: 分组 %s 没有选项 %s，已忽略该规则%s", rule_index, name, option, log_tail
+            )
+            return None
+        when[name] = option
+    return when
+
+
+def compile_init_rules(raw, model, default_effect):
+    """
+    :param raw: structure.json5 中的 init_rules
+    :param model: compile_structure 的结果，用于校验槽位与值
+    :param default_effect: 未指定 effect 时使用的名称
+    :return: InitPlan；没有规则时为 None
+    """
+    if not raw or not raw.get("rules"):
+        return None
+    value_ids = {
+        (f"{branch.key}/{slot.key}", value.key): value.full_id
+        for branch in model for slot in branch.slots for value in slot.values
+    }
+    predicates = raw.get("predicates", {})
+    groups = list(predicates.items())
+    rules = []
+    for i, rule in enumerate(raw["rules"], 1):
+        when = _resolve_when(i, rule, predicates)
+        if when is not None:
+            rules.append((when, _resolve_ideas(i, rule.get("set", {}), value_ids)))
+    return InitPlan(effect=raw.get("effect", default_effect), root=_build(rules, groups, 0), rule_count=len(rules))
+
+
+def _iter_node_lines(node, indent):
+    prefix = "    " * indent
+    if node.ideas:
+        yield f"{prefix}add_ideas = {{"
+        for idea in node.ideas.values():
+            yield f"{prefix}    {idea}"
+        yield f"{prefix}}}"
+    for i, (condition, child) in enumerate(node.chain):
+        if condition is None:
+            yield f"{prefix}else = {{"
+        else:
+            keyword = "if" if i == 0 else "else_if"
+            yield f"{prefix}{keyword} = {{ limit = {{ {condition} }}"
+        yield from _iter_node_lines(child, indent + 1)
+        yield f"{prefix}}}"
+
+
+def iter_init_effect_lines(plan):
+    """逐行产出 scripted effect 文本"""
+    yield f"{plan.effect} = {{"
+    yield from _iter_node_lines(plan.root, 1)
+    yield "}"
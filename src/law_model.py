@@ -0,0 +1,165 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from log import log_manager
+
+logger = log_manager.get_logger()
+
+# other_meta 中与 available 等同级的脚本钩子: 键 -> (ideas 中的模板, 脚本类型, scripted 后缀)
+OTHER_META_HOOKS = {
+    "on_add": ("FUN_{id}_on_add = yes", "effect", "_on_add"),
+    "on_remove": ("FUN_{id}_on_remove = yes", "effect", "_on_remove"),
+    "do_effect": ("TRIGGER_{id}_do_effect = yes", "trigger", "_do_effect"),
+    "allowed": ("TRIGGER_{id}_allowed = yes", "trigger", "_allowed"),
+    "allowed_to_remove": ("TRIGGER_{id}_allowed_rm = yes", "trigger", "_allowed_rm"),
+    "visible": ("TRIGGER_{id}_visible = yes", "trigger", "_visible")
+}
+
+BONUS_TYPES = ("research_bonus", "equipment_bonus")
+
+TO_BE_WRITTEN = '"# TO_BE_WRITTEN"'
+DY_LOC = '"# DY_LOC"'
+
+
+@dataclass(frozen=True, slots=True)
+class LawValue:
+    key: str
+    full_id: str
+    # 本地化名称 (已拼接槽位名)，为 None 时使用动态文本
+    loc_name: Optional[str]
+    # 描述，为 None 时使用动态文本
+    desc: Optional[str]
+    level: int
+    default: bool
+    cancel_if_invalid: bool
+    allowed_civil_war_flag: int
+    available: bool
+    # 与分支不同且有效时才输出，否则为 None
+    cost: Optional[int]
+    removal_cost: Optional[int]
+    custom_modifier_tooltip: str
+    # 启用的 OTHER_META_HOOKS 键，按 OTHER_META_HOOKS 顺序
+    other_meta_hooks: tuple
+    # 启用的 BONUS_TYPES
+    bonus_types: tuple
+    ai_will_do_line: str
+    ai_preferences: bool
+
+
+@dataclass(frozen=True, slots=True)
+class LawSlot:
+    key: str
+    full_id: str
+    name: str
+    values: tuple
+
+
+@dataclass(frozen=True, slots=True)
+class Branch:
+    key: str
+    full_id: str
+    name: str
+    cost: int
+    # ideas 中判断 value 是否需要单独输出 removal_cost 时使用的分支值
+    removal_cost: int
+    # idea_tags 中输出的分支 removal_cost
+    tag_removal_cost: int
+    slots: tuple
+
+
+def _sorted_keys(data, prefix):
+    return sorted((k for k in data if k.startswith(prefix)), key=lambda x: int(x.split('_')[1]))
+
+
+def _compile_value(b_key, id_key, v_key, v_data, id_name, branch_cost, branch_rem_cost, get_full_id, colon_style):
+    log_tail = " (law_model: compile_value)"
+    v_full_id = get_full_id(b_key, id_key, v_key)
+
+    v_name = v_data.get("name")
+    if v_name == "":
+        v_name = TO_BE_WRITTEN
+    loc_name = None
+    if v_name:
+        loc_name = f"{id_name}{colon_style}{v_name}" if v_data.get("use_id_name", True) else v_name
+
+    v_desc = v_data.get("desc")
+    if v_desc == "":
+        v_desc = TO_BE_WRITTEN
+
+    v_cost = v_data.get("cost", branch_cost)
+    v_rem = v_data.get("removal_cost", branch_rem_cost)
+
+    other_meta = v_data.get("other_meta", {})
+    hooks = tuple(key for key in OTHER_META_HOOKS if other_meta.get(key))
+    bonus_types = []
+    for bonus_type in BONUS_TYPES:
+        bonus_meta = other_meta.get(bonus_type, "")
+        if bonus_meta.strip() if isinstance(bonus_meta, str) else bonus_meta:
+            bonus_types.append(bonus_type)
+
+    ai_will_do = v_data.get("ai_will_do", {"base": 1.0, "preferences": True})
+    ai_base = ai_will_do.get("base", -1.0)
+    ai_factor = ai_will_do.get("factor", -1.0)
+    if (ai_base >= 0) ^ (ai_factor >= 0):
+        ai_line = f"base = {ai_base}" if ai_base >= 0 else f"factor = {ai_factor}"
+    else:
+        ai_line = "base = 1"
+        logger.warning(f"{v_full_id}: Ai will do base属性和factor属性同时出现，已重置为base = 1{log_tail}")
+
+    return LawValue(
+        key=v_key,
+        full_id=v_full_id,
+        loc_name=loc_name,
+        desc=v_desc if v_desc else None,
+        level=v_data.get("level", 0),
+        default=bool(v_data.get("default", False)),
+        cancel_if_invalid=bool(v_data.get("cancel_if_invalid", False)),
+        allowed_civil_war_flag=v_data.get("allowed_civil_war_flag", 1),
+        available=bool(v_data.get("available", True)),
+        cost=v_cost if v_cost != branch_cost and v_cost >= 0 else None,
+        removal_cost=v_rem if v_rem != branch_rem_cost and v_rem >= 0 else None,
+        custom_modifier_tooltip=f"{v_full_id}_tooltip" if v_data.get("custom_modifier_tooltip") else "",
+        other_meta_hooks=hooks,
+        bonus_types=tuple(bonus_types),
+        ai_will_do_line=ai_line,
+        ai_preferences=bool(ai_will_do.get("preferences", False))
+    )
+
+
+def compile_structure(data, get_full_id, colon_style):
+    """
+    将 structure.json5 的原始字典编译为只读模型 Branch -> LawSlot -> LawValue
+    子项按编号预排序，默认值与完整 ID 均在此一次性解析
+    :param data: json5 解析结果
+    :param get_full_id: 完整 ID 生成函数 (GenerateModFiles._get_full_id)
+    :param colon_style: 槽位名与值名之间的分隔符
+    :return: Branch 元组，顺序与原字典一致
+    """
+    branches = []
+    for b_key, b_data in data.items():
+        if not b_key.startswith("branch_"):
+            continue
+        b_cost = b_data.get("cost", 150)
+        b_rem_cost = b_data.get("removal_cost", 0)
+
+        slots = []
+        for id_key in _sorted_keys(b_data, "id_"):
+            id_data = b_data[id_key]
+            id_name = id_data.get("name", "Unknown Value")
+            values = tuple(
+                _compile_value(b_key, id_key, v_key, id_data[v_key], id_name, b_cost, b_rem_cost, get_full_id,
+                               colon_style)
+                for v_key in _sorted_keys(id_data, "value_")
+            )
+            slots.append(LawSlot(key=id_key, full_id=get_full_id(b_key, id_key), name=id_name, values=values))
+
+        branches.append(Branch(
+            key=b_key,
+            full_id=get_full_id(b_key),
+            name=b_data.get("name", "Unknown Value"),
+            cost=b_cost,
+            removal_cost=b_rem_cost,
+            tag_removal_cost=b_data.get("removal_cost", -1),
+            slots=tuple(slots)
+        ))
+    return tuple(branches)
@@ -0,0 +1,83 @@
+"""
+多语言本地化
+基础语言的文本来自 structure.json5，其他语言的文本放在 structure 同级的覆盖目录中，
+每种语言一个文件 <lang>.json5，内容为 {本地化键: 文本}，没有翻译的键沿用基础语言的文本。
+
+本地化条目在一次构建中只排序、转义一次 (LocEntries)，各语言的文件只替换有翻译的文本。
+"""
+import os
+
+ENTRY_TEXT = "text"
+ENTRY_TODO = "todo"
+ENTRY_DY_LOC = "dy_loc"
+
+
+def escape_loc_text(value):
+    """转义双引号，转换换行符"""
+    return value.replace('"', '\\"').replace('\n', '\\n')
+
+
+class LocEntries:
+    """
+    排序并转义后的本地化条目
+    entries: [(键, 类型, 转义后的文本)]，按键排序
+    key_index: 需要翻译的键 (普通文本)，用于检查各语言缺失的键
+    known_keys: 可以被翻译覆盖的键 (普通文本与待编写)，用于检查各语言多余的键
+    """
+
+    def __init__(self, loc_data):
+        self.entries = []
+        for key in sorted(loc_data):
+            value = str(loc_data[key])
+            if value.startswith('"# ') and value.endswith('"'):
+                comment_text = value[3:-1]
+                if "TO_BE_WRITTEN" in comment_text:
+                    self.entries.append((key, ENTRY_TODO, ""))
+                    continue
+                if "DY_LOC" in comment_text:
+                    self.entries.append((key, ENTRY_DY_LOC, ""))
+                    continue
+            self.entries.append((key, ENTRY_TEXT, escape_loc_text(value)))
+        self.key_index = frozenset(key for key, kind, _ in self.entries if kind == ENTRY_TEXT)
+        self.known_keys = frozenset(key for key, kind, _ in self.entries if kind != ENTRY_DY_LOC)
+
+    def iter_lines(self, lang, overlay=None):
+        """
+        :param overlay: 该语言的 {键: 文本}，为 None 时输出基础语言
+        """
+        yield f"l_{lang}:"
+        for key, kind, text in self.entries:
+            if kind == ENTRY_DY_LOC:
+                yield f' # {key} DY_LOC'
+                continue
+            if overlay is not None and key in overlay:
+                yield f'  {key}:0 "{escape_loc_text(str(overlay[key]))}"'
+            elif kind == ENTRY_TODO:
+                yield f'  {key}:0 "" # TODO: To be written'
+            else:
+                yield f'  {key}:0 "{text}"'
+
+    def missing_keys(self, overlay):
+        """基础语言中有文本但该语言没有翻译的键"""
+        return sorted(self.key_index.difference(overlay))
+
+    def unknown_keys(self, overlay):
+        """该语言中不再存在于基础语言的键 (通常是法案被删除或改名后遗留的翻译)"""
+        return sorted(k for k in overlay if k not in self.known_keys)
+
+
+def overlay_folder(json_path, folder_name):
+    """覆盖目录与 structure (文件或目录) 同级"""
+    return os.path.join(os.path.dirname(os.path.abspath(json_path)), folder_name)
+
+
+def list_overlay_files(folder, suffixes=(".json5", ".json")):
+    """:return: {语言: 文件路径}，按语言名排序"""
+    if not os.path.isdir(folder):
+        return {}
+    files = {}
+    for name in sorted(os.listdir(folder)):
+        lang, ext = os.path.splitext(name)
+        if ext in suffixes:
+            files[lang] = os.path.join(folder, name)
+    return files
@@ -0,0 +1,75 @@
+import json
+import os
+
+from log import log_manager
+
+logger = log_manager.get_logger()
+
+
+class LocSyncState:
+    """
+    本地化名称同步的增量状态
+    记录上次写回完成时的本地化文本与各 meta 来源文件的版本 (见 MetaImporter.source_revisions)。
+    来源版本与法案的本地化文本都未变化的条目，其名称在上次同步后已一致，无需再次比较；
+    上次未能同步的法案 (如本地化中不存在的 ID) 记为待比较，每次都重新检查以保留诊断。
+    """
+    VERSION = 1
+
+    def __init__(self, state_path):
+        self.state_path = state_path
+        # 本地化键 -> 文本
+        self.loc_names = {}
+        # meta 来源文件 -> 版本
+        self.sources = {}
+        # 需要再次比较的法案 ID
+        self.pending = set()
+        self._load()
+
+    def _load(self):
+        log_tail = " (LocSyncState: load)"
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"本地化同步状态读取失败，将比较全部条目: {e}{log_tail}")
+            return
+        if raw.get("version") != self.VERSION:
+            return
+        self.loc_names = raw.get("loc_names", {})
+        self.sources = raw.get("sources", {})
+        self.pending = set(raw.get("pending", []))
+
+    def save(self):
+        folder = os.path.dirname(self.state_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        raw = {
+            "version": self.VERSION,
+            "loc_names": self.loc_names,
+            "sources": self.sources,
+            "pending": sorted(self.pending)
+        }
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(raw, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def changed_sources(self, sources):
+        """版本与上次不同 (含新增) 的来源文件"""
+        return {path for path, revision in sources.items() if self.sources.get(path) != revision}
+
+    def changed_loc_keys(self, loc_data):
+        """新增、删除或文本变化的本地化键，以字典比较与集合运算完成，不逐条遍历"""
+        if loc_data == self.loc_names:
+            return set()
+        return {key for key, _ in set(loc_data.items()).symmetric_difference(self.loc_names.items())}
+
+    def is_current(self, loc_data, sources, pending):
+        return self.pending == pending and self.sources == sources and self.loc_names == loc_data
+
+    def update(self, loc_data, sources, pending):
+        self.loc_names = dict(loc_data)
+        self.sources = dict(sources)
+        self.pending = set(pending)
@@ -1,8 +1,22 @@
+import atexit
 import logging
 import os
+import queue
 import sys
 import shutil
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    不在调用线程中格式化消息
+    标准 QueueHandler.prepare 会在入队前格式化消息，这里直接传递原始记录，
+    参数插值、格式化与文件 I/O 全部由后台监听线程完成
+    """
+
+    def prepare(self, record):
+        return record
 
 
 class LoggerManager:
@@ -21,15 +35,31 @@ class LoggerManager:
             self._initialized = False
             self.log_folder = "log"
             self.latest_log_path = ""
+            self._listener = None
+            self._queue_handler = None
 
-    def init_logger(self, level=logging.INFO, log_folder="log"):
+    def init_logger(self, level=logging.INFO, log_folder="log", async_mode=False):
         """
         初始化日志配置
         :param level: 日志等级
         :param log_folder: 日志存放根目录
+        :param async_mode: 是否启用队列模式，由后台线程负责格式化与写出
         """
         if self._initialized:
             self.set_level(level)
+            if async_mode:
+                self.enable_async()
+            return self.logger
+
+        # 以 spawn 方式启动的工作子进程只输出到控制台，避免覆盖主进程的 latest.log
+        # multiprocessing 导入较慢，只在初始化时导入
+        import multiprocessing
+        if multiprocessing.parent_process() is not None:
+            self.logger.setLevel(level)
+            c_handler = logging.StreamHandler(sys.stdout)
+            c_handler.setFormatter(logging.Formatter("%(asctime)s - [%(levelname)s] - %(message)s", datefmt='%H:%M:%S'))
+            self.logger.addHandler(c_handler)
+            self._initialized = True
             return self.logger
 
         self.log_folder = log_folder
@@ -57,8 +87,40 @@ class LoggerManager:
         sys.excepthook = self._handle_crash
 
         self._initialized = True
+        if async_mode:
+            self.enable_async()
         return self.logger
 
+    def enable_async(self):
+        """
+        切换到队列模式: logger 只保留一个入队处理器，原有处理器交给后台监听线程
+        程序退出或崩溃时会先排空队列再关闭
+        """
+        if self._listener is not None:
+            return
+        handlers = list(self.logger.handlers)
+        log_queue = queue.SimpleQueue()
+        self._queue_handler = _DeferredQueueHandler(log_queue)
+        self._listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        for handler in handlers:
+            self.logger.removeHandler(handler)
+        self.logger.addHandler(self._queue_handler)
+        self._listener.start()
+        atexit.register(self.flush)
+
+    def flush(self):
+        """排空队列并停止后台线程，原有处理器重新直接挂到 logger 上"""
+        if self._listener is None:
+            return
+        listener = self._listener
+        self._listener = None
+        listener.stop()
+        self.logger.removeHandler(self._queue_handler)
+        self._queue_handler = None
+        for handler in listener.handlers:
+            self.logger.addHandler(handler)
+            handler.flush()
+
     def set_level(self, level):
         """动态更改等级"""
         self.logger.setLevel(level)
@@ -71,6 +133,8 @@ class LoggerManager:
         """当程序崩溃时触发的钩子"""
         # 首先记录错误到日志
         self.logger.critical("程序崩溃! 正在生成备份日志...", exc_info=(exc_type, exc_value, exc_traceback))
+        # 队列模式下先写出积压的日志
+        self.flush()
 
         # 执行备份
         self._archive_log(is_crash=True)
@@ -0,0 +1,78 @@
+import sys
+
+
+class MetaIndex:
+    """
+    扁平 meta 索引，键为 (category, v_full_id, type)
+    ID 字符串经 sys.intern 驻留，内容相同的 meta 块 (如大量的 `always = yes`) 共享同一个字符串对象。
+    查询不会创建任何中间层，支持单条目增量更新。
+    """
+    __slots__ = ("_entries", "_bodies")
+
+    def __init__(self):
+        self._entries = {}
+        # 内容池: body -> [共享的 body 对象, 引用计数]
+        self._bodies = {}
+
+    @classmethod
+    def from_meta_data(cls, meta_data):
+        """
+        由 MetaImporter.meta_data 构建索引
+        :param meta_data: 格式如 {"category": [{"v_full_id": ..., "type": ..., "meta": ...}, ...]}
+        """
+        index = cls()
+        for category, items in meta_data.items():
+            for item in items:
+                index.set(category, item['v_full_id'], item['type'], item['meta'])
+        return index
+
+    @staticmethod
+    def _key(category, v_full_id, m_type):
+        return sys.intern(category), sys.intern(v_full_id), sys.intern(m_type)
+
+    def _acquire_body(self, body):
+        slot = self._bodies.get(body)
+        if slot is None:
+            slot = self._bodies[body] = [body, 0]
+        slot[1] += 1
+        return slot[0]
+
+    def _release_body(self, body):
+        slot = self._bodies.get(body)
+        if slot is None:
+            return
+        slot[1] -= 1
+        if slot[1] <= 0:
+            del self._bodies[body]
+
+    def set(self, category, v_full_id, m_type, meta):
+        """新增或更新单个条目"""
+        key = self._key(category, v_full_id, m_type)
+        old = self._entries.get(key)
+        if old is not None:
+            if old == meta:
+                return
+            self._release_body(old)
+        self._entries[key] = self._acquire_body(meta)
+
+    def remove(self, category, v_full_id, m_type):
+        old = self._entries.pop((category, v_full_id, m_type), None)
+        if old is not None:
+            self._release_body(old)
+
+    def get(self, category, v_full_id, m_type, default=""):
+        return self._entries.get((category, v_full_id, m_type), default)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def items(self):
+        return self._entries.items()
+
+    @property
+    def unique_body_count(self):
+        """去重后的 meta 内容块数量"""
+        return len(self._bodies)
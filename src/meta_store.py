@@ -0,0 +1,342 @@
+"""
+SQLite meta 存储
+作为 meta_files 文本之外的另一种存储方式，条目按 v_full_id、分类与类型建立索引，meta 内容建立全文索引，
+查找单个条目或按内容检索 (如所有用到 conscription_factor 的 modifier) 不需要解析全部文件。
+
+为了与文本格式无损互转，每个条目保存原始的 header 行、header 之后到块结束的原始字节，
+以及与上一个条目之间的原始内容 (注释、空行、非 meta 块)，文件末尾的内容保存在 files 表中。
+
+用法 (在 src 目录下):
+    python meta_store.py import                  # meta_files -> 数据库 (覆盖数据库中的全部内容)
+    python meta_store.py export [--out 目录]     # 数据库 -> 文本，只写入内容变化的文件
+    python meta_store.py search conscription_factor --category modifier
+"""
+import argparse
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from log import log_manager
+from profiler import run_profiler
+from read_res_file import MetaImporter
+
+logger = log_manager.get_logger()
+
+META_CATEGORIES = ("effect", "modifier", "trigger", "preferences")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS store_info (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    tail BLOB NOT NULL,
+    UNIQUE (category, name)
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    prefix TEXT NOT NULL,
+    v_full_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    v_name TEXT NOT NULL,
+    meta TEXT NOT NULL,
+    gap BLOB NOT NULL,
+    head BLOB NOT NULL,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_by_id ON entries (v_full_id, category, type);
+CREATE INDEX IF NOT EXISTS entries_by_category ON entries (category, type);
+CREATE INDEX IF NOT EXISTS entries_by_file ON entries (file_id, position);
+-- 标识符中的下划线视为词的一部分，conscription_factor 作为一个词检索
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5 (
+    meta, content = 'entries', content_rowid = 'id', tokenize = "unicode61 tokenchars '_'"
+);
+CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts (rowid, meta) VALUES (new.id, new.meta);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts (entries_fts, rowid, meta) VALUES ('delete', old.id, old.meta);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_au AFTER UPDATE OF meta ON entries BEGIN
+    INSERT INTO entries_fts (entries_fts, rowid, meta) VALUES ('delete', old.id, old.meta);
+    INSERT INTO entries_fts (rowid, meta) VALUES (new.id, new.meta);
+END;
+"""
+
+_ITEM_COLUMNS = "e.id, f.category, f.name, e.prefix, e.v_full_id, e.type, e.v_name, e.meta"
+
+
+class SqliteMetaStore:
+    """
+    MetaImporter 的 SQLite 存储后端
+    读出的条目与文本解析的条目格式一致 (source_file 为对应文本布局中的路径)，另带 rowid 用于写回。
+    """
+    VERSION = 1
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        # 事务由 transaction 显式管理；名称同步可能在输出调度的工作线程中写回
+        self.conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(_SCHEMA)
+        self._check_version()
+
+    def _check_version(self):
+        row = self.conn.execute("SELECT value FROM store_info WHERE key = 'version'").fetchone()
+        if row is None:
+            with self.transaction() as cur:
+                cur.execute("INSERT INTO store_info (key, value) VALUES ('version', ?)", (str(self.VERSION),))
+        elif int(row[0]) != self.VERSION:
+            raise ValueError(f"{self.db_path}: 数据库版本 {row[0]} 与当前版本 {self.VERSION} 不一致")
+
+    def close(self):
+        self.conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """单个事务，出错时整体回滚"""
+        with self._lock:
+            cur = self.conn.cursor()
+            cur.execute("BEGIN")
+            try:
+                yield cur
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+            else:
+                cur.execute("COMMIT")
+            finally:
+                cur.close()
+
+    @staticmethod
+    def _bump_revision(cur):
+        cur.execute(
+            "INSERT INTO store_info (key, value) VALUES ('revision', '1') "
+            "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def revision(self):
+        """写入版本，每次导入或写回后递增，用于判断条目自上次读取后是否变化"""
+        row = self.conn.execute("SELECT value FROM store_info WHERE key = 'revision'").fetchone()
+        return int(row[0]) if row else 0
+
+    def is_empty(self):
+        return self.conn.execute("SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+    # --- 文本布局互转 ---
+
+    @run_profiler.profiled("meta_store_import")
+    def import_text(self, workspace_folder, parse_raw):
+        """
+        以 workspace 中的文本文件替换数据库的全部内容
+        :param parse_raw: 文本解析函数 (MetaImporter._parse_raw)，条目需带 span 与 header_span
+        :return: 导入的条目数
+        """
+        log_tail = " (SqliteMetaStore: import_text)"
+        count = 0
+        with self.transaction() as cur:
+            self._bump_revision(cur)
+            cur.execute("DELETE FROM entries")
+            cur.execute("DELETE FROM files")
+            for category in META_CATEGORIES:
+                folder = os.path.join(workspace_folder, category)
+                if not os.path.isdir(folder):
+                    continue
+                for name in sorted(os.listdir(folder)):
+                    if not name.endswith(".txt"):
+                        continue
+                    path = os.path.join(folder, name)
+                    with open(path, 'rb') as f:
+                        raw = f.read()
+                    count += self._insert_file(cur, category, name, raw, parse_raw(path, raw))
+        logger.info(f"已从 {workspace_folder} 导入 {count} 个条目到 {self.db_path}{log_tail}")
+        return count
+
+    @staticmethod
+    def _insert_file(cur, category, name, raw, items):
+        last_end = 0
+        rows = []
+        for position, item in enumerate(items):
+            head_start, head_end = item["header_span"]
+            block_end = item["span"][1]
+            rows.append((
+                position, category, item["prefix"], item["v_full_id"], item["type"], item["v_name"], item["meta"],
+                raw[last_end:head_start], raw[head_start:head_end], raw[head_end:block_end]
+            ))
+            last_end = block_end
+        cur.execute("INSERT INTO files (category, name, tail) VALUES (?, ?, ?)", (category, name, raw[last_end:]))
+        file_id = cur.lastrowid
+        cur.executemany(
+            "INSERT INTO entries (file_id, position, category, prefix, v_full_id, type, v_name, meta, gap, head, body) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(file_id, *row) for row in rows]
+        )
+        return len(rows)
+
+    def iter_file_contents(self):
+        """按文本布局还原每个文件: (category, 文件名, 字节内容)"""
+        files = self.conn.execute("SELECT id, category, name, tail FROM files ORDER BY category, name").fetchall()
+        for file_id, category, name, tail in files:
+            chunks = []
+            for gap, head, body in self.conn.execute(
+                "SELECT gap, head, body FROM entries WHERE file_id = ? ORDER BY position", (file_id,)
+            ):
+                chunks += (gap, head, body)
+            chunks.append(tail)
+            yield category, name, b"".join(chunks)
+
+    @run_profiler.profiled("meta_store_export")
+    def export_text(self, workspace_folder, atomic_write):
+        """
+        导出为文本布局，只写入内容变化的文件
+        :param atomic_write: 写文件函数 (MetaImporter._atomic_write)
+        :return: 写入的文件数
+        """
+        log_tail = " (SqliteMetaStore: export_text)"
+        written = 0
+        for category, name, data in self.iter_file_contents():
+            path = os.path.join(workspace_folder, category, name)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    if f.read() == data:
+                        continue
+                atomic_write(path, data)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as f:
+                    f.write(data)
+            written += 1
+        logger.info(f"已导出 {written} 个变化的文件到 {workspace_folder}{log_tail}")
+        return written
+
+    # --- 查询 ---
+
+    @staticmethod
+    def _row_to_item(row, workspace_folder):
+        rowid, category, name, prefix, v_full_id, m_type, v_name, meta = row
+        return {
+            "prefix": prefix,
+            "v_full_id": v_full_id,
+            "type": m_type,
+            "v_name": v_name,
+            "source_file": os.path.join(workspace_folder, category, name),
+            "changed": False,
+            "meta": meta,
+            "rowid": rowid
+        }
+
+    def load(self, workspace_folder, categories=None, v_full_ids=None):
+        """
+        按文本布局的顺序读出条目，可只读取部分分类或部分法案 (走索引)
+        :return: {category: [item...]}
+        """
+        categories = tuple(categories or META_CATEGORIES)
+        result = {category: [] for category in categories}
+        sql = (
+            f"SELECT {_ITEM_COLUMNS} FROM entries e JOIN files f ON f.id = e.file_id "
+            f"WHERE e.category IN ({', '.join('?' * len(categories))})"
+        )
+        params = list(categories)
+        if v_full_ids is not None:
+            v_full_ids = list(v_full_ids)
+            sql += f" AND e.v_full_id IN ({', '.join('?' * len(v_full_ids))})"
+            params += v_full_ids
+        sql += " ORDER BY f.category, f.name, e.position"
+        for row in self.conn.execute(sql, params):
+            result[row[1]].append(self._row_to_item(row, workspace_folder))
+        return result
+
+    def find(self, workspace_folder, v_full_id, category=None, m_type=None):
+        """按法案 ID (可选分类与类型) 查找条目"""
+        sql = f"SELECT {_ITEM_COLUMNS} FROM entries e JOIN files f ON f.id = e.file_id WHERE e.v_full_id = ?"
+        params = [v_full_id]
+        if category is not None:
+            sql += " AND e.category = ?"
+            params.append(category)
+        if m_type is not None:
+            sql += " AND e.type = ?"
+            params.append(m_type)
+        return [self._row_to_item(row, workspace_folder) for row in self.conn.execute(sql, params)]
+
+    def search(self, workspace_folder, text, category=None):
+        """
+        全文检索 meta 内容
+        :param text: 词或短语，按 FTS5 短语匹配 (如 conscription_factor)
+        """
+        phrase = '"' + text.replace('"', '""') + '"'
+        sql = (
+            f"SELECT {_ITEM_COLUMNS} FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid "
+            f"JOIN files f ON f.id = e.file_id WHERE entries_fts MATCH ?"
+        )
+        params = [phrase]
+        if category is not None:
+            sql += " AND e.category = ?"
+            params.append(category)
+        sql += " ORDER BY f.category, f.name, e.position"
+        return [self._row_to_item(row, workspace_folder) for row in self.conn.execute(sql, params)]
+
+    # --- 写回 ---
+
+    def update_headers(self, updates):
+        """
+        在一个事务中批量更新条目名称与 header 行
+        :param updates: [(rowid, v_name, header 字节)]
+        """
+        with self.transaction() as cur:
+            self._bump_revision(cur)
+            cur.executemany("UPDATE entries SET v_name = ?, head = ? WHERE id = ?", [
+                (v_name, head, rowid) for rowid, v_name, head in updates
+            ])
+        return len(updates)
+
+    def header_of(self, rowid):
+        row = self.conn.execute("SELECT head FROM entries WHERE id = ?", (rowid,)).fetchone()
+        return row[0] if row else None
+
+
+def open_meta_store(db_path, workspace_folder):
+    """打开数据库，数据库为空时先从文本布局导入"""
+    store = SqliteMetaStore(db_path)
+    if store.is_empty():
+        store.import_text(workspace_folder, MetaImporter(workspace_folder)._parse_raw)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("import", "export", "search"))
+    parser.add_argument("text", nargs="?", help="search 的检索内容")
+    parser.add_argument("--db", default=os.path.join("meta_files", "meta.sqlite3"))
+    parser.add_argument("--workspace", default="meta_files")
+    parser.add_argument("--out", help="export 的输出目录，默认为 workspace")
+    parser.add_argument("--category", choices=META_CATEGORIES)
+    args = parser.parse_args()
+    log_manager.init_logger(log_folder="pdx_logs")
+
+    importer = MetaImporter(args.workspace)
+    store = SqliteMetaStore(args.db)
+    try:
+        if args.command == "import":
+            store.import_text(args.workspace, importer._parse_raw)
+        elif args.command == "export":
+            store.export_text(args.out or args.workspace, MetaImporter._atomic_write)
+        else:
+            if not args.text:
+                parser.error("search 需要检索内容")
+            for item in store.search(args.workspace, args.text, args.category):
+                print(f"{item['source_file']}: {item['prefix']}_{item['v_full_id']}_{item['type']} # {item['v_name']}")
+    finally:
+        store.close()
+        log_manager.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import os
+import re
+
+# Token 类型
+TOKEN_WORD = "word"
+TOKEN_OP = "op"
+TOKEN_LBRACE = "lbrace"
+TOKEN_RBRACE = "rbrace"
+TOKEN_STRING = "string"
+TOKEN_COMMENT = "comment"
+
+# 直接在字节上扫描: 语法字符都是 ASCII，UTF-8 多字节序列不会被误判，偏移量即文件字节偏移
+_TOKEN_RE = re.compile(
+    rb'''
+      (?P<ws>\s+)
+    | (?P<comment>\#[^\n]*)
+    | (?P<string>"(?:[^"\\]|\\.)*"?)
+    | (?P<op>[<>!]?=|[<>])
+    | (?P<lbrace>\{)
+    | (?P<rbrace>\})
+    | (?P<word>[^\s{}=<>!"\#]+|!)
+    ''',
+    re.VERBOSE | re.DOTALL
+)
+
+# 块内只需关心大括号，以及可能包含大括号的字符串与注释
+_BODY_RE = re.compile(rb'[{}"#]')
+_STRING_RE = re.compile(rb'"(?:[^"\\]|\\.)*"?', re.DOTALL)
+_WS_RE = re.compile(rb'\s*')
+
+_BOM = b"\xef\xbb\xbf"
+
+_KIND_BY_GROUP = {
+    "comment": TOKEN_COMMENT,
+    "string": TOKEN_STRING,
+    "op": TOKEN_OP,
+    "lbrace": TOKEN_LBRACE,
+    "rbrace": TOKEN_RBRACE,
+    "word": TOKEN_WORD
+}
+
+
+def tokenize(data, pos=0):
+    """
+    PDX 脚本词法分析，单次线性扫描
+    :param data: 文件的原始字节内容
+    :param pos: 起始偏移
+    :return: 生成 (kind, start, end) 三元组，偏移为字节偏移；空白不产生 token
+    """
+    kinds = _KIND_BY_GROUP
+    for m in _TOKEN_RE.finditer(data, pos):
+        group = m.lastgroup
+        if group != "ws":
+            yield kinds[group], m.start(), m.end()
+
+
+class ScriptBlock:
+    """顶层 `name = { ... }` 块在文件中的位置信息 (均为字节偏移)"""
+    __slots__ = ("name", "name_start", "line_start", "lbrace_end", "comment_span", "rbrace_start", "end")
+
+    def __init__(self, name, name_start, line_start, lbrace_end, comment_span):
+        self.name = name
+        self.name_start = name_start
+        self.line_start = line_start
+        self.lbrace_end = lbrace_end
+        # 与 `{` 同一行的注释 (start, end)，没有则为 None
+        self.comment_span = comment_span
+        self.rbrace_start = -1
+        self.end = -1
+
+    @property
+    def header_end(self):
+        """header 部分 (`name = { # 注释`) 的结束偏移"""
+        return self.comment_span[1] if self.comment_span else self.lbrace_end
+
+    def comment_text(self, data):
+        """同一行注释的内容，去掉 '#' 与首尾空白"""
+        if not self.comment_span:
+            return ""
+        start, end = self.comment_span
+        return data[start + 1:end].decode("utf-8", errors="replace").strip()
+
+    def body_span(self, data):
+        """块内容的范围: header 所在行之后到 `}` 之前；header 行后仍有内容时从 header 结束处开始"""
+        start = self.header_end
+        line_end = data.find(b"\n", start, self.rbrace_start)
+        if line_end != -1 and not data[start:line_end].strip():
+            start = line_end + 1
+        return start, self.rbrace_start
+
+
+def iter_top_level_blocks(data, on_unclosed=None):
+    """
+    流式查找所有顶层 `name = { ... }` 块，块内的注释与字符串中的大括号不会影响匹配
+    只有顶层逐个 token 扫描；块内只用一个正则查找 `{`、`}`、`"` 与 `#`，跳过字符串与注释
+    :param data: 文件的原始字节内容
+    :param on_unclosed: 文件结束时仍未闭合的块的回调
+    """
+    # 跳过 utf-8-sig 文件头，避免 BOM 被当作第一个单词的一部分
+    body_start = len(_BOM) if data.startswith(_BOM) else 0
+    size = len(data)
+    token_match = _TOKEN_RE.match
+    body_search = _BODY_RE.search
+    pos = body_start
+    # 顶层最近的两个 token，用于识别 `name =` 前缀
+    prev_word = None
+    prev_op = False
+
+    while pos < size:
+        m = token_match(data, pos)
+        start, pos = m.span()
+        group = m.lastgroup
+        if group == "ws" or group == "comment":
+            continue
+        if group == "word":
+            prev_word = (start, pos)
+            prev_op = False
+            continue
+        if group == "op":
+            prev_op = prev_word is not None and data[start:pos] == b"="
+            continue
+        if group != "lbrace":
+            # 顶层多余的 `}` 与字符串直接忽略
+            prev_word = None
+            prev_op = False
+            continue
+
+        current = None
+        if prev_word is not None and prev_op:
+            name_start, name_end = prev_word
+            line_start = max(data.rfind(b"\n", 0, name_start) + 1, body_start)
+            current = ScriptBlock(data[name_start:name_end].decode("utf-8", errors="replace"),
+                                  name_start, line_start, pos, None)
+            # 只接受与 `{` 同一行的注释作为名称
+            comment_start = _WS_RE.match(data, pos).end()
+            if data.startswith(b"#", comment_start) and b"\n" not in data[pos:comment_start]:
+                comment_end = data.find(b"\n", comment_start)
+                current.comment_span = (comment_start, size if comment_end == -1 else comment_end)
+        prev_word = None
+        prev_op = False
+
+        depth = 1
+        while depth:
+            m = body_search(data, pos)
+            if m is None:
+                if current is not None and on_unclosed is not None:
+                    on_unclosed(current)
+                return
+            start = m.start()
+            char = data[start]
+            if char == 0x7B:  # {
+                depth += 1
+                pos = start + 1
+            elif char == 0x7D:  # }
+                depth -= 1
+                pos = start + 1
+            elif char == 0x22:  # "
+                pos = _STRING_RE.match(data, start).end()
+            else:  # 注释到行尾
+                pos = data.find(b"\n", start)
+                if pos == -1:
+                    pos = size
+        if current is not None:
+            current.rbrace_start = pos - 1
+            current.end = pos
+            yield current
+
+
+def dedent_body(raw):
+    """
+    将块内容字节解码为文本，去除空白行、公共缩进与首尾空白
+    :param raw: 块内容的原始字节
+    """
+    text = raw.decode("utf-8", errors="replace").replace("\r\n", "\n")
+    lines = [line for line in text.split("\n") if line.strip()]
+    if not lines:
+        return ""
+    # 与 textwrap.dedent 相同: 去掉所有行共有的前导空格与制表符，但不需要它的逐行正则替换
+    margin = len(os.path.commonprefix([line[:len(line) - len(line.lstrip(" \t"))] for line in lines]))
+    if margin:
+        lines = [line[margin:] for line in lines]
+    return "\n".join(lines).strip()
@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+
+# 进程的 umask，新建输出文件的权限与直接 open 创建时一致 (mkstemp 固定为 0600)
+# 在导入时读取一次: os.umask 只能先设置再恢复，不能在写出线程中调用
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+class StreamWriter:
+    """
+    流式文本写出器
+    逐行写入带缓冲的临时文件，行与行之间以换行分隔 (末尾不追加换行)，正常结束后重命名为目标文件，
+    出错时删除临时文件，目标文件保持原样。
+    """
+
+    def __init__(self, path, encoding='utf-8', buffer_size=1 << 16):
+        self.path = path
+        self.encoding = encoding
+        self.buffer_size = buffer_size
+        self.line_count = 0
+        self._file = None
+        self._tmp_path = None
+
+    def __enter__(self):
+        folder = os.path.dirname(os.path.abspath(self.path))
+        fd, self._tmp_path = tempfile.mkstemp(dir=folder, prefix=".", suffix=".tmp")
+        self._file = open(fd, 'w', encoding=self.encoding, buffering=self.buffer_size)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._file.close()
+        if exc_type is None:
+            try:
+                self._apply_mode()
+                os.replace(self._tmp_path, self.path)
+            except BaseException:
+                os.remove(self._tmp_path)
+                raise
+        elif os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+        return False
+
+    def _apply_mode(self):
+        """覆盖已有文件时沿用其权限，否则使用 umask 下的默认权限"""
+        if os.path.exists(self.path):
+            shutil.copymode(self.path, self._tmp_path)
+        else:
+            os.chmod(self._tmp_path, 0o666 & ~_UMASK)
+
+    def write_line(self, line):
+        if self.line_count:
+            self._file.write("\n")
+        self._file.write(line)
+        self.line_count += 1
+
+    def write_lines(self, lines):
+        """
+        写入任意可迭代的文本行，生成器会被逐项消费，不会整体驻留内存
+        """
+        write = self._file.write
+        for line in lines:
+            if self.line_count:
+                write("\n")
+            write(line)
+            self.line_count += 1
+
+
+def iter_indented(text, prefix):
+    """
+    逐行产出平移缩进后的文本，空白行不添加缩进 (与 textwrap.indent 的默认行为一致)
+    按需切分，不复制整块文本
+    """
+    start = 0
+    while True:
+        end = text.find("\n", start)
+        line = text[start:] if end == -1 else text[start:end]
+        yield prefix + line if line.strip() else line
+        if end == -1:
+            return
+        start = end + 1
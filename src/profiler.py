@@ -0,0 +1,164 @@
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+from log import log_manager
+
+logger = log_manager.get_logger()
+
+
+class _StageFrame:
+    __slots__ = ("record", "wall_start", "cpu_start", "peak")
+
+    def __init__(self, record):
+        self.record = record
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        self.peak = 0
+
+
+class RunProfiler:
+    """
+    生成流程的阶段统计
+    记录每个阶段的墙钟时间、CPU 时间、tracemalloc 峰值内存，以及条目数、行数、字节数等计数，
+    运行结束后输出 JSON 报告。阶段可以嵌套，子阶段的峰值会计入父阶段。
+    阶段栈按线程独立保存，工作线程可通过 attach 挂到调用线程的阶段下；
+    tracemalloc 的峰值是进程级的，并发阶段的峰值内存只能作为参考。
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.trace_memory = True
+        self.stages = []
+        self.counters = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._started_at = None
+        self._wall_start = None
+        self._cpu_start = None
+
+    def start(self, trace_memory=True):
+        """开始一次运行的统计，应在第一个阶段之前调用"""
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.counters = {}
+        self._local = threading.local()
+        self._started_at = datetime.now()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @property
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current_frame(self):
+        """当前线程所在的阶段，供 attach 使用"""
+        return self._stack[-1] if self._stack else None
+
+    @contextmanager
+    def attach(self, frame):
+        """在工作线程中将之后的阶段与计数挂到 frame (其他线程的 current_frame) 之下"""
+        if frame is None:
+            yield
+            return
+        stack = self._stack
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.remove(frame)
+
+    def _current_peak(self):
+        return tracemalloc.get_traced_memory()[1] if self.trace_memory and tracemalloc.is_tracing() else 0
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        if self._started_at is None:
+            # 未显式 start 时只统计时间，tracemalloc 开销较大需主动开启
+            self.start(trace_memory=False)
+        if self._stack:
+            parent = self._stack[-1]
+            parent.peak = max(parent.peak, self._current_peak())
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+        record = {"name": name, "depth": len(self._stack), "counters": {}}
+        self.stages.append(record)
+        frame = _StageFrame(record)
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            peak = max(frame.peak, self._current_peak())
+            record["wall_s"] = round(time.perf_counter() - frame.wall_start, 6)
+            record["cpu_s"] = round(time.process_time() - frame.cpu_start, 6)
+            record["peak_kb"] = round(peak / 1024, 1)
+            if self._stack:
+                parent = self._stack[-1]
+                parent.peak = max(parent.peak, peak)
+
+    def profiled(self, name):
+        """将函数整体记录为一个阶段的装饰器"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, key, n=1):
+        """累加计数，同时计入当前所在的阶段"""
+        if not self.enabled:
+            return
+        stack = self._stack
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+            if stack:
+                stage_counters = stack[-1].record["counters"]
+                stage_counters[key] = stage_counters.get(key, 0) + n
+
+    def write_report(self, log_folder):
+        """
+        输出 JSON 报告到 <log_folder>/reports/，并覆盖 <log_folder>/latest_report.json
+        :return: 报告路径
+        """
+        log_tail = " (RunProfiler: write_report)"
+        if not self.enabled or self._started_at is None:
+            return None
+        report = {
+            "started_at": self._started_at.isoformat(timespec="seconds"),
+            "wall_s": round(time.perf_counter() - self._wall_start, 6),
+            "cpu_s": round(time.process_time() - self._cpu_start, 6),
+            "trace_memory": self.trace_memory,
+            "peak_kb": max((stage.get("peak_kb", 0) for stage in self.stages), default=0),
+            "counters": self.counters,
+            "stages": self.stages
+        }
+        report_folder = os.path.join(log_folder, "reports")
+        os.makedirs(report_folder, exist_ok=True)
+        report_path = os.path.join(report_folder, f"run_{self._started_at.strftime('%Y%m%d_%H%M%S')}.json")
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        for path in (report_path, os.path.join(log_folder, "latest_report.json")):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        logger.info(f"运行报告已生成: {report_path} (总耗时 {report['wall_s']:.3f}s){log_tail}")
+        return report_path
+
+
+# 实例化
+run_profiler = RunProfiler()
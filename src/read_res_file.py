@@ -1,90 +1,190 @@
+import bisect
+import hashlib
 import logging
 import os
+import pickle
 import re
-import textwrap
+import shutil
+import tempfile
 
+import pdx_script
+from diagnostics import diagnostics
 from log import log_manager
+from profiler import run_profiler
+
+logger = log_manager.get_logger()
+
+
+class MetaParseCache:
+    """
+    meta 文件解析结果的磁盘缓存
+    以文件路径为键，记录文件大小、mtime 与内容哈希；大小与 mtime 一致时直接命中，
+    否则比较内容哈希，只有内容确实变化的文件才重新解析。缓存以 pickle 二进制快照保存。
+    """
+    VERSION = 2
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.records = {}
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        log_tail = " (MetaParseCache: load)"
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'rb') as f:
+                raw = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"解析缓存读取失败，将重新解析全部文件: {e}{log_tail}")
+            return
+        if isinstance(raw, dict) and raw.get("version") == self.VERSION:
+            self.records = raw.get("records", {})
+
+    def save(self):
+        if not self.dirty:
+            return
+        folder = os.path.dirname(self.cache_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({"version": self.VERSION, "records": self.records}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.cache_path)
+        self.dirty = False
 
-logger = log_manager.init_logger(level=logging.DEBUG, log_folder="pdx_logs")
+    @staticmethod
+    def _key(file_path):
+        return os.path.normcase(os.path.abspath(file_path))
+
+    def lookup(self, file_path):
+        """
+        查询缓存
+        :return: (items, raw) 命中时 items 为条目列表、raw 为 None；未命中时 items 为 None、raw 为文件字节内容
+        """
+        key = self._key(file_path)
+        st = os.stat(file_path)
+        record = self.records.get(key)
+        if record and record["size"] == st.st_size and record["mtime_ns"] == st.st_mtime_ns:
+            return self._copy_items(record["items"], file_path), None
+
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha1(raw).hexdigest()
+        if record and record["digest"] == digest:
+            # 内容未变，仅刷新 mtime
+            record["size"] = st.st_size
+            record["mtime_ns"] = st.st_mtime_ns
+            self.dirty = True
+            return self._copy_items(record["items"], file_path), None
+        return None, raw
+
+    def store(self, file_path, raw, items):
+        st = os.stat(file_path)
+        self.records[self._key(file_path)] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "digest": hashlib.sha1(raw).hexdigest(),
+            "items": self._copy_items(items, file_path)
+        }
+        self.dirty = True
+
+    def digest(self, file_path):
+        record = self.records.get(self._key(file_path))
+        return record["digest"] if record else None
+
+    def invalidate(self, file_path):
+        if self.records.pop(self._key(file_path), None) is not None:
+            self.dirty = True
+
+    @staticmethod
+    def _copy_items(items, file_path):
+        # 条目会在同步流程中被修改，缓存内外各持一份
+        copied = []
+        for item in items:
+            new_item = dict(item)
+            new_item["source_file"] = file_path
+            new_item["changed"] = False
+            copied.append(new_item)
+        return copied
 
 
 class MetaImporter:
-    def __init__(self, workspace_folder):
+    def __init__(self, workspace_folder, cache_path=None, workers=1, executor="process", store=None):
+        """
+        :param workspace_folder: meta 文件根目录
+        :param cache_path: 解析缓存路径，为空时不使用缓存
+        :param workers: 并行解析的工作者数量，1 为串行
+        :param executor: 并行方式，"process" 或 "thread"
+        :param store: 存储后端 (meta_store.SqliteMetaStore)，为空时读写 workspace 中的文本文件
+        """
         self.workspace_folder = workspace_folder
         self.meta_data = {}
-        # 匹配正则: 前缀_ID_类型 = { # 名称
-        # 组1: 前缀, 组2: v_full_id, 组3: type, 组4: v_name
-        self.header_pattern = re.compile(
-            r'^(EFFECT|MODIFIER|TRIGGER|PREFERENCES)_(NIE_law_branch_\d+_id_\d+_value_\d+_idea)_([a-zA-Z0-9_]+)\s*=\s*{\s*(?:#\s*(.*?))?\s*$'
+        # 各来源文件的条目: {source_file: (category, 条目列表)}，与 meta_data 共享条目对象
+        self.file_items = {}
+        self.store = store
+        self.cache = MetaParseCache(cache_path) if cache_path and store is None else None
+        self.workers = max(1, workers or 1)
+        self.executor = executor
+        # 解析时各文件的内容哈希，写回前用于确认偏移仍然有效
+        self.file_digests = {}
+        # 匹配顶层块名: 前缀_ID_类型
+        # 组1: 前缀, 组2: v_full_id, 组3: type
+        self.name_pattern = re.compile(
+            r'^(EFFECT|MODIFIER|TRIGGER|PREFERENCES)_(NIE_law_branch_\d+_id_\d+_value_\d+_idea)_([a-zA-Z0-9_]+)$'
         )
 
-    @staticmethod
-    def _process_meta_content(lines):
-        """处理内容块，去除最小缩进量并清理首尾"""
-        if not lines:
-            return ""
-        # 合并为长字符串
-        content = "".join(lines)
-        # textwrap.dedent 会自动移除所有行共有的前置空格
-        dedented_content = textwrap.dedent(content)
-        return dedented_content.strip()
-
     def parse_file(self, file_path):
         """解析单个文件内的所有条目"""
-        log_tail = " (MetaImporter: parse_file)"
-        extracted_data = []
         if not os.path.exists(file_path):
-            return extracted_data
-
-        with open(file_path, 'r', encoding='utf-8-sig') as f:
-            lines = f.readlines()
+            return []
 
-        current_item = None
-        block_lines = []
-        brace_level = 0
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        return self._parse_raw(file_path, raw)
 
-        for line in lines:
-            line_strip = line.strip()
-            if not line_strip:
-                continue
-
-            # 尝试匹配条目开始
-            header_match = self.header_pattern.match(line_strip)
-
-            if header_match:
-                raw_name = header_match.group(4)
-                current_item = {
-                    "prefix": header_match.group(1),
-                    "v_full_id": header_match.group(2),
-                    "type": header_match.group(3),
-                    "v_name": raw_name.strip() if raw_name else "None",
-                    "source_file": file_path,
-                    "changed": False
-                }
-                if current_item["v_name"] == "None" or not current_item["v_name"]:
-                    logger.warning(f"{file_path}: {current_item['v_full_id']}没有标记名称{log_tail}")
-                block_lines = []
-                brace_level = 1
-                continue
+    def _iter_meta_blocks(self, file_path, raw):
+        """遍历文件中所有符合 meta 命名的顶层块，返回 (block, name_match)"""
+        log_tail = " (MetaImporter: parse_file)"
 
-            if current_item:
-                # 统计大括号确定块范围
-                brace_level += line.count('{')
-                brace_level -= line.count('}')
+        def on_unclosed(block):
+            logger.warning(f"{file_path}: {block.name} 大括号未闭合，已忽略{log_tail}")
 
-                if brace_level <= 0:
-                    # 块结束
-                    current_item["meta"] = self._process_meta_content(block_lines)
-                    extracted_data.append(current_item)
-                    current_item = None
-                else:
-                    # 记录内容
-                    block_lines.append(line)
+        for block in pdx_script.iter_top_level_blocks(raw, on_unclosed):
+            name_match = self.name_pattern.match(block.name)
+            if name_match:
+                yield block, name_match
 
+    def _parse_raw(self, file_path, raw):
+        """
+        解析文件的原始字节内容
+        条目中记录字节偏移: span 为整个块，header_span 为 `名称 = { # 注释` 所在行 (含缩进) 到 header 结束
+        """
+        extracted_data = []
+        for block, name_match in self._iter_meta_blocks(file_path, raw):
+            raw_name = block.comment_text(raw)
+            body_start, body_end = block.body_span(raw)
+            item = {
+                "prefix": name_match.group(1),
+                "v_full_id": name_match.group(2),
+                "type": name_match.group(3),
+                "v_name": raw_name or "None",
+                "source_file": file_path,
+                "changed": False,
+                "meta": pdx_script.dedent_body(raw[body_start:body_end]),
+                "span": (block.name_start, block.end),
+                "header_span": (block.line_start, block.header_end)
+            }
+            extracted_data.append(item)
         return extracted_data
 
-    def run_import(self):
-        """核心导入逻辑"""
+    @run_profiler.profiled("run_import")
+    def run_import(self, v_full_ids=None):
+        """
+        核心导入逻辑
+        :param v_full_ids: 只保留这些法案的条目；数据库后端按索引读取，文本后端仍需读取全部文件
+        """
         log_tail = " (MetaImporter: run_import)"
         all_meta_results = {
             "effect": [],
@@ -94,102 +194,348 @@ class MetaImporter:
         }
         # 定义对应的子文件夹
         sub_folders = all_meta_results.keys()
+        self.file_items = {}
+        if self.store is not None:
+            self._import_from_store(all_meta_results, v_full_ids)
+            return
 
+        # 先按固定顺序收集文件，保证串行与并行导入的条目顺序一致
+        file_jobs = []
         for folder in sub_folders:
             folder_path = os.path.join(self.workspace_folder, folder)
             if not os.path.exists(folder_path):
                 logger.info(f"跳过不存在的文件夹: {folder}{log_tail}")
                 continue
 
-            for filename in os.listdir(folder_path):
+            for filename in sorted(os.listdir(folder_path)):
                 if filename.endswith(".txt"):
-                    full_path = os.path.join(folder_path, filename)
-                    logger.info(f"正在解析: {full_path}{log_tail}")
-                    file_data = self.parse_file(full_path)
-                    all_meta_results[folder].extend(file_data)
+                    file_jobs.append((folder, os.path.join(folder_path, filename)))
+
+        results = self._parse_files([full_path for _, full_path in file_jobs])
+        for (folder, full_path), file_data in zip(file_jobs, results):
+            if v_full_ids is not None:
+                file_data = [item for item in file_data if item["v_full_id"] in v_full_ids]
+            all_meta_results[folder].extend(file_data)
+            self.file_items[full_path] = (folder, file_data)
+            run_profiler.count("meta_entries", len(file_data))
+            self._report_unnamed(folder, full_path, file_data)
+
+        self.meta_data = all_meta_results
+        if self.cache is not None:
+            self.cache.save()
 
+    def _import_from_store(self, all_meta_results, v_full_ids=None):
+        """从存储后端读取条目，顺序与文本导入一致"""
+        log_tail = " (MetaImporter: run_import)"
+        all_meta_results.update(self.store.load(self.workspace_folder, all_meta_results.keys(), v_full_ids))
+        for category, items in all_meta_results.items():
+            run_profiler.count("meta_entries", len(items))
+            groups = {}
+            for item in items:
+                groups.setdefault(item["source_file"], []).append(item)
+            for file_path, file_items in groups.items():
+                self.file_items[file_path] = (category, file_items)
+                self._report_unnamed(category, file_path, file_items)
         self.meta_data = all_meta_results
+        logger.info(f"已从 {self.store.db_path} 读取 {sum(map(len, all_meta_results.values()))} 个条目{log_tail}")
+
+    @staticmethod
+    def _report_unnamed(category, file_path, items):
+        """在主进程中汇总，缓存命中与并行解析的条目同样会被报告"""
+        log_tail = " (MetaImporter: run_import)"
+        for item in items:
+            if item["v_name"] == "None":
+                diagnostics.add(
+                    "unnamed_meta", category, f"{item['v_full_id']}/{item['type']}",
+                    "%s: %s没有标记名称%s", file_path, item['v_full_id'], log_tail
+                )
+
+    def reload_file(self, category, file_path):
+        """
+        重新解析单个 meta 文件，并替换其在 meta_data 中的条目 (watch 模式)
+        条目顺序与完整导入一致；文件已被删除时新条目为空
+        :param file_path: 与 run_import 相同形式的路径 (workspace/category/文件名)
+        :return: (旧条目列表, 新条目列表)
+        """
+        items = self.meta_data.setdefault(category, [])
+        groups = {}
+        for item in items:
+            groups.setdefault(item["source_file"], []).append(item)
+        old_items = groups.get(file_path, [])
+
+        if os.path.exists(file_path):
+            new_items = self._parse_files([file_path])[0]
+            self._report_unnamed(category, file_path, new_items)
+        else:
+            new_items = []
+            self.file_digests.pop(file_path, None)
+            if self.cache is not None:
+                self.cache.invalidate(file_path)
+        groups[file_path] = new_items
+        self.meta_data[category] = [item for path in sorted(groups) for item in groups[path]]
+        if new_items:
+            self.file_items[file_path] = (category, new_items)
+        else:
+            self.file_items.pop(file_path, None)
+        if self.cache is not None:
+            self.cache.save()
+        return old_items, new_items
+
+    def _parse_files(self, file_paths):
+        """
+        解析一组文件，优先读取解析缓存
+        未命中的文件在 workers > 1 时并行解析
+        :return: 与 file_paths 顺序一致的条目列表
+        """
+        log_tail = " (MetaImporter: run_import)"
+        results = [None] * len(file_paths)
+        pending = []
+        for i, full_path in enumerate(file_paths):
+            if self.cache is not None:
+                items, raw = self.cache.lookup(full_path)
+                if items is not None:
+                    logger.debug("缓存命中: %s%s", full_path, log_tail)
+                    run_profiler.count("meta_cache_hits")
+                    results[i] = items
+                    self.file_digests[full_path] = self.cache.digest(full_path)
+                    continue
+            else:
+                with open(full_path, 'rb') as f:
+                    raw = f.read()
+            logger.info("正在解析: %s%s", full_path, log_tail)
+            run_profiler.count("meta_files_parsed")
+            self.file_digests[full_path] = hashlib.sha1(raw).hexdigest()
+            pending.append((i, full_path, raw))
+
+        if self.workers > 1 and len(pending) > 1:
+            parsed = self._parse_parallel([(full_path, raw) for _, full_path, raw in pending])
+        else:
+            parsed = [self._parse_raw(full_path, raw) for _, full_path, raw in pending]
+
+        for (i, full_path, raw), items in zip(pending, parsed):
+            results[i] = items
+            if self.cache is not None:
+                self.cache.store(full_path, raw, items)
+        return results
+
+    def _parse_parallel(self, jobs):
+        """使用进程池或线程池并行解析，map 按提交顺序返回，合并结果与串行一致"""
+        log_tail = " (MetaImporter: parse_parallel)"
+        # 进程池依赖 multiprocessing，导入较慢，只在需要并行解析时导入
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+        workers = min(self.workers, len(jobs))
+        executor_cls = ProcessPoolExecutor if self.executor == "process" else ThreadPoolExecutor
+        logger.info(f"并行解析 {len(jobs)} 个文件 ({self.executor} x {workers}){log_tail}")
+        with executor_cls(max_workers=workers) as pool:
+            return list(pool.map(_parse_job, jobs))
+
+    def source_revisions(self):
+        """
+        各来源文件当前的版本，用于判断条目自上次读取后是否可能变化
+        文本后端为文件内容哈希 (写回后同步更新)，存储后端为数据库的写入版本
+        """
+        if self.store is not None:
+            revision = f"store/{self.store.revision()}"
+            return {file_path: revision for file_path in self.file_items}
+        return dict(self.file_digests)
 
-    def update_meta_files(self):
+    @run_profiler.profiled("update_meta_files")
+    def update_meta_files(self, items=None):
         """
         将同步后的 v_name 写回到物理文件中
+        :param items: 需要写回的条目 (changed 为 True)，为空时扫描全部条目
         """
         log_tail = " (MetaImporter: update_meta_files)"
         logger.info(f"开始执行元数据物理写回...{log_tail}")
+        if items is None:
+            items = [item for category_items in self.meta_data.values() for item in category_items if item["changed"]]
+        if self.store is not None:
+            self._update_store(items)
+            return
         update_count = 0
 
-        for category, items in self.meta_data.items():
-            # 按文件归类，减少开关文件的次数
-            file_map = {}
-            for i in range(len(items)):
-                item = items[i]
-                if not item["changed"]:
-                    continue
-                self.meta_data[category][i]["changed"] = False
-                f_path = item.get('source_file')
-                if f_path:
-                    file_map.setdefault(f_path, []).append(item)
+        # 按文件归类，减少开关文件的次数
+        file_map = {}
+        for item in items:
+            if not item["changed"]:
+                continue
+            item["changed"] = False
+            f_path = item.get('source_file')
+            if f_path:
+                file_map.setdefault(f_path, []).append(item)
 
-            for file_path, file_items in file_map.items():
-                if self._update_single_file(file_path, file_items):
-                    update_count += 1
+        for file_path, changed_items in file_map.items():
+            # 同一文件的全部条目，写回后需要平移它们记录的偏移
+            file_items = self.file_items.get(file_path, (None, changed_items))[1]
+            if self._update_single_file(file_path, changed_items, file_items):
+                update_count += 1
+
+        if self.cache is not None:
+            self.cache.save()
 
         logger.info(f"写回完成，共更新 {update_count} 个元数据文件。{log_tail}")
 
-    def _update_single_file(self, file_path, items):
-        """更新单个文件中的 header 注释"""
+    def _update_store(self, items):
+        """存储后端: 在一个事务中写回变化条目的名称与 header"""
+        log_tail = " (MetaImporter: update_meta_files)"
+        updates = []
+        for item in items:
+            if not item["changed"]:
+                continue
+            item["changed"] = False
+            old_header = self.store.header_of(item["rowid"])
+            if old_header is None:
+                continue
+            new_header = self._build_header(item, old_header)
+            if new_header != old_header:
+                logger.info("id: %s 已更改%s", item['v_full_id'], log_tail)
+                # 与重新解析导出的文本得到的名称一致
+                updates.append((item["rowid"], (item.get("v_name") or "").strip() or "None", new_header))
+        if updates:
+            self.store.update_headers(updates)
+        logger.info(f"写回完成，共更新 {len(updates)} 个条目。{log_tail}")
+
+    @staticmethod
+    def _build_header(item, old_header):
+        """
+        以条目当前的名称重建 header
+        格式：PREFIX_ID_TYPE = { # 注释，保持原行的缩进（如果有的话）
+        """
+        new_name = (item.get('v_name') or "").strip()
+        comment_part = f" # {new_name}" if new_name else ""
+        indent = old_header[:len(old_header) - len(old_header.lstrip(b" \t"))]
+        return indent + f"{item['prefix']}_{item['v_full_id']}_{item['type']} = {{{comment_part}".encode("utf-8")
+
+    def _update_single_file(self, file_path, items, file_items=None):
+        """
+        按解析时记录的 header 偏移就地修补单个文件中的 header 注释
+        文件在解析后被外部修改时重新定位 header；内容不变时不写文件，写入通过临时文件 + 重命名完成
+        :param items: 需要写回的条目
+        :param file_items: 该文件的全部条目，写回后更新其偏移，默认为 items
+        """
         log_tail = " (MetaImporter: update_single_file)"
         if not os.path.exists(file_path):
             return False
+        if file_items is None:
+            file_items = items
+
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+
+        stale = self.file_digests.get(file_path) != hashlib.sha1(raw).hexdigest()
+        if stale:
+            logger.warning(f"{file_path}: 文件在解析后已被修改，按当前内容重新定位条目{log_tail}")
+            self._refresh_items(file_path, raw, file_items)
+
+        patches = []
+        for item in items:
+            if 'header_span' not in item:
+                if stale:
+                    logger.warning("%s: %s 已不在文件中，跳过写回%s", file_path, item['v_full_id'], log_tail)
+                continue
+            start, end = item['header_span']
+            old_header = raw[start:end]
+            new_header = self._build_header(item, old_header)
+            if new_header != old_header:
+                logger.info("id: %s 已更改%s", item['v_full_id'], log_tail)
+                patches.append((start, end, new_header))
+
+        if not patches:
+            return False
+        patches.sort(key=lambda p: p[0])
+
+        chunks = []
+        last_end = 0
+        for start, end, new_header in patches:
+            chunks.append(raw[last_end:start])
+            chunks.append(new_header)
+            last_end = end
+        chunks.append(raw[last_end:])
+        new_raw = b"".join(chunks)
+
+        self._atomic_write(file_path, new_raw)
+        self._shift_spans(file_items, patches)
+        self.file_digests[file_path] = hashlib.sha1(new_raw).hexdigest()
+        if self.cache is not None:
+            if stale:
+                # 内存中的条目与文件不再一一对应 (可能有新增或删除)，下次导入时重新解析
+                self.cache.invalidate(file_path)
+            else:
+                self.cache.store(file_path, new_raw, file_items)
+        return True
+
+    def _refresh_items(self, file_path, raw, file_items):
+        """
+        以文件当前内容重新解析，按 (ID, 类型) 与出现顺序更新条目的偏移与内容
+        文件中已不存在的条目移除偏移，不再参与写回与平移
+        """
+        fresh_items = {}
+        for fresh in self._parse_raw(file_path, raw):
+            fresh_items.setdefault((fresh['v_full_id'], fresh['type']), []).append(fresh)
+        for item in file_items:
+            candidates = fresh_items.get((item['v_full_id'], item['type']))
+            if candidates:
+                fresh = candidates.pop(0)
+                for key in ("prefix", "meta", "span", "header_span"):
+                    item[key] = fresh[key]
+            else:
+                item.pop('span', None)
+                item.pop('header_span', None)
 
-        with open(file_path, 'r', encoding='utf-8-sig') as f:
-            lines = f.readlines()
-
-        modified = False
-        new_lines = []
-
-        # 将 items 转换为 ID 映射，方便快速查找
-        items_by_id = {(it['v_full_id'], it['type']): it for it in items}
-
-        for line in lines:
-            line_strip = line.strip()
-            header_match = self.header_pattern.match(line_strip)
+    @staticmethod
+    def _atomic_write(file_path, data):
+        """写入同目录下的临时文件后重命名，避免写到一半的文件被游戏或编辑器读取"""
+        folder = os.path.dirname(os.path.abspath(file_path))
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            shutil.copymode(file_path, tmp_path)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
 
-            if header_match:
-                prefix = header_match.group(1)
-                v_id = header_match.group(2)
-                m_type = header_match.group(3)
+    @staticmethod
+    def _shift_spans(file_items, patches):
+        """
+        根据已应用的补丁平移条目偏移
+        :param patches: 按起点排序的 (start, end, new_bytes)
+        """
+        starts = [p[0] for p in patches]
+        # deltas[i]: 前 i 个补丁造成的累计长度变化
+        deltas = [0]
+        for start, end, new_bytes in patches:
+            deltas.append(deltas[-1] + len(new_bytes) - (end - start))
 
-                # 匹配对应的更新项
-                if (v_id, m_type) in items_by_id:
-                    updated_item = items_by_id[(v_id, m_type)]
-                    new_name = (updated_item.get('v_name') or "").strip()
+        def remap(pos):
+            i = bisect.bisect_right(starts, pos) - 1
+            if i < 0:
+                return pos
+            # 补丁区间内部 (header 中的名称) 只受之前补丁影响，缩进保持不变
+            return pos + (deltas[i] if pos < patches[i][1] else deltas[i + 1])
 
-                    # 构建新的 header 行
-                    # 格式：PREFIX_ID_TYPE = { # 注释
-                    comment_part = f" # {new_name}" if new_name else ""
-                    # 保持原行的缩进（如果有的话）
-                    indent = line[:line.find(header_match.group(1))]
-                    new_line = f"{indent}{prefix}_{v_id}_{m_type} = {{{comment_part}\n"
-                    logger.info(f"id: v_id 已更改{log_tail}")
-                    if new_line != line:
-                        new_lines.append(new_line)
-                        modified = True
-                        continue
+        for item in file_items:
+            if 'span' in item:
+                item['span'] = (remap(item['span'][0]), remap(item['span'][1]))
+            if 'header_span' in item:
+                item['header_span'] = (remap(item['header_span'][0]), remap(item['header_span'][1]))
 
-            new_lines.append(line)
 
-        if modified:
-            with open(file_path, 'w', encoding='utf-8-sig') as f:
-                f.writelines(new_lines)
-            return True
-        return False
+def _parse_job(job):
+    """并行解析的工作函数，需位于模块顶层以便进程池序列化"""
+    file_path, raw = job
+    return MetaImporter(None)._parse_raw(file_path, raw)
 
 
 # --- 执行示例 ---
 if __name__ == "__main__":
+    log_manager.init_logger(level=logging.DEBUG, log_folder="pdx_logs")
     WORKSPACE = r"meta_files"
-    importer = MetaImporter(WORKSPACE)
+    importer = MetaImporter(WORKSPACE, cache_path=r".build_cache/meta_parse_cache.pickle")
+    importer.run_import()
 
     # 打印提取结果示例
     for key in importer.meta_data:
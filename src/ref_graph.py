@@ -0,0 +1,162 @@
+import os
+import re
+
+import pdx_script
+
+# 引用方键的前缀 -> 受影响的输出 (GenerateModFiles.OUTPUT_DEPENDENCIES 的键)
+_OUTPUTS_BY_PREFIX = {
+    "meta/trigger/": ("trigger",),
+    "meta/effect/": ("effect",),
+    "meta/modifier/": ("ideas",),
+    "meta/preferences/": ("ideas", "loc"),
+    "ideas/": ("ideas",),
+    "init/": ("init",)
+}
+
+# 需要检查是否被引用的定义来源
+SCRIPTED_ORIGINS = ("trigger", "effect", "loc", "init")
+
+
+class ReferenceGraph:
+    """
+    法案 ID / scripted ID 的引用关系图
+    引用方为 meta 条目 (键与 BuildManifest 输入键一致，如 meta/trigger/<v_full_id>/available)、
+    ideas 中的法案条目 (ideas/<v_full_id>)、开局初始法案 (init/<effect>) 与手写脚本块 (hand/<文件名>/<块名>)。
+    正向表记录每个引用方引用的 ID，反向表记录每个 ID 的引用方；引用方可单独替换，无需重建整张图。
+    """
+
+    def __init__(self, mod_id):
+        # 只收集本 mod 的 ID，如 NIE_law_branch_1_id_1_value_1_idea、TRIGGER_NIE_law_..._available
+        self.id_pattern = re.compile(rf"(?:[A-Za-z]+_)?{re.escape(mod_id)}_law\w*")
+        self.mod_marker = mod_id.encode("utf-8")
+        # id -> 定义来源 (输出名或 hand/<文件名>)
+        self.definitions = {}
+        # 引用方 -> 其内容所定义的 ID (scripted 条目的正文来自对应 meta 条目)
+        self.provides = {}
+        self.references = {}
+        self.referencers = {}
+
+    def extract_refs(self, text):
+        """用 pdx_script 词法分析提取引用的 ID，注释与字符串中的内容不计入"""
+        data = text.encode("utf-8") if isinstance(text, str) else text
+        if self.mod_marker not in data:
+            return set()
+        fullmatch = self.id_pattern.fullmatch
+        refs = set()
+        for kind, start, end in pdx_script.tokenize(data):
+            if kind == pdx_script.TOKEN_WORD:
+                word = data[start:end].decode("utf-8")
+                if fullmatch(word):
+                    refs.add(word)
+        return refs
+
+    def clear_definitions(self):
+        self.definitions = {}
+        self.provides = {}
+
+    def define(self, ref_id, origin, provider=None):
+        """
+        登记一个定义
+        :param origin: 定义所在的输出 (ideas / trigger / effect / loc ...) 或 hand/<文件名>
+        :param provider: 提供该定义正文的引用方键
+        """
+        self.definitions[ref_id] = origin
+        if provider is not None:
+            self.provides.setdefault(provider, set()).add(ref_id)
+
+    def set_references(self, referencer, ids):
+        """替换某个引用方的全部引用，并同步反向表"""
+        new_ids = frozenset(ids)
+        old_ids = self.references.get(referencer, frozenset())
+        for ref_id in old_ids - new_ids:
+            users = self.referencers[ref_id]
+            users.discard(referencer)
+            if not users:
+                del self.referencers[ref_id]
+        for ref_id in new_ids - old_ids:
+            self.referencers.setdefault(ref_id, set()).add(referencer)
+        if new_ids:
+            self.references[referencer] = new_ids
+        else:
+            self.references.pop(referencer, None)
+
+    def remove_referencer(self, referencer):
+        self.set_references(referencer, ())
+
+    def remove_referencers(self, prefix):
+        for referencer in [r for r in self.references if r.startswith(prefix)]:
+            self.remove_referencer(referencer)
+
+    def dependents(self, ref_id):
+        """直接引用 ref_id 的引用方"""
+        return set(self.referencers.get(ref_id, ()))
+
+    def invalidate(self, ids):
+        """
+        反向依赖传递: 引用方自身提供的定义会继续向上查找引用者
+        :param ids: 发生变化 (新增、删除、内容变化) 的 ID
+        :return: 受影响的全部引用方键
+        """
+        affected = set()
+        pending = list(ids)
+        seen = set(pending)
+        while pending:
+            for referencer in self.referencers.get(pending.pop(), ()):
+                if referencer in affected:
+                    continue
+                affected.add(referencer)
+                for provided in self.provides.get(referencer, ()):
+                    if provided not in seen:
+                        seen.add(provided)
+                        pending.append(provided)
+        return affected
+
+    @staticmethod
+    def group_of(key):
+        """诊断分组: meta 条目按分类，其余按键的第一段 (ideas / hand)"""
+        parts = key.split("/")
+        return parts[1] if parts[0] == "meta" else parts[0]
+
+    @staticmethod
+    def outputs_of(referencers):
+        """引用方键对应的输出名"""
+        outputs = set()
+        for referencer in referencers:
+            for prefix, names in _OUTPUTS_BY_PREFIX.items():
+                if referencer.startswith(prefix):
+                    outputs.update(names)
+        return outputs
+
+    def dangling(self):
+        """被引用但没有任何定义的 ID: {id: [引用方...]}"""
+        return {
+            ref_id: sorted(users)
+            for ref_id, users in sorted(self.referencers.items())
+            if ref_id not in self.definitions
+        }
+
+    def unused(self):
+        """已生成或手写但没有被任何地方引用的 scripted ID"""
+        return sorted(
+            ref_id for ref_id, origin in self.definitions.items()
+            if (origin in SCRIPTED_ORIGINS or origin.startswith("hand/")) and ref_id not in self.referencers
+        )
+
+    def scan_script_file(self, file_path):
+        """
+        登记手写脚本文件: 符合本 mod 命名的顶层块视为定义，块内容中的 ID 视为引用
+        :return: 是否读取成功
+        """
+        if not os.path.exists(file_path):
+            return False
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        file_name = os.path.basename(file_path)
+        self.remove_referencers(f"hand/{file_name}/")
+        for block in pdx_script.iter_top_level_blocks(raw):
+            referencer = f"hand/{file_name}/{block.name}"
+            if self.id_pattern.fullmatch(block.name):
+                self.define(block.name, f"hand/{file_name}", referencer)
+            body_start, body_end = block.body_span(raw)
+            self.set_references(referencer, self.extract_refs(raw[body_start:body_end]))
+        return True
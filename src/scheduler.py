@@ -0,0 +1,112 @@
+"""
+输出任务调度
+模型、meta 索引与脚本 ID 准备完成后，各输出文件的生成相互独立，只有少数顺序约束
+(如本地化名称同步必须在 scripted 文件之前)。TaskScheduler 以有向无环图描述这些约束，
+依赖完成的任务立即提交到线程池，总耗时取决于最长的依赖链而不是全部任务之和。
+"""
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from log import log_manager
+from profiler import run_profiler
+
+logger = log_manager.get_logger()
+
+
+class TaskScheduler:
+    """
+    :param workers: 线程数，1 为按拓扑顺序串行执行，与逐个调用的结果一致
+    """
+
+    def __init__(self, workers=1):
+        self.workers = max(1, workers or 1)
+        # name -> (func, 依赖的任务名)
+        self.tasks = {}
+        self.durations = {}
+
+    def add(self, name, func, after=()):
+        if name in self.tasks:
+            raise ValueError(f"任务重复: {name}")
+        self.tasks[name] = (func, tuple(after))
+
+    def include(self, other, prefix):
+        """并入另一个调度器的全部任务，任务名与依赖均加上 <prefix>/ 前缀"""
+        for name, (func, after) in other.tasks.items():
+            self.add(f"{prefix}/{name}", func, [f"{prefix}/{dep}" for dep in after])
+
+    def _order(self):
+        """检查依赖并返回拓扑顺序 (同层保持添加顺序)"""
+        for name, (_, after) in self.tasks.items():
+            for dep in after:
+                if dep not in self.tasks:
+                    raise ValueError(f"任务 {name} 依赖不存在的任务 {dep}")
+        order = []
+        done = set()
+        pending = list(self.tasks)
+        while pending:
+            ready = [name for name in pending if all(dep in done for dep in self.tasks[name][1])]
+            if not ready:
+                raise ValueError(f"任务依赖存在环: {', '.join(pending)}")
+            order.extend(ready)
+            done.update(ready)
+            pending = [name for name in pending if name not in done]
+        return order
+
+    def _run_task(self, name, parent_frame=None):
+        func = self.tasks[name][0]
+        start = time.perf_counter()
+        with run_profiler.attach(parent_frame):
+            func()
+        self.durations[name] = time.perf_counter() - start
+
+    def run(self):
+        """
+        执行全部任务；任一任务出错时不再提交新任务，等待已开始的任务结束后抛出第一个异常
+        """
+        log_tail = " (TaskScheduler: run)"
+        order = self._order()
+        start = time.perf_counter()
+        if self.workers == 1 or len(order) <= 1:
+            for name in order:
+                self._run_task(name)
+        else:
+            self._run_parallel(order)
+        wall = time.perf_counter() - start
+        logger.info(
+            "调度完成: %d 个任务 (线程 %d)，耗时 %.1f ms，任务合计 %.1f ms，最慢 %s%s",
+            len(order), self.workers, wall * 1000, sum(self.durations.values()) * 1000,
+            max(self.durations, key=self.durations.get, default="-"), log_tail
+        )
+
+    def _run_parallel(self, order):
+        parent_frame = run_profiler.current_frame()
+        # 每个任务尚未完成的依赖数，依赖完成时递减，不必每次重新扫描全部等待中的任务
+        remaining = {name: len(self.tasks[name][1]) for name in order}
+        dependents = {name: [] for name in order}
+        for name in order:
+            for dep in self.tasks[name][1]:
+                dependents[dep].append(name)
+        ready = deque(name for name in order if remaining[name] == 0)
+        running = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(order)), thread_name_prefix="emit") as pool:
+            while ready or running:
+                if error is None:
+                    while ready:
+                        name = ready.popleft()
+                        running[pool.submit(self._run_task, name, parent_frame)] = name
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    if future.exception() is not None:
+                        error = error or future.exception()
+                        continue
+                    for dependent in dependents[name]:
+                        remaining[dependent] -= 1
+                        if remaining[dependent] == 0:
+                            ready.append(dependent)
+        if error is not None:
+            raise error
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import re
+
+from log import log_manager
+from profiler import run_profiler
+
+logger = log_manager.get_logger()
+
+
+def _natural_key(name):
+    """branch_2 排在 branch_10 之前"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+class StructureCache:
+    """
+    structure 解析结果缓存
+    json5 为纯 Python 实现，解析较慢。解析成功后以普通 JSON 保存结果，并以源文件内容哈希为键，
+    源文件未变化时直接用标准库 json 读取。
+    structure 可以是单个文件，也可以是每个分支一个文件的目录，目录中的每个文件单独缓存。
+    """
+    VERSION = 1
+    SOURCE_SUFFIXES = (".json5", ".json")
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.records = {}
+        self._used = set()
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        log_tail = " (StructureCache: load)"
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"structure 缓存读取失败，将重新解析: {e}{log_tail}")
+            return
+        if raw.get("version") == self.VERSION:
+            self.records = raw.get("records", {})
+
+    def save(self, prune=False):
+        """
+        :param prune: 只保留本次用到的源文件记录，已删除或拆分前的旧文件随之清理。
+                      structure 与各语言的文本覆盖分别读取，需在全部读取完成后 (构建结束时) 才清理
+        """
+        log_tail = " (StructureCache: save)"
+        if prune and len(self._used) != len(self.records):
+            self.records = {k: v for k, v in self.records.items() if k in self._used}
+            self.dirty = True
+        if not self.dirty:
+            return
+        folder = os.path.dirname(self.cache_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": self.VERSION, "records": self.records}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+        self.dirty = False
+        logger.debug(f"structure 缓存已保存: {self.cache_path}{log_tail}")
+
+    def load_file(self, file_path):
+        """读取单个 structure 文件，内容哈希与缓存一致时跳过 json5 解析"""
+        log_tail = " (StructureCache: load_file)"
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha1(raw).hexdigest()
+        key = os.path.abspath(file_path)
+        self._used.add(key)
+        record = self.records.get(key)
+        if record is not None and record.get("digest") == digest:
+            logger.debug("structure 缓存命中: %s%s", file_path, log_tail)
+            run_profiler.count("structure_cache_hits")
+            return record["data"]
+
+        logger.info("正在解析 structure: %s%s", file_path, log_tail)
+        run_profiler.count("structure_files_parsed")
+        # json5 为纯 Python 实现，导入也较慢，缓存命中时不导入
+        import json5
+        data = json5.loads(raw.decode("utf-8-sig"))
+        self.records[key] = {"digest": digest, "data": data}
+        self.dirty = True
+        return data
+
+    def load(self, path):
+        """
+        读取 structure
+        :param path: 单个 json5 文件，或按分支拆分的目录 (目录内文件按自然顺序合并顶层键)
+        :return: 与直接 json5.load 整个文件一致的 dict
+        """
+        log_tail = " (StructureCache: load)"
+        if not os.path.isdir(path):
+            data = self.load_file(path)
+        else:
+            data = {}
+            names = sorted((n for n in os.listdir(path) if n.endswith(self.SOURCE_SUFFIXES)), key=_natural_key)
+            for name in names:
+                for key, value in self.load_file(os.path.join(path, name)).items():
+                    if key in data:
+                        logger.warning(f"{name}: 顶层键 {key} 重复，后读取的文件将覆盖之前的内容{log_tail}")
+                    data[key] = value
+        self.save()
+        return data
@@ -0,0 +1,179 @@
+"""
+scripted trigger 优化
+在输出前分析 trigger 类 meta 内容，减少游戏内每次评估法案时需要执行的 scripted trigger:
+    1. 内容为空或恒为真 (`always = yes`) 的 available 直接省略，其他类型改为内联 `always = yes`
+    2. 只有一条单行语句的 trigger 内联到 ideas 中
+    3. 内容完全相同的 trigger 合并为一个共享 trigger
+    4. 同一槽位的 `OR = { has_idea = ... }` 阶梯按值集合合并为共享 trigger，单个 has_idea 直接内联
+被 ideas 以外的地方 (其他 meta、手写脚本) 引用的 scripted trigger 仍会保留定义。
+"""
+import hashlib
+import re
+
+import pdx_script
+
+ALWAYS_TRUE = "always = yes"
+
+_VALUE_ID_RE = re.compile(r"^(?P<slot>\w+_id_\d+)_value_(?P<value>\d+)_idea$")
+# 可以内联的单条语句的最大长度
+INLINE_MAX_LENGTH = 80
+
+
+def split_statements(body):
+    """
+    将 trigger 内容拆分为顶层语句 (`key op value` 或 `key = { ... }`)，注释会被去除
+    :return: 语句文本列表；无法识别的结构返回 None
+    """
+    data = body.encode("utf-8")
+    statements = []
+    depth = 0
+    start = None
+    expect = "key"
+    for kind, tok_start, tok_end in pdx_script.tokenize(data):
+        if kind == pdx_script.TOKEN_COMMENT:
+            continue
+        if depth > 0:
+            if kind == pdx_script.TOKEN_LBRACE:
+                depth += 1
+            elif kind == pdx_script.TOKEN_RBRACE:
+                depth -= 1
+                if depth == 0:
+                    statements.append(data[start:tok_end].decode("utf-8"))
+                    expect = "key"
+            continue
+        if expect == "key" and kind in (pdx_script.TOKEN_WORD, pdx_script.TOKEN_STRING):
+            start = tok_start
+            expect = "op"
+        elif expect == "op" and kind == pdx_script.TOKEN_OP:
+            expect = "value"
+        elif expect == "value" and kind == pdx_script.TOKEN_LBRACE:
+            depth = 1
+        elif expect == "value" and kind in (pdx_script.TOKEN_WORD, pdx_script.TOKEN_STRING):
+            statements.append(data[start:tok_end].decode("utf-8"))
+            expect = "key"
+        else:
+            return None
+    if expect != "key" or depth:
+        return None
+    return statements
+
+
+def _ladder_ideas(statement):
+    """`OR = { has_idea = ... }` 阶梯中的全部 idea；含其他语句时返回 None"""
+    head, _, rest = statement.partition("=")
+    if head.strip() != "OR" or not rest.strip().startswith("{"):
+        return None
+    inner = split_statements(rest.strip()[1:-1])
+    if not inner:
+        return None
+    ideas = []
+    for item in inner:
+        key, op, value = (part.strip() for part in item.partition("="))
+        if key != "has_idea" or not op or not _VALUE_ID_RE.match(value):
+            return None
+        ideas.append(value)
+    return ideas
+
+
+class TriggerPlan:
+    """
+    优化结果
+    calls: scripted ID -> ideas 中的调用文本，None 表示省略整个块
+    definitions: 需要输出的 [(名称, 注释用的 v_full_id 或 None, 内容)]
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.definitions = []
+        self.stats = {"dropped": 0, "inlined": 0, "deduplicated": 0, "ladders": 0, "kept": 0}
+
+    def call(self, scripted_id):
+        return self.calls.get(scripted_id, f"{scripted_id} = yes")
+
+
+class TriggerOptimizer:
+    """
+    :param mod_id: 共享 trigger 的命名前缀
+    :param external_refs: scripted ID -> 是否被 ideas 以外的地方引用
+    """
+
+    def __init__(self, mod_id, external_refs=None):
+        self.mod_id = mod_id
+        self.external_refs = external_refs or (lambda scripted_id: False)
+        self.plan = TriggerPlan()
+        self._shared_by_body = {}
+
+    def _ladder_trigger(self, ideas):
+        """为同一槽位的 has_idea 阶梯生成共享 trigger，返回替换后的语句"""
+        matches = [_VALUE_ID_RE.match(idea) for idea in ideas]
+        slots = {m.group("slot") for m in matches}
+        unique = sorted(set(ideas), key=lambda idea: int(_VALUE_ID_RE.match(idea).group("value")))
+        if len(unique) == 1:
+            return f"has_idea = {unique[0]}"
+        if len(slots) != 1:
+            return None
+        values = "_".join(_VALUE_ID_RE.match(idea).group("value") for idea in unique)
+        name = f"TRIGGER_{slots.pop()}_laws_any_{values}"
+        body = "OR = {\n" + "".join(f"    has_idea = {idea}\n" for idea in unique) + "}"
+        self._share(name, body)
+        self.plan.stats["ladders"] += 1
+        return f"{name} = yes"
+
+    def _share(self, name, body):
+        if body not in self._shared_by_body:
+            self._shared_by_body[body] = name
+            self.plan.definitions.append((name, None, body))
+        return self._shared_by_body[body]
+
+    def _rewrite_ladders(self, body):
+        statements = split_statements(body)
+        if statements is None:
+            return body, None
+        rewritten = []
+        changed = False
+        for statement in statements:
+            ideas = _ladder_ideas(statement)
+            replacement = self._ladder_trigger(ideas) if ideas else None
+            if replacement is not None:
+                rewritten.append(replacement)
+                changed = True
+            else:
+                rewritten.append(statement)
+        return ("\n".join(rewritten) if changed else body), rewritten
+
+    def optimize(self, entries):
+        """
+        :param entries: [(scripted_id, v_full_id, m_type, body)...]，按原输出顺序
+        :return: TriggerPlan
+        """
+        plan = self.plan
+        pending = []
+        body_counts = {}
+        for scripted_id, v_full_id, m_type, body in entries:
+            body, statements = self._rewrite_ladders(body)
+            if statements is not None and (not statements or statements == [ALWAYS_TRUE]):
+                plan.calls[scripted_id] = None if m_type == "available" else ALWAYS_TRUE
+                plan.stats["dropped"] += 1
+            elif statements is not None and len(statements) == 1 and "\n" not in statements[0] \
+                    and len(statements[0]) <= INLINE_MAX_LENGTH:
+                plan.calls[scripted_id] = statements[0]
+                plan.stats["inlined"] += 1
+            else:
+                body_counts[body] = body_counts.get(body, 0) + 1
+                pending.append((scripted_id, v_full_id, body))
+                continue
+            if self.external_refs(scripted_id):
+                plan.definitions.append((scripted_id, v_full_id, body))
+
+        for scripted_id, v_full_id, body in pending:
+            if body_counts[body] > 1:
+                digest = hashlib.sha1(body.encode("utf-8")).hexdigest()[:8]
+                shared = self._share(f"TRIGGER_{self.mod_id}_law_shared_{digest}", body)
+                plan.calls[scripted_id] = f"{shared} = yes"
+                plan.stats["deduplicated"] += 1
+                if self.external_refs(scripted_id):
+                    plan.definitions.append((scripted_id, v_full_id, body))
+            else:
+                plan.definitions.append((scripted_id, v_full_id, body))
+                plan.stats["kept"] += 1
+        return plan
@@ -0,0 +1,208 @@
+"""
+多目标构建
+一个配置文件中定义多个变体 (如兼容补丁)，每个变体有自己的 MOD_ID、输出目录与覆盖文件。
+structure、meta 与文本覆盖只解析一次 (本地化名称同步也只执行一次)，各变体在此基础上叠加覆盖:
+未被覆盖的 structure 子树与 meta 条目在变体之间共享，只复制被修改的路径；
+全部变体的输出任务并入同一个调度器，在一个进程内并行生成。
+
+配置格式 (json5，路径相对于配置文件所在目录):
+    {
+        "main": {"output_root": "dist_mod"},
+        "compat_x": {
+            "output_root": "dist_variants/compat_x",
+            "mod_id": "NIEX",                          // 缺省为 MOD_ID
+            "colon_style": ":",                        // 缺省为 COLON_STYLE
+            "structure": "variants/compat_x.json5",    // 按键递归合并到 structure，值为 null 时删除该键
+            "meta": "variants/compat_x_meta"           // 与 meta_files 相同的目录结构，同名条目覆盖基础条目
+        }
+    }
+覆盖的 meta 与基础 meta 一样使用 MOD_ID 的 ID；变体的 mod_id 不同时，
+meta、文本覆盖与 init_rules 的 effect 名称中的 <MOD_ID>_law_ ID 会被替换为 <mod_id>_law_ (手写脚本中的 ID 不会被替换)。
+"""
+import os
+import re
+from dataclasses import dataclass
+
+from diagnostics import diagnostics
+from generate_mod import (BUILD_CACHE_FOLDER, COLON_STYLE, DIAGNOSTICS_DETAIL, EMIT_WORKERS, META_IMPORTER_WORKSPACE,
+                          MOD_ID, GenerateModFiles)
+from log import log_manager
+from profiler import run_profiler
+from read_res_file import MetaImporter
+from scheduler import TaskScheduler
+
+logger = log_manager.get_logger()
+
+_MOD_ID_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9]*")
+
+
+@dataclass(frozen=True)
+class Variant:
+    name: str
+    output_root: str
+    mod_id: str = MOD_ID
+    colon_style: str = COLON_STYLE
+    # 覆盖文件的路径，为空表示不覆盖
+    structure: str = None
+    meta: str = None
+
+    FIELDS = ("output_root", "mod_id", "colon_style", "structure", "meta")
+
+
+def load_variants(config_path, structure_cache):
+    """
+    读取变体配置，路径转为相对于当前目录
+    :param structure_cache: 与 structure 共用的解析缓存
+    :return: [Variant...]，按配置中的顺序
+    """
+    raw = structure_cache.load_file(config_path)
+    if not isinstance(raw, dict) or not raw:
+        raise ValueError(f"{config_path}: 变体配置应为 {{变体名: 配置}}")
+    base_folder = os.path.dirname(config_path)
+    variants = []
+    output_roots = {}
+    for name, options in raw.items():
+        if not isinstance(options, dict):
+            raise ValueError(f"{config_path}: 变体 {name} 的配置应为对象")
+        unknown = set(options).difference(Variant.FIELDS)
+        if unknown:
+            raise ValueError(f"{config_path}: 变体 {name} 有未知的配置项: {', '.join(sorted(unknown))}")
+        if not options.get("output_root"):
+            raise ValueError(f"{config_path}: 变体 {name} 没有 output_root")
+        if "mod_id" in options and not _MOD_ID_PATTERN.fullmatch(str(options["mod_id"])):
+            raise ValueError(f"{config_path}: 变体 {name} 的 mod_id 只能由字母与数字组成: {options['mod_id']}")
+        for key in ("output_root", "structure", "meta"):
+            if options.get(key):
+                options = {**options, key: os.path.normpath(os.path.join(base_folder, options[key]))}
+        other = output_roots.setdefault(options["output_root"], name)
+        if other != name:
+            raise ValueError(f"{config_path}: 变体 {other} 与 {name} 的 output_root 相同")
+        variants.append(Variant(name, **options))
+    return variants
+
+
+def merge_structure(base, overlay):
+    """
+    将覆盖按键递归合并到 structure，不修改 base: 只复制被覆盖的路径上的字典，其余子树与 base 共享
+    覆盖中值为 None 的键被删除，非字典的值整体替换
+    """
+    merged = dict(base)
+    for key, value in overlay.items():
+        if value is None:
+            merged.pop(key, None)
+        elif isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_structure(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+class IdRenamer:
+    """将 <MOD_ID>_law_ 开头的 ID (含 TRIGGER_ 等前缀后的部分) 替换为变体的 mod_id"""
+
+    def __init__(self, base_id, mod_id):
+        self.pattern = re.compile(rf"(?<![A-Za-z0-9]){re.escape(base_id)}_law_")
+        self.replacement = f"{mod_id}_law_"
+
+    def __call__(self, text):
+        return self.pattern.sub(self.replacement, text)
+
+    def items(self, items):
+        return [{**item, "v_full_id": self(item["v_full_id"]), "meta": self(item["meta"])} for item in items]
+
+    def texts(self, texts):
+        return {self(key): value for key, value in texts.items()}
+
+
+def derive_meta(base_meta, overlay_meta, renamer=None):
+    """
+    变体的 meta: 覆盖条目追加在基础条目之后，按导入的覆盖顺序替换同名条目
+    没有覆盖且不需要替换 ID 的分类直接共享基础的条目列表
+    """
+    meta_data = {}
+    for category, items in base_meta.items():
+        extra = overlay_meta.get(category, [])
+        if renamer is not None:
+            items = renamer.items(items)
+            extra = renamer.items(extra)
+        meta_data[category] = items + extra if extra else items
+    return meta_data
+
+
+class VariantBuild:
+    """
+    :param config_path: 变体配置
+    :param json_path: 基础 structure
+    :param incremental: 各变体在 <cache_folder>/variants/<变体名> 中保存自己的构建清单
+    """
+
+    def __init__(self, config_path, json_path, incremental=True,
+                 meta_workspace=META_IMPORTER_WORKSPACE, cache_folder=BUILD_CACHE_FOLDER):
+        self.cache_folder = cache_folder
+        # 构造时会清空诊断，需在读取 structure 与 meta 之前创建全部实例
+        self.base = GenerateModFiles(json_path, None, meta_workspace=meta_workspace, cache_folder=cache_folder)
+        self.variants = load_variants(config_path, self.base.structure_cache)
+        self.generators = {
+            variant.name: GenerateModFiles(
+                json_path, variant.output_root, incremental=incremental, meta_workspace=meta_workspace,
+                cache_folder=os.path.join(cache_folder, "variants", variant.name),
+                mod_id=variant.mod_id, colon_style=variant.colon_style
+            )
+            for variant in self.variants
+        }
+
+    def build(self, report=True):
+        log_tail = " (VariantBuild: build)"
+        # 共享输入: 基础 structure 与 meta 只解析一次，本地化名称同步与写回也只执行一次
+        self.base.sync_localization()
+        with run_profiler.stage("apply_overlays"):
+            for variant in self.variants:
+                self._apply_overlays(variant)
+
+        scheduler = TaskScheduler(EMIT_WORKERS)
+        for variant in self.variants:
+            scheduler.include(self.generators[variant.name].prepare_build(), variant.name)
+        logger.info(f"{len(self.variants)} 个变体共 {len(scheduler.tasks)} 个输出任务{log_tail}")
+        with run_profiler.stage("emit_outputs"):
+            scheduler.run()
+        for generator in self.generators.values():
+            generator.finish_build()
+        self.base.structure_cache.save(prune=True)
+
+        diagnostics.log_summary()
+        if DIAGNOSTICS_DETAIL:
+            diagnostics.write_detail(os.path.join(log_manager.log_folder, "diagnostics.json"))
+        if report:
+            run_profiler.write_report(log_manager.log_folder)
+
+    def _apply_overlays(self, variant):
+        log_tail = " (VariantBuild: apply_overlays)"
+        base = self.base
+        data = base.data
+        if variant.structure:
+            overlay = base.structure_cache.load(variant.structure)
+            if not isinstance(overlay, dict):
+                raise ValueError(f"{variant.structure}: structure 覆盖应为对象")
+            data = merge_structure(data, overlay)
+
+        overlay_meta = {}
+        if variant.meta:
+            importer = MetaImporter(
+                variant.meta, cache_path=os.path.join(self.cache_folder, "variants", variant.name, "meta_parse_cache.pickle")
+            )
+            importer.run_import()
+            overlay_meta = importer.meta_data
+
+        renamer = IdRenamer(base.mod_id, variant.mod_id) if variant.mod_id != base.mod_id else None
+        loc_overlays = base.loc_overlays
+        if renamer is not None:
+            # init_rules 中显式指定的 effect 名称同样属于 MOD_ID 的 ID
+            init_rules = data.get("init_rules")
+            if isinstance(init_rules, dict) and init_rules.get("effect"):
+                data = merge_structure(data, {"init_rules": {"effect": renamer(init_rules["effect"])}})
+            loc_overlays = {lang: renamer.texts(texts) for lang, texts in loc_overlays.items()}
+        self.generators[variant.name].use_inputs(data, derive_meta(base.importer.meta_data, overlay_meta, renamer), loc_overlays)
+        logger.info(
+            f"变体 {variant.name}: mod_id {variant.mod_id}，覆盖 meta 条目 {sum(map(len, overlay_meta.values()))}，"
+            f"输出到 {variant.output_root}{log_tail}"
+        )
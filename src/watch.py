@@ -0,0 +1,182 @@
+"""
+watch 模式
+常驻进程，保留已解析的 structure、meta 索引与本地化数据，轮询输入文件的变化，
+在防抖窗口结束后只重新解析变化的文件，并借助构建清单只重写受影响的输出。
+
+用法 (在 src 目录下):
+    python watch.py
+"""
+import hashlib
+import logging
+import os
+import time
+
+from diagnostics import diagnostics
+from generate_mod import JSON5_PATH, LOC_OVERLAY_FOLDER, OUTPUT_ROOT, GenerateModFiles
+from loc_overlay import list_overlay_files, overlay_folder
+from log import log_manager
+from profiler import run_profiler
+
+logger = log_manager.get_logger()
+
+WATCH_INTERVAL = 0.5  # 轮询间隔 (秒)
+WATCH_DEBOUNCE = 0.3  # 最后一次变化后等待的时间 (秒)，编辑器保存时的连续写入合并为一次重建
+
+
+def _file_digest(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+class WatchSession:
+    """
+    输入文件监视与热重载
+    使用 (mtime_ns, size) 轮询代替 inotify，无需额外依赖且跨平台。
+    stat 变化后再比较内容哈希，生成器自身的写回 (本地化名称同步) 不会触发新一轮重建。
+    """
+
+    def __init__(self, json_path, output_root, interval=WATCH_INTERVAL, debounce=WATCH_DEBOUNCE):
+        self.json_path = json_path
+        self.output_root = output_root
+        self.interval = interval
+        self.debounce = debounce
+        self.overlay_folder = overlay_folder(json_path, LOC_OVERLAY_FOLDER)
+        self.generator = None
+        self.snapshot = {}
+
+    def _structure_paths(self):
+        if not os.path.isdir(self.json_path):
+            return [self.json_path]
+        suffixes = self.generator.structure_cache.SOURCE_SUFFIXES
+        return [os.path.join(self.json_path, n) for n in os.listdir(self.json_path) if n.endswith(suffixes)]
+
+    def _overlay_paths(self):
+        return list(list_overlay_files(self.overlay_folder).values())
+
+    def _meta_paths(self):
+        if self.generator.importer.store is not None:
+            # 数据库后端的文本文件只是导出结果，不监视
+            return []
+        workspace = self.generator.importer.workspace_folder
+        paths = []
+        for category in self.generator.importer.meta_data:
+            folder = os.path.join(workspace, category)
+            if os.path.isdir(folder):
+                paths.extend(os.path.join(folder, n) for n in os.listdir(folder) if n.endswith(".txt"))
+        return paths
+
+    def _take_snapshot(self):
+        snapshot = {}
+        for path in self._structure_paths() + self._overlay_paths() + self._meta_paths():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def poll(self):
+        """返回自上次轮询以来 stat 发生变化 (含新增、删除) 的路径"""
+        current = self._take_snapshot()
+        changed = {p for p, stat in current.items() if self.snapshot.get(p) != stat}
+        changed.update(p for p in self.snapshot if p not in current)
+        self.snapshot = current
+        return changed
+
+    def _is_structure_path(self, path):
+        if os.path.isdir(self.json_path):
+            return os.path.dirname(path) == self.json_path
+        return path == self.json_path
+
+    def _classify(self, changed):
+        """
+        按内容哈希过滤只改了 mtime 的文件
+        :return: (structure 是否变化, 本地化覆盖是否变化, [(category, meta 文件路径)...])
+        """
+        structure_changed = False
+        overlay_changed = False
+        meta_changes = []
+        records = self.generator.structure_cache.records
+        file_digests = self.generator.importer.file_digests
+        for path in sorted(changed):
+            digest = _file_digest(path)
+            if self._is_structure_path(path):
+                record = records.get(os.path.abspath(path))
+                if digest is None or record is None or record["digest"] != digest:
+                    structure_changed = True
+            elif os.path.dirname(path) == self.overlay_folder:
+                record = records.get(os.path.abspath(path))
+                if digest is None or record is None or record["digest"] != digest:
+                    overlay_changed = True
+            elif digest != file_digests.get(path):
+                meta_changes.append((os.path.basename(os.path.dirname(path)), path))
+        return structure_changed, overlay_changed, meta_changes
+
+    def start(self):
+        """首次完整构建，之后的重建都复用内存中的状态"""
+        log_tail = " (WatchSession: start)"
+        run_profiler.start(trace_memory=False)
+        self.generator = GenerateModFiles(self.json_path, self.output_root, incremental=True)
+        self.generator.build(report=False)
+        self.snapshot = self._take_snapshot()
+        logger.info(f"开始监视 {len(self.snapshot)} 个输入文件 (间隔 {self.interval}s){log_tail}")
+
+    def apply(self, changed):
+        """
+        处理一批变化的输入
+        :return: 是否执行了重建
+        """
+        log_tail = " (WatchSession: apply)"
+        structure_changed, overlay_changed, meta_changes = self._classify(changed)
+        if not structure_changed and not overlay_changed and not meta_changes:
+            return False
+
+        start = time.perf_counter()
+        run_profiler.start(trace_memory=False)
+        diagnostics.clear()
+        if structure_changed:
+            logger.info(f"structure 已变化，重新读取{log_tail}")
+            self.generator.reload_structure()
+        if overlay_changed:
+            logger.info(f"本地化覆盖已变化，重新读取{log_tail}")
+            self.generator.reload_loc_overlays()
+        for category, path in meta_changes:
+            logger.info(f"meta 文件已变化: {path}{log_tail}")
+            self.generator.reload_meta_file(category, path)
+        self.generator.build(report=False)
+        logger.info(f"热重载完成，耗时 {(time.perf_counter() - start) * 1000:.1f} ms{log_tail}")
+        return True
+
+    def run(self):
+        log_tail = " (WatchSession: run)"
+        self.start()
+        try:
+            while True:
+                time.sleep(self.interval)
+                changed = self.poll()
+                if not changed:
+                    continue
+                # 防抖: 窗口内没有新的变化后才开始重建
+                while True:
+                    time.sleep(self.debounce)
+                    more = self.poll()
+                    if not more:
+                        break
+                    changed |= more
+                try:
+                    self.apply(changed)
+                except Exception as e:
+                    # 输入文件编辑到一半时可能无法解析，保持监视，等待下一次保存
+                    logger.error(f"重建失败: {e}{log_tail}")
+        except KeyboardInterrupt:
+            logger.info(f"停止监视{log_tail}")
+        finally:
+            log_manager.flush()
+
+
+if __name__ == "__main__":
+    log_manager.init_logger(level=logging.DEBUG, log_folder="pdx_logs", async_mode=True)
+    WatchSession(JSON5_PATH, OUTPUT_ROOT).run()